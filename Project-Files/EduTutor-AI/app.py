@@ -1,41 +1,23 @@
 import streamlit as st
-from services.mcq_generator2 import generate_mcqs
-from services.pinecone_service import upsert_user_data, get_user_by_email, get_all_quiz_results, store_quiz_result, get_quizzes_by_student
-from passlib.hash import bcrypt
+from services.mcq_cache import stream_cached_mcq_questions
+from services.question_bank import question_bank
+from services.mcq_batch import generate_mcqs_batch
+from services.generation_scheduler import GenerationOverloaded, class_of
+from services.passwords import hash_password, verify_password
+from services.storage import upsert_user_data, update_user_password, get_user_by_email, get_users_by_emails, get_quiz_results_page, store_quiz_result, get_backend_call_count, reset_backend_call_count
+from services.record_ids import user_id as record_user_id
+from services.metrics import start_session, start_exporters, get_session_spans, summary as metrics_summary
+from services.quiz_analytics import get_overall_summary, get_topic_summaries, get_daily_summaries, get_student_trend
+from services.sessions import SESSION_COOKIE, issue_session_code, issue_tokens, redeem_session_code, revoke_token, session_route_url, verify_refresh_token
 from datetime import datetime
-import re
-import uuid
-from streamlit_oauth import OAuth2Component
 import os
-import requests
 
 # Set your credentials here or load from .env
 GOOGLE_CLIENT_ID = st.secrets["GOOGLE_CLIENT_ID"]
 GOOGLE_CLIENT_SECRET = st.secrets["GOOGLE_CLIENT_SECRET"]
 
-oauth2 = OAuth2Component(
-    client_id=GOOGLE_CLIENT_ID,
-    client_secret=GOOGLE_CLIENT_SECRET,
-    authorize_endpoint="https://accounts.google.com/o/oauth2/v2/auth",
-    token_endpoint="https://oauth2.googleapis.com/token"
-)
-
-# Helper to parse quiz text
-def parse_quiz_text(quiz_text):
-    pattern = r"Q\d+\..*?(?=Q\d+\.|\Z)"  # Matches each question block
-    blocks = re.findall(pattern, quiz_text, re.DOTALL)
-    parsed = []
-    for block in blocks:
-        question_match = re.search(r"Q\d+\.\s*(.*?)\nA\)", block)
-        options = re.findall(r"[A-D]\)\s*(.*)", block)
-        answer_match = re.search(r"Answer:\s*([A-D])", block)
-        if question_match and options and answer_match:
-            parsed.append({
-                "question": question_match.group(1).strip(),
-                "options": options,
-                "correct": answer_match.group(1)
-            })
-    return parsed
+# Heavy libraries (streamlit_oauth, requests, pandas, pyarrow) are imported
+# inside the functions that use them to keep app startup fast.
 
 # --- Session State ---
 if "logged_in" not in st.session_state:
@@ -48,6 +30,67 @@ if "logged_in" not in st.session_state:
     st.session_state.quiz_submitted = False
     st.session_state.score = 0
     st.session_state.total = 0
+    st.session_state.refresh_token = None
+    st.session_state.session_code = None
+
+# --- Session Tokens ---
+# The refresh token never goes in the URL. When the FastAPI auth routes are
+# deployed (AUTH_BASE_URL), they keep it in an HttpOnly cookie and rotate it on
+# every page load (/auth/session), then send the browser back with a one-time
+# ?session_code= that restore_session redeems, so a browser refresh restores
+# the session without a password check. Without AUTH_BASE_URL the session
+# lives in st.session_state only, as before.
+AUTH_BASE_URL = os.getenv("AUTH_BASE_URL", "")  # where the FastAPI auth routes are served; empty = not deployed
+APP_URL = os.getenv("APP_URL", "/")
+SESSION_STATE_KEYS = ["logged_in", "user_email", "user_role", "user_name", "questions", "user_answers", "quiz_submitted", "score", "total", "refresh_token", "session_code"]
+
+
+def _set_session(email, role, name, refresh_token):
+    st.session_state.logged_in = True
+    st.session_state.user_email = email
+    st.session_state.user_role = role
+    st.session_state.user_name = name
+    st.session_state.refresh_token = refresh_token
+
+
+def start_user_session(email, role, name):
+    """Log in after a password or Google check; with AUTH_BASE_URL the cookie is set on the next rerun"""
+    _, refresh_token = issue_tokens(email, role, name)
+    _set_session(email, role, name, refresh_token)
+    if AUTH_BASE_URL:
+        st.session_state.session_code = issue_session_code(refresh_token)
+
+
+def go_to_session_route(code=None):
+    """Send the browser to /auth/session, which sets the cookie and comes back with a fresh code"""
+    import json
+    import streamlit.components.v1 as components
+
+    url = session_route_url(AUTH_BASE_URL, APP_URL, code)
+    components.html(f"<script>window.parent.location.replace({json.dumps(url)});</script>", height=0)
+
+
+def restore_session():
+    """Log in from a one-time ?session_code=, or send a browser holding the session cookie to get one"""
+    code = st.query_params.get("session_code")
+    if code:
+        del st.query_params["session_code"]
+        refresh_token = redeem_session_code(code)
+        claims = verify_refresh_token(refresh_token)
+        if claims:
+            _set_session(claims["sub"], claims.get("role", "student"), claims.get("name", ""), refresh_token)
+    elif AUTH_BASE_URL and SESSION_COOKIE in st.context.cookies:
+        # The auth route rotates the cookie's refresh token and returns with a code
+        go_to_session_route()
+        st.stop()
+
+
+def logout():
+    if st.session_state.refresh_token:
+        revoke_token(st.session_state.refresh_token)  # the cookie's token is now useless
+    for key in SESSION_STATE_KEYS:
+        st.session_state[key] = None if key != "logged_in" else False
+    st.rerun()
 
 # --- Auth UI ---
 def login_form():
@@ -56,11 +99,11 @@ def login_form():
     password = st.text_input("Password", type="password", key="login_password")
     if st.button("Login"):
         user = get_user_by_email(email)
-        if user and bcrypt.verify(password, user["password"]):
-            st.session_state.logged_in = True
-            st.session_state.user_email = email
-            st.session_state.user_role = user.get("role", "student")
-            st.session_state.user_name = user.get("name", "")
+        verified, new_hash = verify_password(password, user["password"]) if user else (False, None)
+        if new_hash:
+            update_user_password(email, new_hash)  # cost factor changed since signup
+        if verified:
+            start_user_session(email, user.get("role", "student"), user.get("name", ""))
             st.success("Logged in successfully!")
             st.rerun()
         else:
@@ -77,8 +120,8 @@ def signup_form():
         if get_user_by_email(email):
             st.error("User already exists.")
         else:
-            hashed_pw = bcrypt.hash(password)
-            user_id = str(uuid.uuid4())
+            hashed_pw = hash_password(password)
+            user_id = record_user_id(email)
             user_data = {
                 "email": email,
                 "password": hashed_pw,
@@ -91,12 +134,20 @@ def signup_form():
 
 def google_login():
     st.subheader("Login with Google")
+    from streamlit_oauth import OAuth2Component
+    oauth2 = OAuth2Component(
+        client_id=GOOGLE_CLIENT_ID,
+        client_secret=GOOGLE_CLIENT_SECRET,
+        authorize_endpoint="https://accounts.google.com/o/oauth2/v2/auth",
+        token_endpoint="https://oauth2.googleapis.com/token"
+    )
     result = oauth2.authorize_button(
         name="Login with Google",
         redirect_uri="http://localhost:8501",
         scope="openid email profile"
     )
     if result and "token" in result:
+        import requests
         id_token = result["token"]["id_token"]
         userinfo = requests.get(
             "https://openidconnect.googleapis.com/v1/userinfo",
@@ -107,7 +158,7 @@ def google_login():
         if email:
             user = get_user_by_email(email)
             if not user:
-                user_id = str(uuid.uuid4())
+                user_id = record_user_id(email)
                 user_data = {
                     "email": email,
                     "password": "google_oauth",
@@ -118,10 +169,7 @@ def google_login():
                 role = "student"
             else:
                 role = user.get("role", "student")
-            st.session_state.logged_in = True
-            st.session_state.user_email = email
-            st.session_state.user_role = role
-            st.session_state.user_name = name or email
+            start_user_session(email, role, name or email)
             st.success(f"Logged in as {email} via Google!")
             st.rerun()
         else:
@@ -140,55 +188,159 @@ def auth_page():
     with tabs[2]:
         google_login()
 
+# --- Paginated Quiz Results ---
+def render_results_page(key, columns, empty_message, page_size=50, with_names=False, **filters):
+    """Show one page of quiz results; only the page being viewed is loaded.
+    with_names joins student names onto the page with one bulk user fetch."""
+    state = st.session_state.setdefault(key, {"filters": None, "cursors": [None], "page": 0})
+    if state["filters"] != filters:
+        state.update(filters=filters, cursors=[None], page=0)
+    page = state["page"]
+    results, next_cursor = get_quiz_results_page(
+        cursor=state["cursors"][page], page_size=page_size, **filters)
+    if not results and page == 0:
+        st.info(empty_message)
+        return
+    if with_names:
+        users = get_users_by_emails(r["email"] for r in results)
+        results = [dict(r, name=users.get(r["email"], {}).get("name", "")) for r in results]
+    import pandas as pd
+    df = pd.DataFrame(results)
+    df = df[list(columns)] if all(col in df.columns for col in columns) else df
+    st.dataframe(df.rename(columns=columns), use_container_width=True)
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("Previous", key=f"{key}_prev", disabled=page == 0):
+        state["page"] -= 1
+        st.rerun()
+    info_col.write(f"Page {page + 1}")
+    if next_col.button("Next", key=f"{key}_next", disabled=next_cursor is None):
+        del state["cursors"][page + 1:]
+        state["cursors"].append(next_cursor)
+        state["page"] += 1
+        st.rerun()
+
 # --- Educator Dashboard ---
 def educator_dashboard():
     st.title("Educator Dashboard")
     st.write(f"Logged in as: {st.session_state.user_email} (educator)")
     if st.button("Logout"):
-        for key in ["logged_in", "user_email", "user_role", "user_name", "questions", "user_answers", "quiz_submitted", "score", "total"]:
-            st.session_state[key] = None if key != "logged_in" else False
-        st.rerun()
+        logout()
     st.header("All Student Quiz Results")
-    results = get_all_quiz_results()
-    if not results:
+    cols = st.columns(4)
+    student = cols[0].text_input("Student email", key="filter_email").strip()
+    topic = cols[1].text_input("Topic", key="filter_topic").strip()
+    start_date = cols[2].date_input("From", value=None, key="filter_start")
+    end_date = cols[3].date_input("To", value=None, key="filter_end")
+    render_results_page(
+        "educator_results",
+        {'name': 'Student', 'email': 'Student Email', 'topic': 'Topic', 'score': 'Score', 'total': 'Total', 'time': 'Time'},
+        "No quiz results found.",
+        with_names=True,
+        email=student or None, topic=topic or None,
+        start_date=start_date, end_date=end_date
+    )
+    results_download(email=student or None, topic=topic or None,
+                     start_date=start_date, end_date=end_date)
+    class_analytics()
+    class_quiz_generator()
+
+# --- Educator Results Download ---
+def results_download(**filters):
+    """Offer the filtered results as a file, read from the columnar export rather than the backend"""
+    file_format = st.radio("Download format", ["csv", "parquet"], horizontal=True, key="export_format")
+    if st.button("Prepare download", key="export_prepare"):
+        from services.results_export import export_results, write_download
+        with st.spinner("Exporting quiz results..."):
+            export_results()
+            data = write_download(file_format, **filters)
+        st.download_button(
+            "Download results", data=data, file_name=f"quiz_results.{file_format}",
+            mime="text/csv" if file_format == "csv" else "application/octet-stream",
+            key="export_download"
+        )
+
+# --- Educator Class Analytics ---
+def class_analytics():
+    st.header("Class Analytics")
+    overall = get_overall_summary()
+    if not overall:
         st.info("No quiz results found.")
-    else:
-        import pandas as pd
-        df = pd.DataFrame(results)
-        df = df[['email', 'topic', 'score', 'total', 'time']] if all(col in df.columns for col in ['email','topic','score','total','time']) else df
-        st.dataframe(df.rename(columns={
-            'email': 'Student Email',
-            'topic': 'Topic',
-            'score': 'Score',
-            'total': 'Total',
-            'time': 'Time'
-        }), use_container_width=True)
+        return
+    import pandas as pd
+    cols = st.columns(4)
+    cols[0].metric("Attempts", overall["attempts"])
+    cols[1].metric("Mean score", f"{overall['mean_percent']}%")
+    cols[2].metric("Pass rate", f"{overall['pass_rate']}%")
+    cols[3].metric("Median score", f"{overall['p50_percent']}%")
+
+    st.subheader("By Topic")
+    st.dataframe(pd.DataFrame(get_topic_summaries()).rename(columns={
+        'topic': 'Topic',
+        'attempts': 'Attempts',
+        'mean_percent': 'Mean %',
+        'pass_rate': 'Pass Rate %',
+        'p50_percent': 'Median %',
+        'p90_percent': 'P90 %'
+    }), use_container_width=True)
+
+    st.subheader("Daily Mean Score")
+    daily = pd.DataFrame(get_daily_summaries())
+    st.line_chart(daily.set_index("day")["mean_percent"])
+
+    student = st.text_input("Student trend for email", key="trend_email").strip()
+    if student:
+        trend = get_student_trend(student)
+        if trend:
+            st.line_chart(pd.DataFrame(trend).set_index("day")["mean_percent"])
+        else:
+            st.info("No quiz results for this student.")
+
+# --- Educator Class Quiz Generation ---
+def class_quiz_generator():
+    st.header("Generate Quizzes for a Class")
+    with st.form("batch_quiz_form"):
+        topics_text = st.text_area("Topics (one per line)")
+        difficulty = st.selectbox("Select difficulty", ["easy", "medium", "hard"], key="batch_difficulty")
+        num_questions = st.number_input("Questions per topic", min_value=1, max_value=10, value=3)
+        pack = st.checkbox("Pack several topics into one request", value=True)
+        submitted = st.form_submit_button("Generate Quizzes")
+    if submitted and topics_text.strip():
+        topics = list(dict.fromkeys(t.strip() for t in topics_text.splitlines() if t.strip()))
+        progress = st.progress(0.0)
+        done = 0
+        for topic, questions, error in generate_mcqs_batch(
+                topics, num_questions=int(num_questions), difficulty=difficulty,
+                pack_size=3 if pack else 1, user=st.session_state.user_email,
+                class_id=class_of(st.session_state.user_email)):
+            done += 1
+            progress.progress(done / len(topics))
+            with st.expander(f"{topic} ({'failed' if error else f'{len(questions)} questions'})"):
+                if error:
+                    st.error(error)
+                else:
+                    for i, q in enumerate(questions):
+                        st.write(f"Q{i+1}: {q['question']}")
+                        for letter, option in zip("ABCD", q['options']):
+                            st.write(f"{letter}) {option}")
+                        st.write(f"Answer: {q['correct']}")
 
 # --- Student Quiz History ---
 def student_quiz_history():
     st.header("Your Quiz History")
-    results = get_quizzes_by_student(st.session_state.user_email)
-    if not results:
-        st.info("You have not taken any quizzes yet.")
-    else:
-        import pandas as pd
-        df = pd.DataFrame(results)
-        df = df[['topic', 'score', 'total', 'time']] if all(col in df.columns for col in ['topic','score','total','time']) else df
-        st.dataframe(df.rename(columns={
-            'topic': 'Topic',
-            'score': 'Score',
-            'total': 'Total',
-            'time': 'Time'
-        }), use_container_width=True)
+    render_results_page(
+        "student_history",
+        {'topic': 'Topic', 'score': 'Score', 'total': 'Total', 'time': 'Time'},
+        "You have not taken any quizzes yet.",
+        email=st.session_state.user_email
+    )
 
 # --- Main App Logic ---
 def quiz_ui():
     st.title("Quiz Generator & Taker")
     st.write(f"Logged in as: {st.session_state.user_email} ({st.session_state.user_role})")
     if st.button("Logout"):
-        for key in ["logged_in", "user_email", "user_role", "user_name", "questions", "user_answers", "quiz_submitted", "score", "total"]:
-            st.session_state[key] = None if key != "logged_in" else False
-        st.rerun()
+        logout()
 
     # Quiz Generation UI
     with st.form("quiz_form"):
@@ -196,8 +348,33 @@ def quiz_ui():
         difficulty = st.selectbox("Select difficulty", ["easy", "medium", "hard"])
         submitted = st.form_submit_button("Generate Quiz")
         if submitted and topic:
-            quiz_text = generate_mcqs(topic=topic, difficulty=difficulty, num_questions=3)
-            st.session_state.questions = parse_quiz_text(quiz_text)
+            # Serve from the pre-generated bank, fall back to live generation
+            questions = question_bank.take(topic, difficulty, 3)
+            if questions is None:
+                # Show each question as soon as it has been generated
+                questions = []
+                queue_status = st.empty()
+                preview = st.empty()
+
+                def show_queue_position(position, retry_after):
+                    queue_status.info(f"You are #{position} in the queue (about {retry_after}s)...")
+
+                email = st.session_state.user_email
+                try:
+                    with preview.container():
+                        for q in stream_cached_mcq_questions(topic=topic, difficulty=difficulty, num_questions=3,
+                                                             user=email, class_id=class_of(email),
+                                                             on_wait=show_queue_position):
+                            queue_status.empty()
+                            questions.append(q)
+                            st.write(f"Q{len(questions)}: {q['question']}")
+                except GenerationOverloaded as e:
+                    st.warning(f"{e}. Please try again in {e.retry_after} seconds.")
+                except Exception as e:
+                    st.error(f"Error generating MCQs: {str(e)}")
+                queue_status.empty()
+                preview.empty()
+            st.session_state.questions = questions
             st.session_state.user_answers = [None] * len(st.session_state.questions)
             st.session_state.quiz_submitted = False
             st.session_state.score = 0
@@ -249,11 +426,36 @@ def quiz_ui():
     # Student Quiz History
     student_quiz_history()
 
+# --- Timing Panel (educators) ---
+def timing_panel():
+    with st.sidebar.expander("Timings"):
+        spans = get_session_spans()
+        if not spans:
+            st.caption("Set METRICS_ENABLED=1 to record timings.")
+            return
+        st.write("This rerun:")
+        for name, seconds in spans:
+            st.write(f"{name}: {seconds * 1000:.1f} ms")
+        st.write("Since start (count / mean):")
+        for name, stats in metrics_summary().items():
+            st.write(f"{name}: {stats['count']} / {stats['mean_ms']} ms")
+
 # --- App Entrypoint ---
+start_exporters()
+start_session()
+reset_backend_call_count()
+if not st.session_state.logged_in:
+    restore_session()
+if st.session_state.get("session_code"):
+    go_to_session_route(st.session_state.session_code)
+    st.session_state.session_code = None
 if not st.session_state.logged_in:
     auth_page()
 else:
     if st.session_state.user_role == "educator":
         educator_dashboard()
     else:
-        quiz_ui() 
\ No newline at end of file
+        quiz_ui()
+st.sidebar.caption(f"Storage backend calls this rerun: {get_backend_call_count()}")
+if st.session_state.user_role == "educator":
+    timing_panel()
@@ -1,19 +1,34 @@
 from fastapi import APIRouter, Form, Request
-from fastapi.responses import RedirectResponse
-from jose import jwt
+from fastapi.responses import JSONResponse, RedirectResponse
 from dotenv import load_dotenv
-import os
-import bcrypt
-from services.pinecone_service import index
-from passlib.hash import bcrypt  # ✅ use passlib's bcrypt
-import streamlit as st
+from services.async_storage import get_user_by_email, update_user_password, run_blocking
+from services.passwords import verify_password_async
+from services.sessions import (REFRESH_TOKEN_TTL, SESSION_COOKIE, SESSION_COOKIE_SECURE, issue_session_code,
+                               issue_tokens, redeem_session_code, refresh_tokens, revoke_token)
 
 
 load_dotenv()
 router = APIRouter()
 
-SECRET_KEY = st.secrets["JWT_SECRET"]
-ALGORITHM = st.secrets["JWT_ALGORITHM"]
+
+def _local_path(url):
+    # Only same-site paths, so the auth routes cannot be used as an open redirect
+    return url if url.startswith("/") and not url.startswith("//") else "/"
+
+
+def _set_session_cookie(response, refresh_token):
+    response.set_cookie(SESSION_COOKIE, refresh_token, max_age=REFRESH_TOKEN_TTL, path="/",
+                        httponly=True, secure=SESSION_COOKIE_SECURE, samesite="lax")
+
+
+async def _session_redirect(refresh_token, next_url):
+    """Redirect to next_url with a one-time code for the app; the refresh token goes in the cookie"""
+    code = await run_blocking(issue_session_code, refresh_token)
+    separator = "&" if "?" in next_url else "?"
+    response = RedirectResponse(f"{next_url}{separator}session_code={code}", status_code=303)
+    _set_session_cookie(response, refresh_token)
+    return response
+
 
 @router.post("/auth/email")
 async def login_email(
@@ -21,46 +36,75 @@ async def login_email(
     password: str = Form(...)
 ):
     try:
-        # Search for the email in Pinecone by filtering metadata
-        response = index.query(
-            vector=[0.0] * 1024,
-            top_k=1000,
-            include_metadata=True,
-            filter={
-                "$and": [
-                    {"email": {"$eq": email}},     # email should be a string
-                    {"type": {"$eq": "user"}}      # type should also be a string
-                ]
-            }
-)
-
-        if not response.matches:
+        # Keyed lookup on the async storage client; the event loop is never blocked
+        user_data = await get_user_by_email(email)
+
+        if not user_data:
             print("❌ User not found.")
             return RedirectResponse("/login", status_code=303)
 
-        user_data = response.matches[0].metadata
         hashed_pw = user_data.get("password")
         role = user_data.get("role", "student")
 
-        print("Entered password:", password)
-        print("Hashed password from DB:", hashed_pw)
-        result = bcrypt.verify(password, hashed_pw)
-        print("Password match result:", result)
+        # Verified once, on the password process pool, without blocking the event loop
+        result, new_hash = await verify_password_async(password, hashed_pw)
 
-        if not bcrypt.verify(password, hashed_pw):
+        if not result:
             print("❌ Password does not match.")
             return RedirectResponse("/login", status_code=303)
 
-        # ✅ Issue JWT
-        token_data = {"sub": email, "role": role, "name": user_data.get("name", "")}
-        token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
+        if new_hash:
+            # Cost factor changed since this hash was made; store the rehash
+            await update_user_password(email, new_hash)
+
+        # ✅ Issue signed, expiring tokens; the refresh token only travels in the cookie
+        _, session = issue_tokens(email, role, user_data.get("name", ""))
 
         if role == "educator":
-            return RedirectResponse(url=f"/dashboard/educator?token={token}", status_code=303)
+            return await _session_redirect(session, "/dashboard/educator")
         else:
-            return RedirectResponse(url=f"/dashboard/student?token={token}", status_code=303)
+            return await _session_redirect(session, "/dashboard/student")
 
 
     except Exception as e:
         print("❌ Login error:", str(e))
-        return RedirectResponse("/login", status_code=303) 
\ No newline at end of file
+        return RedirectResponse("/login", status_code=303)
+
+
+@router.get("/auth/session")
+async def session(request: Request, session_code: str = None, next: str = "/"):
+    # Streamlit sends the browser here after a login (session_code) or on a page
+    # load with the cookie. The refresh token is rotated each time, so a copied
+    # cookie or code stops working once the owner's browser has been back.
+    next_url = _local_path(next)
+    if session_code:
+        refresh_token = await run_blocking(redeem_session_code, session_code)
+    else:
+        refresh_token = request.cookies.get(SESSION_COOKIE)
+    tokens = await run_blocking(refresh_tokens, refresh_token) if refresh_token else None
+    if not tokens:
+        response = RedirectResponse(next_url, status_code=303)
+        response.delete_cookie(SESSION_COOKIE, path="/")
+        return response
+    return await _session_redirect(tokens[1], next_url)
+
+
+@router.post("/auth/refresh")
+async def refresh(request: Request, refresh_token: str = Form(None)):
+    # Rotates the refresh token (form field, else the cookie); no storage lookup or password check needed
+    tokens = await run_blocking(refresh_tokens, refresh_token or request.cookies.get(SESSION_COOKIE))
+    if not tokens:
+        return JSONResponse({"error": "invalid or expired refresh token"}, status_code=401)
+    response = JSONResponse({"access_token": tokens[0], "refresh_token": tokens[1], "token_type": "bearer"})
+    _set_session_cookie(response, tokens[1])
+    return response
+
+
+@router.post("/auth/logout")
+async def logout(request: Request, refresh_token: str = Form(None)):
+    token = refresh_token or request.cookies.get(SESSION_COOKIE)
+    if token:
+        await run_blocking(revoke_token, token)
+    response = JSONResponse({"status": "logged out"})
+    response.delete_cookie(SESSION_COOKIE, path="/")
+    return response
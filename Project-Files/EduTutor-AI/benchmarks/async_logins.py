@@ -0,0 +1,149 @@
+# async_logins.py
+# Concurrent logins through the FastAPI email auth router, driven by an
+# in-process ASGI client (httpx.ASGITransport). The old handler, which ran
+# the user lookup and bcrypt.verify inline inside the async route, is
+# compared with auth.email_auth (async storage client + password process
+# pool). Storage is the local SQLite backend with injected per-call latency
+# standing in for Pinecone round trips. Event-loop lag is the worst delay
+# seen by a 10 ms heartbeat task while the logins run. Under the blocking
+# handler per-request latency is understated: requests only start their
+# clock once the stalled loop gets round to them.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.async_logins --logins 200 --concurrency 50 --rounds 10
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--storage-latency", type=float, default=0.02)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, workdir):
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "bench.sqlite3")
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_WORKERS"] = str(args.workers)
+    os.environ["STORAGE_CACHE_TTL_SECONDS"] = "0"  # every login reaches the storage stand-in
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def blocking_app():
+    """The previous handler shape: blocking lookup and bcrypt inside an async route"""
+    from fastapi import FastAPI, Form
+    from fastapi.responses import RedirectResponse
+    from passlib.hash import bcrypt
+
+    from services import storage
+    from services.sessions import issue_tokens
+
+    app = FastAPI()
+
+    @app.post("/auth/email")
+    async def login_email(email: str = Form(...), password: str = Form(...)):
+        user = storage.get_user_by_email(email)
+        if not user or not bcrypt.verify(password, user["password"]):
+            return RedirectResponse("/login", status_code=303)
+        token, session = issue_tokens(email, user["role"])
+        return RedirectResponse(f"/dashboard/student?token={token}&session={session}", status_code=303)
+
+    return app
+
+
+def async_app():
+    from fastapi import FastAPI
+
+    from auth.email_auth import router
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def measure(app, args):
+    import httpx
+
+    lags = []
+    running = True
+
+    async def heartbeat():
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - before - 0.01)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, failures = [], 0
+
+    async def login(client, n):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/auth/email", data={
+                "email": f"student{n % args.users}@example.com", "password": "benchmark-password"})
+            latencies.append(time.perf_counter() - start)
+            if "/dashboard/" not in response.headers.get("location", ""):
+                failures += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        beat = asyncio.create_task(heartbeat())
+        start = time.perf_counter()
+        await asyncio.gather(*(login(client, n) for n in range(args.logins)))
+        elapsed = time.perf_counter() - start
+        running = False
+        await beat
+    return {
+        "logins_per_second": round(args.logins / elapsed, 2),
+        "p50_ms": round(1000 * percentile(latencies, 0.5), 1),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 1),
+        "max_event_loop_lag_ms": round(1000 * max(lags), 1) if lags else None,
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args, tempfile.mkdtemp(prefix="edututor-bench-"))
+
+    from benchmarks.quiz_lifecycle import SlowBackend
+    from services import passwords, storage
+    from services.record_ids import user_id
+
+    hashed = passwords.hash_password("benchmark-password")
+    for n in range(args.users):
+        email = f"student{n}@example.com"
+        storage.upsert_user_data(user_id(email), {"email": email, "password": hashed,
+                                                  "role": "student", "name": f"Student {n}"})
+    storage.backend = SlowBackend(storage.backend, args.storage_latency)
+
+    report = {
+        "config": vars(args),
+        "blocking": asyncio.run(measure(blocking_app(), args)),
+        "async": asyncio.run(measure(async_app(), args)),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# generation_scheduler.py
+# Class-wide burst simulation: many students click "Generate Quiz" within a
+# few seconds against a provider that rate-limits (HTTP 429 beyond --provider-rate
+# requests/second, clients retry with exponential backoff like llm_provider)
+# and slows down as concurrency grows. Compares end-to-end latency and
+# failures with every click going straight to the provider versus through
+# services.generation_scheduler. One "busy" class sends --busy-share of the
+# traffic, to show per-class fairness.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.generation_scheduler --students 300 --burst-seconds 5
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--classes", type=int, default=6)
+    parser.add_argument("--busy-share", type=float, default=0.5, help="share of requests from one class")
+    parser.add_argument("--burst-seconds", type=float, default=5.0)
+    parser.add_argument("--provider-rate", type=float, default=20.0, help="requests/second before 429s")
+    parser.add_argument("--latency", type=float, default=0.3, help="provider seconds per call when idle")
+    parser.add_argument("--concurrency", type=int, default=8, help="scheduler concurrency cap")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class RateLimitedProvider:
+    """Token-bucket rate limit with 429s; latency grows with in-flight calls"""
+
+    def __init__(self, rate, latency):
+        from services.generation_scheduler import TokenBucket
+
+        self.bucket = TokenBucket(rate, burst=max(1, int(rate)))
+        self.latency = latency
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def call(self):
+        with self._lock:
+            if self.bucket.try_take():
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            load = self.in_flight
+        time.sleep(self.latency * (1 + load / 10))
+        with self._lock:
+            self.in_flight -= 1
+        return True
+
+
+def generate(provider, retries):
+    """One quiz generation with the client's retry/backoff; True on success"""
+    for attempt in range(retries + 1):
+        if provider.call():
+            return True
+        time.sleep(0.5 * 2 ** attempt * random.uniform(0.5, 1.5))
+    return False
+
+
+def simulate(args, use_scheduler):
+    from services.generation_scheduler import GenerationOverloaded, GenerationScheduler
+
+    random.seed(args.seed)
+    provider = RateLimitedProvider(args.provider_rate, args.latency)
+    scheduler = GenerationScheduler(max_concurrency=args.concurrency, rate=args.provider_rate * 0.9,
+                                    burst=args.concurrency, max_queue=args.students,
+                                    queue_timeout=120)
+    requests = []
+    for i in range(args.students):
+        busy = random.random() < args.busy_share
+        class_id = "class-0" if busy else f"class-{1 + i % (args.classes - 1)}"
+        requests.append((random.uniform(0, args.burst_seconds), f"student-{i}", class_id))
+    requests.sort()
+
+    results = []  # (class_id, seconds, outcome)
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def student(arrival, user, class_id):
+        time.sleep(max(0.0, arrival - (time.perf_counter() - start)))
+        began = time.perf_counter()
+        try:
+            if use_scheduler:
+                with scheduler.admit(user, class_id):
+                    ok = generate(provider, args.retries)
+            else:
+                ok = generate(provider, args.retries)
+            outcome = "ok" if ok else "failed"
+        except GenerationOverloaded:
+            outcome = "shed"
+        with lock:
+            results.append((class_id, time.perf_counter() - began, outcome))
+
+    with ThreadPoolExecutor(max_workers=args.students) as executor:
+        list(executor.map(lambda r: student(*r), requests))
+
+    ok = [seconds for _, seconds, outcome in results if outcome == "ok"]
+    by_class = {}
+    for class_id, seconds, outcome in results:
+        if outcome == "ok":
+            by_class.setdefault(class_id, []).append(seconds)
+    return {
+        "ok": len(ok),
+        "failed": sum(outcome == "failed" for _, _, outcome in results),
+        "shed": sum(outcome == "shed" for _, _, outcome in results),
+        "provider_429s": provider.rejected,
+        "p50_s": round(percentile(ok, 0.5), 3) if ok else None,
+        "p95_s": round(percentile(ok, 0.95), 3) if ok else None,
+        "p99_s": round(percentile(ok, 0.99), 3) if ok else None,
+        "p95_by_class_s": {c: round(percentile(v, 0.95), 3) for c, v in sorted(by_class.items())},
+        "wall_seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "config": vars(args),
+        "direct": simulate(args, use_scheduler=False),
+        "scheduled": simulate(args, use_scheduler=True),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
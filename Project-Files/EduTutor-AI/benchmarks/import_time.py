@@ -0,0 +1,129 @@
+# import_time.py
+# Import-time profile of app startup with a regression budget. Runs
+# `python -X importtime` on the service modules app.py imports at the top
+# and fails (exit status 1) when
+#
+#   - any of HEAVY_MODULES is imported at startup; they must load on first use
+#   - importing all startup modules takes longer than --budget-ms (best of --repeat)
+#
+# PRELOADED_MODULES (streamlit) are imported first and left out of the total:
+# app.py cannot start without them, so only the app's own import cost is
+# budgeted.
+#
+# The slowest imports are listed so a regression points at its cause.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.import_time --budget-ms 150
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# What app.py imports before anything is rendered
+STARTUP_MODULES = (
+    "services.mcq_cache",
+    "services.question_bank",
+    "services.mcq_batch",
+    "services.generation_scheduler",
+    "services.passwords",
+    "services.storage",
+    "services.record_ids",
+    "services.metrics",
+    "services.quiz_analytics",
+    "services.sessions",
+)
+
+# Third-party modules the app loads anyway; imported before the measured ones
+PRELOADED_MODULES = ("streamlit",)
+
+# Libraries that only specific features need
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "pyarrow",
+    "torch",
+    "sentence_transformers",
+    "langchain",
+    "langchain_ibm",
+    "pinecone",
+    "passlib",
+    "streamlit_oauth",
+    "requests",
+)
+
+# Startup import budget for the app's own modules, on top of PRELOADED_MODULES
+BUDGET_MS = 150.0
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    return parser.parse_args(argv)
+
+
+def profile(modules=STARTUP_MODULES, preloaded=PRELOADED_MODULES):
+    """{module: (self_us, cumulative_us)} from one fresh interpreter importing modules after preloaded"""
+    # services.sessions reads the JWT settings at import; any values will do here
+    env = dict(os.environ, JWT_SECRET=os.getenv("JWT_SECRET", "import-time-profile"),
+               JWT_ALGORITHM=os.getenv("JWT_ALGORITHM", "HS256"))
+    # Preloaded modules go first so they show up as their own top-level entries
+    code = "".join(f"import {m}\n" for m in (*preloaded, *modules))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(f"importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(self_us), int(cumulative_us))
+    return imports
+
+
+def heavy_imports(imports):
+    return sorted(name for name in imports if name.split(".")[0] in HEAVY_MODULES)
+
+
+def startup_ms(imports):
+    """Import time of the startup modules beyond PRELOADED_MODULES"""
+    # Modules imported by an earlier entry show no time of their own under the
+    # later ones, so the total is the sum over the startup modules' entries
+    return sum(imports[m][1] for m in STARTUP_MODULES if m in imports) / 1000
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = [profile() for _ in range(max(1, args.repeat))]
+    best = min(runs, key=startup_ms)
+    total_ms = startup_ms(best)
+    heavy = heavy_imports(best)
+    slowest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+
+    report = {
+        "config": vars(args),
+        "preloaded_ms": {m: round(best[m][1] / 1000, 1) for m in PRELOADED_MODULES if m in best},
+        "startup_import_ms": round(total_ms, 1),
+        "per_module_ms": {m: round(best[m][1] / 1000, 1) for m in STARTUP_MODULES if m in best},
+        "slowest_self_ms": {name: round(self_us / 1000, 1) for name, (self_us, _) in slowest},
+        "heavy_imports": sorted({name.split(".")[0] for name in heavy}),
+        "violations": [],
+    }
+    if heavy:
+        report["violations"].append(f"heavy modules imported at startup: {', '.join(report['heavy_imports'])}")
+    if total_ms > args.budget_ms:
+        report["violations"].append(f"startup imports took {total_ms:.1f}ms, budget {args.budget_ms}ms")
+    print(json.dumps(report, indent=2))
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# llm_chain.py
+# Cold versus warm generate_mcqs latency against the stub LLM provider.
+#
+#   cold  the chain registry and providers are cleared before every call, so
+#         each call pays for client setup again (what generate_mcqs did
+#         before the shared registry: a new client, IAM token exchange and
+#         HTTP session per click)
+#   warm  every call reuses the process-wide chain and provider
+#
+# --setup-latency stands in for the client setup (token exchange and TLS
+# handshake) the stub otherwise skips; --llm-latency is the generation itself.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.llm_chain --calls 50 --setup-latency 0.3 --llm-latency 0.5
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--setup-latency", type=float, default=0.3,
+                        help="seconds to build a provider (token exchange, new session)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per stub generation")
+    return parser.parse_args(argv)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def configure_environment(args):
+    """Use the stub provider; must run before the services are imported"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+
+
+def install_setup_latency(seconds):
+    """Make building a stub provider cost what building a real client does"""
+    from services import llm_provider
+
+    class SlowSetupProvider(llm_provider.StubProvider):
+        setups = 0
+
+        def __init__(self, *a, **kw):
+            time.sleep(seconds)
+            SlowSetupProvider.setups += 1
+            super().__init__(*a, **kw)
+
+    llm_provider.StubProvider = SlowSetupProvider
+    return SlowSetupProvider
+
+
+def measure(args, cold):
+    from services.mcq_generator2 import clear_mcq_chains, generate_mcqs, is_error_response
+
+    def call(n):
+        if cold:
+            clear_mcq_chains()
+        start = time.perf_counter()
+        response = generate_mcqs(f"topic {n % 10}", num_questions=args.questions, difficulty="medium")
+        elapsed = time.perf_counter() - start
+        if is_error_response(response):
+            raise RuntimeError(response[:200])
+        return elapsed
+
+    clear_mcq_chains()
+    if not cold:
+        call(0)  # build the shared chain once, outside the measurement
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        latencies = list(executor.map(call, range(args.calls)))
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": round(1000 * percentile(latencies, 0.5), 1),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 1),
+        "calls_per_second": round(args.calls / elapsed, 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    provider_class = install_setup_latency(args.setup_latency)
+
+    report = {"config": vars(args)}
+    for mode in ("cold", "warm"):
+        before = provider_class.setups
+        report[mode] = measure(args, cold=mode == "cold")
+        report[mode]["provider_setups"] = provider_class.setups - before
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# logins.py
+# Concurrent login throughput: many simulated users verifying passwords at
+# once, inline (the old path) versus on the services.passwords process pool.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.logins --users 200 --concurrency 50 --rounds 12
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    return parser.parse_args(argv)
+
+
+def measure(verify, password, hashed, users, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: verify(password, hashed), range(users)))
+    elapsed = time.perf_counter() - start
+    assert all(r[0] if isinstance(r, tuple) else r for r in results)
+    return {"elapsed_seconds": round(elapsed, 3), "logins_per_second": round(users / elapsed, 2)}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_WORKERS"] = str(args.workers)
+
+    from passlib.hash import bcrypt
+    from services import passwords
+
+    hashed = bcrypt.using(rounds=args.rounds).hash("benchmark-password")
+    passwords.verify_password("warm-up", hashed)  # start the worker processes
+
+    report = {
+        "config": vars(args),
+        "inline": measure(bcrypt.verify, "benchmark-password", hashed, args.users, args.concurrency),
+        "process_pool": measure(passwords.verify_password, "benchmark-password", hashed,
+                                args.users, args.concurrency),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
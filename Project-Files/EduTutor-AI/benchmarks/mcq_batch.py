@@ -0,0 +1,111 @@
+# mcq_batch.py
+# Educator batch generation throughput: --topics quizzes generated
+#
+#   serial   one generate_mcqs call per topic, one after another (the old loop)
+#   batch    generate_mcqs_batch with --workers threads, one topic per prompt
+#   packed   generate_mcqs_batch packing --pack-size topics into each prompt
+#
+# The stub LLM provider is given a fixed --request-latency per call plus
+# --char-latency per generated character, so packing saves the per-request
+# overhead but not the generation time itself.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.mcq_batch --topics 30 --workers 4 --pack-size 3
+
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topics", type=int, default=30)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pack-size", type=int, default=3)
+    parser.add_argument("--request-latency", type=float, default=0.4, help="seconds of overhead per call")
+    parser.add_argument("--char-latency", type=float, default=0.0005, help="seconds per generated character")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Stub provider and an unthrottled scheduler; must run before the services are imported"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["GENERATION_RATE_PER_SECOND"] = "1000"
+    os.environ["GENERATION_BURST"] = "1000"
+    os.environ["GENERATION_MAX_CONCURRENCY"] = str(max(args.workers, 1))
+
+
+def install_latency(args):
+    """Stub calls cost a fixed overhead plus time proportional to the text they return"""
+    from services import llm_provider
+
+    class TimedStubProvider(llm_provider.StubProvider):
+        calls = 0
+
+        def generate(self, prompt, params=None):
+            TimedStubProvider.calls += 1
+            text = self._respond(prompt)
+            time.sleep(args.request_latency + args.char_latency * len(text))
+            return text
+
+        def stream(self, prompt, params=None):
+            TimedStubProvider.calls += 1
+            text = self._respond(prompt)
+            time.sleep(args.request_latency)
+            for i in range(0, len(text), 16):
+                time.sleep(args.char_latency * 16)
+                yield text[i:i + 16]
+
+    llm_provider.StubProvider = TimedStubProvider
+    return TimedStubProvider
+
+
+def measure(run, topics, provider_class):
+    calls = provider_class.calls
+    start = time.perf_counter()
+    results = list(run(topics))
+    elapsed = time.perf_counter() - start
+    failed = [topic for topic, questions, error in results if error]
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "topics_per_second": round(len(topics) / elapsed, 2),
+        "llm_calls": provider_class.calls - calls,
+        "failed": len(failed),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    provider_class = install_latency(args)
+
+    from services.mcq_batch import generate_mcqs_batch
+    from services.mcq_generator2 import generate_mcqs, is_error_response
+    from services.quiz_parser import parse_quiz_text
+
+    def serial(topics):
+        for topic in topics:
+            text = generate_mcqs(topic=topic, num_questions=args.questions)
+            error = text.splitlines()[0] if is_error_response(text) else None
+            yield topic, None if error else parse_quiz_text(text), error
+
+    topics = [f"batch topic {n}" for n in range(args.topics)]
+    report = {
+        "config": vars(args),
+        "serial": measure(serial, topics, provider_class),
+        "batch": measure(lambda t: generate_mcqs_batch(t, num_questions=args.questions,
+                                                       max_workers=args.workers, pack_size=1),
+                         topics, provider_class),
+        "packed": measure(lambda t: generate_mcqs_batch(t, num_questions=args.questions,
+                                                        max_workers=args.workers, pack_size=args.pack_size),
+                          topics, provider_class),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# question_bank.py
+# Quiz-serve latency with and without services.question_bank. Simulated
+# students arrive every --interval seconds and ask for a 3-question quiz on a
+# topic drawn from a skewed (Zipf-like) distribution, like a class where most
+# students pick the same few topics.
+#
+#   direct  every request calls generate_mcqs and parses the result (the old path)
+#   bank    QuestionBank.take first; a miss falls back to live generation, and
+#           popular topics are refilled in the background
+#
+# The stub LLM provider stands in for watsonx with --llm-latency seconds per call.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.question_bank --requests 300 --interval 0.2 --llm-latency 1.0
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--skew", type=float, default=1.2, help="Zipf exponent of topic popularity")
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between arrivals")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per stub generation")
+    parser.add_argument("--workers", type=int, default=4, help="background refill workers")
+    parser.add_argument("--warm", type=int, default=5, help="most popular topics pre-filled before the run")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def configure_environment(args):
+    """Stub provider, and a scheduler that does not throttle the background refills; before imports"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+    os.environ["GENERATION_RATE_PER_SECOND"] = "1000"
+    os.environ["GENERATION_BURST"] = "1000"
+    os.environ["GENERATION_MAX_CONCURRENCY"] = "16"
+
+
+def topic_requests(args):
+    random.seed(args.seed)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(args.topics)]
+    return random.choices([f"topic {n}" for n in range(args.topics)], weights, k=args.requests)
+
+
+def live_quiz(topic):
+    from services.mcq_generator2 import generate_mcqs
+    from services.quiz_parser import parse_quiz_text
+
+    return parse_quiz_text(generate_mcqs(topic=topic, num_questions=3, difficulty="medium"))
+
+
+def simulate(args, bank):
+    topics = topic_requests(args)
+    latencies, hit_latencies = [], []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def student(n, topic):
+        time.sleep(max(0.0, n * args.interval - (time.perf_counter() - start)))
+        began = time.perf_counter()
+        questions = bank.take(topic, "medium", 3) if bank else None
+        hit = questions is not None
+        if questions is None:
+            questions = live_quiz(topic)
+        if len(questions) < 3:
+            raise RuntimeError(f"got {len(questions)} questions for {topic}")
+        with lock:
+            latencies.append(time.perf_counter() - began)
+            if hit:
+                hit_latencies.append(latencies[-1])
+
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        list(executor.map(lambda item: student(*item), enumerate(topics)))
+    return {
+        "p50_ms": round(1000 * percentile(latencies, 0.5), 2),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 2),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 2),
+        "served_from_bank": len(hit_latencies),
+        "bank_hit_p50_ms": round(1000 * percentile(hit_latencies, 0.5), 3) if hit_latencies else None,
+        "wall_seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from services.question_bank import QuestionBank
+
+    bank = QuestionBank(workers=args.workers)
+    for rank in range(args.warm):
+        bank.warm(f"topic {rank}", "medium")
+    # Let the warmed pools fill before students arrive
+    deadline = time.time() + 30
+    while time.time() < deadline and sum(bank.stats()["pools"].values()) < args.warm * bank.high_water:
+        time.sleep(0.05)
+
+    report = {
+        "config": vars(args),
+        "direct": simulate(args, bank=None),
+        "bank": simulate(args, bank=bank),
+    }
+    report["bank"]["bank_stats"] = {k: v for k, v in bank.stats().items() if k != "pools"}
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
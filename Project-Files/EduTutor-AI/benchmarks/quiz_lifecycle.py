@@ -0,0 +1,218 @@
+# quiz_lifecycle.py
+# Offline load test of the whole quiz lifecycle, driven through the service
+# functions the Streamlit app calls:
+#
+#   signup -> login -> generate -> parse -> store_result -> history
+#
+# watsonx is replaced by the stub LLM provider and Pinecone by the local
+# SQLite backend, each with configurable injected latency. Passwords are
+# hashed and checked on the services.passwords process pool. Per-stage
+# p50/p95/p99 and throughput are printed as JSON.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.quiz_lifecycle
+#   python -m benchmarks.quiz_lifecycle --write-baseline
+#
+# Each run is compared with the committed baseline (benchmarks/baseline.json,
+# or --baseline) and exits with status 1 if any stage's p95 is more than
+# --tolerance slower than it, or throughput drops by more than that. A
+# baseline recorded with different options is reported but not compared.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+STAGES = ("signup", "login", "generate", "parse", "store_result", "history")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.5,
+                        help="seconds per stub generation")
+    parser.add_argument("--storage-latency", type=float, default=0.05,
+                        help="seconds added to every storage backend call")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--write-behind", action="store_true",
+                        help="journal quiz results and flush them in the background")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="compare against this baseline JSON")
+    parser.add_argument("--no-baseline", dest="baseline", action="store_const", const=None,
+                        help="skip the baseline comparison")
+    parser.add_argument("--write-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help="save this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, workdir):
+    """Point the services at local stand-ins; must run before they are imported"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "bench.sqlite3")
+    os.environ["STORAGE_WRITE_BEHIND"] = "1" if args.write_behind else "0"
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+
+class SlowBackend:
+    """Wraps a storage backend module and sleeps before every call"""
+
+    def __init__(self, backend, latency):
+        self._backend = backend
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            time.sleep(self._latency)
+            return attr(*args, **kwargs)
+        return call
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_student(n, args, passwords, storage, generate_mcqs, parse_quiz_text):
+    """One student's signup-to-history lifecycle; returns {stage: seconds}"""
+    from services.record_ids import user_id
+
+    timings = {}
+    email = f"student{n}-{uuid.uuid4().hex[:8]}@bench.local"
+    password = f"pw-{n}"
+
+    start = time.perf_counter()
+    storage.upsert_user_data(user_id(email), {
+        "email": email, "password": passwords.hash_password(password), "role": "student", "name": f"Student {n}"
+    })
+    timings["signup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    user = storage.get_user_by_email(email)
+    if not (user and passwords.verify_password(password, user["password"])[0]):
+        raise RuntimeError(f"login failed for {email}")
+    timings["login"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    quiz_text = generate_mcqs(topic=f"topic {n % 10}", num_questions=args.questions, difficulty="medium")
+    timings["generate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    questions = parse_quiz_text(quiz_text)
+    timings["parse"] = time.perf_counter() - start
+    if len(questions) < args.questions:
+        raise RuntimeError(f"got {len(questions)} questions instead of {args.questions}")
+
+    start = time.perf_counter()
+    storage.store_quiz_result(email, {
+        "topic": f"topic {n % 10}",
+        "score": sum(q["correct"] == "A" for q in questions),
+        "total": len(questions),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S")
+    })
+    timings["store_result"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    history = storage.get_quizzes_by_student(email)
+    timings["history"] = time.perf_counter() - start
+    if not history:
+        raise RuntimeError(f"stored result missing from {email}'s history")
+    return timings
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="edututor-bench-")
+    configure_environment(args, workdir)
+
+    from services import passwords, storage
+    from services.mcq_generator2 import generate_mcqs
+    from services.quiz_parser import parse_quiz_text
+
+    storage.backend = SlowBackend(storage.backend, args.storage_latency)
+    if storage.write_queue:
+        # The queue captured the unwrapped backend when storage was imported
+        storage.write_queue.write_batch = storage.backend.store_quiz_results
+
+    per_stage = {stage: [] for stage in STAGES}
+    errors = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_student, n, args, passwords, storage, generate_mcqs, parse_quiz_text)
+                   for n in range(args.students)]
+        for future in futures:
+            try:
+                for stage, seconds in future.result().items():
+                    per_stage[stage].append(seconds)
+            except Exception as e:
+                errors.append(str(e))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "write_baseline", "tolerance")},
+        "students": args.students,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round((args.students - len(errors)) / elapsed, 4),
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50_ms": round(1000 * percentile(values, 0.50), 3) if values else None,
+                "p95_ms": round(1000 * percentile(values, 0.95), 3) if values else None,
+                "p99_ms": round(1000 * percentile(values, 0.99), 3) if values else None,
+            }
+            for stage, values in per_stage.items()
+        }
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Regression messages; an empty list means the run is within tolerance"""
+    regressions = []
+    for stage, stats in baseline.get("stages", {}).items():
+        old, new = stats.get("p95_ms"), report["stages"].get(stage, {}).get("p95_ms")
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{stage} p95 {new}ms vs baseline {old}ms")
+    old, new = baseline.get("throughput_per_second"), report["throughput_per_second"]
+    if old and new < old * (1 - tolerance):
+        regressions.append(f"throughput {new}/s vs baseline {old}/s")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    status = 1 if report["errors"] else 0
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") == report["config"]:
+            report["regressions"] = compare(report, baseline, args.tolerance)
+            if report["regressions"]:
+                status = 1
+        else:
+            report["regressions"] = None
+            report["baseline_note"] = f"{args.baseline} was recorded with different options; not compared"
+    print(json.dumps(report, indent=2))
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            json.dump({k: v for k, v in report.items() if k not in ("regressions", "baseline_note")}, f, indent=2)
+            f.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# quiz_parser.py
+# Parse time of services.quiz_parser against the regex parser it replaced
+# (one re.findall to split blocks, then three searches per block), on large
+# batched outputs in the canonical Q1./A) format both parsers accept. Also
+# reports how many questions each parser recovers from the other formats the
+# generators produce (Q1: with lowercase options, Question 1) with (a)).
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.quiz_parser --questions 10,100,1000 --repeat 20
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", default="10,100,1000", help="questions per batched output")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def legacy_parse_quiz_text(quiz_text):
+    """The regex parser from before services.quiz_parser, unchanged"""
+    pattern = r"Q\d+\..*?(?=Q\d+\.|\Z)"  # Matches each question block
+    blocks = re.findall(pattern, quiz_text, re.DOTALL)
+    parsed = []
+    for block in blocks:
+        question_match = re.search(r"Q\d+\.\s*(.*?)\nA\)", block)
+        options = re.findall(r"[A-D]\)\s*(.*)", block)
+        answer_match = re.search(r"Answer:\s*([A-D])", block)
+        if question_match and options and answer_match:
+            parsed.append({
+                "question": question_match.group(1).strip(),
+                "options": options,
+                "correct": answer_match.group(1)
+            })
+    return parsed
+
+
+FORMATS = {
+    "canonical": ("Q{n}. {q}", "{letter}) {option}", "Answer: {answer}"),
+    "watsonx": ("Q{n}: {q}", "{lower}) {option}", "Answer: {answer}"),
+    "question_word": ("Question {n}) {q}", "({lower}) {option}", "Correct answer: {answer}"),
+}
+
+
+def quiz_text(count, style, rng):
+    question, option, answer = FORMATS[style]
+    blocks = []
+    for n in range(1, count + 1):
+        lines = [question.format(n=n, q=f"Which statement about concept {rng.randint(1, 10 ** 6)} is correct?")]
+        lines += [option.format(letter=letter, lower=letter.lower(), option=f"Statement {letter}{rng.randint(1, 999)}")
+                  for letter in "ABCD"]
+        lines.append(answer.format(answer=rng.choice("ABCD")))
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def best_ms(parse, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(text)
+        timings.append(time.perf_counter() - start)
+    return round(1000 * min(timings), 3)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from services.quiz_parser import parse_quiz_text
+
+    rng = random.Random(args.seed)
+    report = {"config": vars(args), "parse_ms": {}, "questions_recovered": {}}
+    for count in (int(n) for n in args.questions.split(",")):
+        text = quiz_text(count, "canonical", rng)
+        legacy, single_pass = best_ms(legacy_parse_quiz_text, text, args.repeat), best_ms(parse_quiz_text, text, args.repeat)
+        report["parse_ms"][count] = {"regex": legacy, "single_pass": single_pass,
+                                     "speedup": round(legacy / single_pass, 2)}
+    for style in FORMATS:
+        text = quiz_text(100, style, rng)
+        report["questions_recovered"][style] = {"expected": 100,
+                                                "regex": len(legacy_parse_quiz_text(text)),
+                                                "single_pass": len(parse_quiz_text(text))}
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
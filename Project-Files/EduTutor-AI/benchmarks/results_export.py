@@ -0,0 +1,148 @@
+# results_export.py
+# Educator results at scale: loads --attempts synthetic quiz results into a
+# temporary SQLite backend, then compares peak memory (ru_maxrss) and load
+# time of
+#
+#   dataframe  get_all_quiz_results() -> pandas.DataFrame -> filter (the old path)
+#   export     a filtered, memory-mapped read of services.results_export
+#
+# for the educator filters (one student, one topic, one week). Each
+# measurement runs in a fresh subprocess so peak memory is not shared.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.results_export --attempts 1000000
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+FILTERS = {
+    "all": {},
+    "student": {"email": "student7@example.edu"},
+    "topic": {"topic": "fractions"},
+    "week": {"start_date": "2025-06-01", "end_date": "2025-06-07"},
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=1000000)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--measure", nargs=2, metavar=("PATH", "FILTER"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir):
+    """Point the services at the temporary database; must run before they are imported"""
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["STORAGE_WRITE_BEHIND"] = "0"
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "bench.sqlite3")
+    os.environ["RESULTS_EXPORT_DIR"] = os.path.join(workdir, "export")
+
+
+def populate(args):
+    from services import record_ids, sqlite_store
+
+    random.seed(args.seed)
+    topics = ["fractions"] + [f"topic-{i}" for i in range(1, args.topics)]
+    start = datetime(2025, 1, 1)
+    seqs = {}
+    rows = []
+    conn = sqlite_store.get_connection()
+    for _ in range(args.attempts):
+        email = f"student{random.randrange(args.students)}@example.edu"
+        seqs[email] = seqs.get(email, 0) + 1
+        total = random.choice((3, 5, 10))
+        time_ = start + timedelta(seconds=random.randrange(args.days * 86400))
+        rows.append((record_ids.attempt_id(email, seqs[email]), email, random.choice(topics),
+                     random.randint(0, total), total, time_.strftime("%Y-%m-%d %H:%M:%S")))
+        if len(rows) == 100000:
+            with conn:
+                conn.executemany("INSERT INTO quiz_results VALUES (?, ?, ?, ?, ?, ?)", rows)
+            rows = []
+    with conn:
+        conn.executemany("INSERT INTO quiz_results VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def _peak_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measure(path, filter_name):
+    """Run in the subprocess: load the filtered results one way and report time and memory"""
+    filters = FILTERS[filter_name]
+    import pandas as pd
+
+    baseline = _peak_mb()
+    began = time.perf_counter()
+    if path == "dataframe":
+        from services import sqlite_store
+
+        df = pd.DataFrame(sqlite_store.get_all_quiz_results())
+        if "email" in filters:
+            df = df[df["email"] == filters["email"]]
+        if "topic" in filters:
+            df = df[df["topic"].str.lower() == filters["topic"]]
+        if "start_date" in filters:
+            df = df[(df["time"] >= filters["start_date"]) & (df["time"] <= f"{filters['end_date']} 23:59:59")]
+    else:
+        from services.results_export import read_results
+
+        df = read_results(**filters).to_pandas()
+    seconds = time.perf_counter() - began
+    return {"rows": len(df), "seconds": round(seconds, 3),
+            "peak_mb": _peak_mb(), "added_mb": round(_peak_mb() - baseline, 1)}
+
+
+def run_measure(path, filter_name):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.results_export", "--measure", path, filter_name],
+        check=True, capture_output=True, text=True, env=os.environ
+    ).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir)
+        began = time.perf_counter()
+        populate(args)
+        populate_seconds = time.perf_counter() - began
+
+        from services.results_export import export_results
+
+        began = time.perf_counter()
+        exported = export_results(full=True)
+        export_seconds = time.perf_counter() - began
+        export_bytes = sum(os.path.getsize(os.path.join(root, name))
+                           for root, _, names in os.walk(os.environ["RESULTS_EXPORT_DIR"])
+                           for name in names)
+        report = {
+            "config": vars(args),
+            "populate_seconds": round(populate_seconds, 1),
+            "export": {"rows": exported, "seconds": round(export_seconds, 1),
+                       "mb_on_disk": round(export_bytes / 2 ** 20, 1)},
+            "filters": {name: {path: run_measure(path, name) for path in ("dataframe", "export")}
+                        for name in FILTERS},
+        }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# semantic_index.py
+# Recall and latency of services.vector_index.LocalVectorIndex at several
+# sizes: exact scan versus IVF at a few nprobe settings, recall@k measured
+# against the exact results. Vectors are synthetic (clustered, unit length),
+# standing in for question embeddings; --embed N also times the configured
+# embedder on N question-like texts.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.semantic_index --sizes 10000,100000
+#   python -m benchmarks.semantic_index --sizes 1000000 --dim 384   # 1M x 1024 needs 4 GB of disk
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="4,16,64")
+    parser.add_argument("--questions-per-topic", type=int, default=20)
+    parser.add_argument("--embed", type=int, default=0, help="also time the embedder on this many texts")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def synthetic_batches(size, dim, per_topic, rng, batch=10000):
+    """Questions scattered around one centre per topic"""
+    centres = normalize(rng.standard_normal((max(1, size // per_topic), dim)).astype(np.float32))
+    for start in range(0, size, batch):
+        n = min(batch, size - start)
+        topics = rng.integers(0, len(centres), n)
+        noise = rng.standard_normal((n, dim)).astype(np.float32) * (0.6 / np.sqrt(dim))
+        yield start, normalize(centres[topics] + noise), centres
+
+
+def timed_search(index, queries, k, **kwargs):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.search(query, k=k, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        results.append({item_id for _, item_id, _ in matches})
+    return results, {
+        "p50_ms": round(1000 * percentile(latencies, 0.5), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+    }
+
+
+def run_size(size, args, rng):
+    from services.vector_index import LocalVectorIndex
+
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path, dim=args.dim, ivf_min_rows=size + 1)
+        start = time.perf_counter()
+        centres = None
+        for offset, vectors, centres in synthetic_batches(size, args.dim, args.questions_per_topic, rng):
+            ids = [f"q{offset + i}" for i in range(len(vectors))]
+            index.add(ids, vectors, [{"n": offset + i} for i in range(len(vectors))])
+        add_seconds = time.perf_counter() - start
+
+        # Queries are new phrasings of existing topics
+        picks = centres[rng.integers(0, len(centres), args.queries)]
+        queries = normalize(picks + rng.standard_normal(picks.shape).astype(np.float32) * (0.8 / np.sqrt(args.dim)))
+
+        truth, exact = timed_search(index, queries, args.k, exact=True)
+        start = time.perf_counter()
+        index.build_ivf()
+        build_seconds = time.perf_counter() - start
+
+        report = {"add_seconds": round(add_seconds, 2), "ivf_build_seconds": round(build_seconds, 2),
+                  "exact": exact, "ivf": {}}
+        for nprobe in (int(n) for n in args.nprobe.split(",")):
+            found, latency = timed_search(index, queries, args.k, nprobe=nprobe)
+            recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+            report["ivf"][f"nprobe={nprobe}"] = dict(latency, recall_at_k=round(float(recall), 4))
+        index.close()
+        return report
+
+
+def time_embedder(count):
+    from services.embeddings import embed_texts, get_embedder
+
+    texts = [f"Topic {i % 50}: Which statement about concept {i} is correct?" for i in range(count)]
+    embed_texts(texts[:1])  # load the model
+    start = time.perf_counter()
+    embed_texts(texts)
+    elapsed = time.perf_counter() - start
+    return {"model": get_embedder().name, "texts": count,
+            "texts_per_second": round(count / elapsed, 1)}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    report = {"config": vars(args), "sizes": {}}
+    for size in (int(s) for s in args.sizes.split(",")):
+        report["sizes"][size] = run_size(size, args, rng)
+        print(f"{size}: {json.dumps(report['sizes'][size])}", file=sys.stderr)
+    if args.embed:
+        report["embedder"] = time_embedder(args.embed)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# storage_backends.py
+# Read/write latency of the storage backends on the same workload:
+#
+#   signup  upsert_user_data            login    get_user_by_email
+#   submit  store_quiz_result           history  get_quizzes_by_student
+#   page    get_quiz_results_page (first page of one student's results)
+#
+# sqlite runs against a temporary database. pinecone talks to the index named
+# in .streamlit/secrets.toml (PINECONE_API_KEY, PINECONE_INDEX_NAME); its
+# records use bench-<run>@bench.local emails and are deleted afterwards.
+# Pinecone reads are eventually consistent, so --settle seconds pass between
+# the writes and the reads.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.storage_backends --users 50 --attempts 10
+#   python -m benchmarks.storage_backends --backends sqlite pinecone
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+OPERATIONS = ("signup", "login", "submit", "history", "page")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", choices=("sqlite", "pinecone"), default=["sqlite"])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=10, help="quiz results per user")
+    parser.add_argument("--settle", type=float, default=5.0, help="seconds between writes and reads (pinecone)")
+    return parser.parse_args(argv)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def timed(timings, operation, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings[operation].append(time.perf_counter() - start)
+    return result
+
+
+def run_backend(backend, args, settle):
+    from services import record_ids
+
+    run = uuid.uuid4().hex[:8]
+    emails = [f"bench-{run}-{n}@bench.local" for n in range(args.users)]
+    timings = {operation: [] for operation in OPERATIONS}
+    written = []
+    for email in emails:
+        written.append(record_ids.user_id(email))
+        timed(timings, "signup", backend.upsert_user_data, written[-1], {
+            "email": email, "password": "not-a-real-hash", "role": "student", "name": email})
+        for seq in range(1, args.attempts + 1):
+            written.append(record_ids.attempt_id(email, seq))
+            timed(timings, "submit", backend.store_quiz_result, email, {
+                "id": written[-1], "topic": f"topic {seq % 5}", "score": seq % 4, "total": 3,
+                "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+    time.sleep(settle)
+    missing = 0
+    for email in emails:
+        missing += timed(timings, "login", backend.get_user_by_email, email) is None
+        history = timed(timings, "history", backend.get_quizzes_by_student, email)
+        missing += len(history) < args.attempts
+        timed(timings, "page", backend.get_quiz_results_page, page_size=20, email=email)
+    return written, {
+        "incomplete_reads": missing,
+        "operations": {
+            operation: {
+                "count": len(values),
+                "p50_ms": round(1000 * percentile(values, 0.5), 3),
+                "p95_ms": round(1000 * percentile(values, 0.95), 3),
+            }
+            for operation, values in timings.items()
+        },
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ["SQLITE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="edututor-bench-"), "bench.sqlite3")
+
+    report = {"config": vars(args)}
+    for name in args.backends:
+        if name == "sqlite":
+            from services import sqlite_store as backend
+            report[name] = run_backend(backend, args, settle=0)[1]
+        else:
+            from services import pinecone_service as backend
+            written, report[name] = run_backend(backend, args, settle=args.settle)
+            for start in range(0, len(written), 1000):
+                backend.get_index().delete(ids=written[start:start + 1000])
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# storage_cache.py
+# Read-cache hit rate and latency of services.storage across Streamlit reruns.
+# Each simulated session reruns --reruns times, and every rerun makes the
+# reads a logged-in student's page makes (their user record, history and the
+# first results page); now and then (--submit-rate) a rerun submits a quiz,
+# which invalidates that student's entries. The backend is the local SQLite
+# store with --storage-latency seconds added to every call, standing in for
+# a remote round trip. Runs once with the cache and once with it disabled.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.storage_cache --sessions 40 --reruns 25 --storage-latency 0.05
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.quiz_lifecycle import SlowBackend, percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--reruns", type=int, default=25)
+    parser.add_argument("--submit-rate", type=float, default=0.1, help="share of reruns that submit a quiz")
+    parser.add_argument("--storage-latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir):
+    """Point storage at a temporary SQLite file; must run before it is imported"""
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["STORAGE_WRITE_BEHIND"] = "0"
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "bench.sqlite3")
+
+
+def session(n, args, storage, cached):
+    """One student's reruns; returns (rerun seconds, backend calls made by reads, reads)"""
+    rng = random.Random(args.seed * 1000 + n)
+    email = f"student{n}@bench.local"
+    latencies, calls, reads = [], 0, 0
+    for rerun in range(args.reruns):
+        if not cached:
+            storage.clear_cache()
+        storage.reset_backend_call_count()
+        start = time.perf_counter()
+        storage.get_user_by_email(email)
+        storage.get_quizzes_by_student(email)
+        storage.get_quiz_results_page(page_size=20, email=email)
+        reads += 3
+        read_calls = storage.get_backend_call_count()
+        if rng.random() < args.submit_rate:
+            storage.store_quiz_result(email, {"topic": "caching", "score": rng.randint(0, 3), "total": 3,
+                                              "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+        latencies.append(time.perf_counter() - start)
+        calls += read_calls
+    return latencies, calls, reads
+
+
+def run(args, storage, cached):
+    storage.clear_cache()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda n: session(n, args, storage, cached), range(args.sessions)))
+    latencies = [seconds for r in results for seconds in r[0]]
+    calls = sum(r[1] for r in results)
+    reads = sum(r[2] for r in results)
+    reruns = args.sessions * args.reruns
+    return {
+        "rerun_p50_ms": round(1000 * percentile(latencies, 0.5), 2),
+        "rerun_p95_ms": round(1000 * percentile(latencies, 0.95), 2),
+        "backend_reads_per_rerun": round(calls / reruns, 2),
+        "read_hit_rate": round(1 - calls / reads, 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(tempfile.mkdtemp(prefix="edututor-bench-"))
+
+    from services import storage
+    from services.record_ids import user_id
+
+    for n in range(args.sessions):
+        email = f"student{n}@bench.local"
+        storage.upsert_user_data(user_id(email), {"email": email, "password": "x", "role": "student"})
+    storage.backend = SlowBackend(storage.backend, args.storage_latency)
+
+    report = {
+        "config": vars(args),
+        "uncached": run(args, storage, cached=False),
+        "cached": run(args, storage, cached=True),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# streaming.py
+# Time to first question, blocking versus streaming generation, against the
+# stub LLM provider (its stream spreads --llm-latency evenly over the text,
+# like tokens arriving from watsonx).
+#
+#   blocking   generate_mcqs, then parse; the first question shows when all are done
+#   streaming  stream_mcq_questions; the first question shows when its Answer: line arrives
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.streaming --calls 20 --questions 5 --llm-latency 2.0
+
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="seconds per stub generation")
+    return parser.parse_args(argv)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def configure_environment(args):
+    """Use the stub provider; must run before the services are imported"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+
+
+def blocking(topic, args):
+    from services.mcq_generator2 import generate_mcqs
+    from services.quiz_parser import parse_quiz_text
+
+    start = time.perf_counter()
+    questions = parse_quiz_text(generate_mcqs(topic=topic, num_questions=args.questions))
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, len(questions)
+
+
+def streaming(topic, args):
+    from services.mcq_generator2 import stream_mcq_questions
+
+    start = time.perf_counter()
+    first, count = None, 0
+    for _ in stream_mcq_questions(topic=topic, num_questions=args.questions):
+        count += 1
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, count
+
+
+def summarize(results, args):
+    firsts = [first for first, _, _ in results]
+    totals = [total for _, total, _ in results]
+    if any(count < args.questions for _, _, count in results):
+        raise RuntimeError("a generation returned too few questions")
+    return {
+        "first_question_p50_ms": round(1000 * percentile(firsts, 0.5), 1),
+        "first_question_p95_ms": round(1000 * percentile(firsts, 0.95), 1),
+        "total_p50_ms": round(1000 * percentile(totals, 0.5), 1),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    report = {"config": vars(args)}
+    for name, run in (("blocking", blocking), ("streaming", streaming)):
+        report[name] = summarize([run(f"topic {n}", args) for n in range(args.calls)], args)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# token_budget.py
+# Tokens generated and latency per quiz before and after adaptive budgets:
+#
+#   fixed     the old call: MCQ_PARAMS (max 1000 / min 200 tokens, ###/---
+#             stops), whole response read before parsing
+#   adaptive  generate_mcqs: budget from tokens-per-question history, a
+#             "Q<n+1>." stop sequence and early stop after n Answer: lines
+#
+# Both replay the same recorded responses. The provider cuts each one where
+# the server would stop: at max_new_tokens, or at a stop sequence once
+# min_new_tokens are out. --recording takes a file written with
+# LLM_RECORD_FILE; prompts it lacks (or all of them, without one) get stub
+# quizzes that run on for --run-on questions past the requested count, as
+# the model does. Every generated token costs --token-latency seconds.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.token_budget --topics 40 --questions 3
+#   LLM_RECORD_FILE=recorded.jsonl streamlit run app.py   # then:
+#   python -m benchmarks.token_budget --recording recorded.jsonl
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from benchmarks.quiz_lifecycle import percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topics", type=int, default=40)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--recording", help="jsonl written by LLM_RECORD_FILE")
+    parser.add_argument("--run-on", type=int, default=3, help="extra questions in synthesized responses")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="seconds per generated token")
+    return parser.parse_args(argv)
+
+
+def configure_environment():
+    """Stub provider, so the replay provider below is used; must run before the services are imported"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_SECONDS"] = "0"
+
+
+def load_recording(path):
+    recorded = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recorded[record["prompt"]] = record["response"]
+    return recorded
+
+
+def install_replay(args, recorded):
+    """Serve recorded responses, truncated and timed the way the server would generate them"""
+    from services import llm_provider
+    from services.mcq_generator2 import CHARS_PER_TOKEN
+
+    class BudgetedReplayProvider(llm_provider.StubProvider):
+        tokens = 0
+
+        def _respond(self, prompt):
+            if prompt in recorded:
+                return recorded[prompt]
+            # The model runs on past the requested questions
+            return super()._respond(re.sub(r"Generate (\d+)", lambda m: f"Generate {int(m.group(1)) + args.run_on}",
+                                           prompt, count=1))
+
+        def _generated(self, prompt, params):
+            text = self._respond(prompt)
+            params = params or {}
+            end = min(len(text), params.get("max_new_tokens", 10 ** 6) * CHARS_PER_TOKEN)
+            floor = params.get("min_new_tokens", 0) * CHARS_PER_TOKEN
+            for stop in params.get("stop_sequences", []):
+                at = text.find(stop, floor)
+                if at != -1:
+                    end = min(end, at)
+            return text[:end]
+
+        def _emit(self, text):
+            BudgetedReplayProvider.tokens += len(text) / CHARS_PER_TOKEN
+            time.sleep(args.token_latency * len(text) / CHARS_PER_TOKEN)
+
+        def generate(self, prompt, params=None):
+            text = self._generated(prompt, params)
+            self._emit(text)
+            return text
+
+        def stream(self, prompt, params=None):
+            text = self._generated(prompt, params)
+            step = 4 * CHARS_PER_TOKEN
+            for i in range(0, len(text), step):
+                self._emit(text[i:i + step])
+                yield text[i:i + step]
+
+    llm_provider.StubProvider = BudgetedReplayProvider
+    return BudgetedReplayProvider
+
+
+def fixed_budget(topic, num_questions):
+    """The generation call as it was before adaptive budgets"""
+    from services.mcq_generator2 import MCQ_PARAMS, get_mcq_chain
+
+    return get_mcq_chain(params=MCQ_PARAMS).invoke({"topic": topic, "num_questions": num_questions,
+                                                    "difficulty": "Medium", "question_type": "General"})
+
+
+def adaptive_budget(topic, num_questions):
+    from services.mcq_generator2 import generate_mcqs
+
+    return generate_mcqs(topic, num_questions, "Medium")
+
+
+def run(args, generate, provider_class):
+    from services.quiz_parser import parse_quiz_text
+
+    provider_class.tokens = 0
+    latencies, complete = [], 0
+    for n in range(args.topics):
+        start = time.perf_counter()
+        text = generate(f"topic {n}", args.questions)
+        latencies.append(time.perf_counter() - start)
+        complete += len(parse_quiz_text(text)) >= args.questions
+    return {
+        "tokens_per_quiz": round(provider_class.tokens / args.topics, 1),
+        "latency_p50_ms": round(1000 * percentile(latencies, 0.5), 1),
+        "latency_p95_ms": round(1000 * percentile(latencies, 0.95), 1),
+        "complete_quizzes": complete,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment()
+    provider_class = install_replay(args, load_recording(args.recording))
+
+    from services.mcq_generator2 import clear_mcq_chains, generation_params, get_token_stats
+
+    report = {"config": vars(args), "fixed": run(args, fixed_budget, provider_class)}
+    clear_mcq_chains()
+    report["adaptive"] = run(args, adaptive_budget, provider_class)
+    stats = get_token_stats()
+    report["adaptive"].update(early_stops=stats["early_stops"], tokens_per_question=round(stats["tokens_per_question"], 1),
+                              max_new_tokens=generation_params(args.questions)["max_new_tokens"])
+    report["tokens_saved_per_quiz"] = round(report["fixed"]["tokens_per_quiz"]
+                                            - report["adaptive"]["tokens_per_quiz"], 1)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
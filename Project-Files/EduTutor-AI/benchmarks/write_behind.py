@@ -0,0 +1,94 @@
+# write_behind.py
+# Submit latency and write throughput of quiz results, synchronous versus
+# through services.write_behind. --students concurrent students each submit
+# --submits results to the local SQLite store with --storage-latency seconds
+# added to every backend call (a remote upsert). Throughput counts until
+# every result is in the backend, so the write-behind run includes draining
+# its journal.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m benchmarks.write_behind --students 50 --submits 5 --storage-latency 0.08
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.quiz_lifecycle import SlowBackend, percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--submits", type=int, default=5, help="results per student")
+    parser.add_argument("--storage-latency", type=float, default=0.08)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--flush-seconds", type=float, default=0.5)
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir):
+    """Point storage at a temporary SQLite file; must run before it is imported"""
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["STORAGE_WRITE_BEHIND"] = "0"
+    os.environ["SQLITE_DB_PATH"] = os.path.join(workdir, "bench.sqlite3")
+
+
+def run(args, mode, submit, drained):
+    from services.record_ids import attempt_id
+
+    def student(n):
+        email = f"{mode}-student{n}@bench.local"
+        latencies = []
+        for seq in range(1, args.submits + 1):
+            start = time.perf_counter()
+            submit(email, {"id": attempt_id(email, seq), "topic": "write-behind", "score": seq % 4,
+                           "total": 3, "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.students) as executor:
+        latencies = [s for result in executor.map(student, range(args.students)) for s in result]
+    while not drained():
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    return {
+        "submit_p50_ms": round(1000 * percentile(latencies, 0.5), 2),
+        "submit_p95_ms": round(1000 * percentile(latencies, 0.95), 2),
+        "results_per_second": round(len(latencies) / elapsed, 1),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(tempfile.mkdtemp(prefix="edututor-bench-"))
+
+    from services import sqlite_store
+    from services.write_behind import WriteBehindQueue
+
+    backend = SlowBackend(sqlite_store, args.storage_latency)
+    queue = WriteBehindQueue(backend.store_quiz_results, batch_size=args.batch_size,
+                             flush_interval=args.flush_seconds)
+    total = args.students * args.submits
+
+    def stored(mode):
+        return lambda: sqlite_store.get_connection().execute(
+            "SELECT COUNT(*) FROM quiz_results WHERE email LIKE ?", (f"{mode}-%",)).fetchone()[0] >= total
+
+    report = {
+        "config": vars(args),
+        "synchronous": run(args, "synchronous", backend.store_quiz_result, stored("synchronous")),
+        "write_behind": run(args, "write_behind", queue.enqueue, stored("write_behind")),
+    }
+    report["write_behind"]["flushes"] = queue.stats()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
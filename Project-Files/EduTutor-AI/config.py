@@ -4,5 +4,6 @@ import streamlit as st
 
 load_dotenv()
 
-JWT_SECRET = st.secrets["JWT_SECRET"]
-JWT_ALGORITHM = st.secrets["JWT_ALGORITHM"] 
\ No newline at end of file
+# Environment variables (e.g. from .env) take precedence over Streamlit secrets
+JWT_SECRET = os.getenv("JWT_SECRET") or st.secrets["JWT_SECRET"]
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM") or st.secrets["JWT_ALGORITHM"]
@@ -0,0 +1,99 @@
+# async_storage.py
+# Non-blocking user lookups for the FastAPI routers.
+#
+# With STORAGE_BACKEND=pinecone the native asyncio Pinecone client is used:
+# one pooled HTTP client per event loop, and users are fetched by their
+# record id (record_ids.user_id) rather than a filtered query. Otherwise the
+# synchronous services.storage calls run on a bounded thread pool; each
+# worker keeps its own SQLite connection, so the pool doubles as the
+# connection pool.
+#
+#   STORAGE_ASYNC_POOL_SIZE=8
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from services import record_ids, storage
+from services.metrics import span
+
+STORAGE_ASYNC_POOL_SIZE = int(os.getenv("STORAGE_ASYNC_POOL_SIZE", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=STORAGE_ASYNC_POOL_SIZE, thread_name_prefix="storage-async")
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking storage call on the storage pool"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+class PineconeAsyncUsers:
+    """User records through the asyncio Pinecone client, opened lazily per event loop"""
+
+    def __init__(self):
+        self._clients = {}  # loop -> (client, index)
+
+    async def _index(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            import streamlit as st
+            from pinecone import PineconeAsyncio
+
+            client = PineconeAsyncio(api_key=st.secrets["PINECONE_API_KEY"])
+            description = await client.describe_index(st.secrets["PINECONE_INDEX_NAME"])
+            index = client.IndexAsyncio(host=description.host)
+            if loop in self._clients:
+                # Another request opened one while we awaited
+                await index.close()
+                await client.close()
+            else:
+                self._clients[loop] = (client, index)
+        return self._clients[loop][1]
+
+    async def get_user_by_email(self, email):
+        key = record_ids.user_id(email)
+        record = (await (await self._index()).fetch(ids=[key])).vectors.get(key)
+        return record.metadata if record is not None else None
+
+    async def update_user_password(self, email, hashed_password):
+        await (await self._index()).update(id=record_ids.user_id(email),
+                                           set_metadata={"password": hashed_password})
+        storage.invalidate(email)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        client, index = self._clients.pop(loop, (None, None))
+        if index is not None:
+            await index.close()
+            await client.close()
+
+
+class PooledUsers:
+    """The synchronous storage API on the storage thread pool"""
+
+    async def get_user_by_email(self, email):
+        return await run_blocking(storage.get_user_by_email, email)
+
+    async def update_user_password(self, email, hashed_password):
+        await run_blocking(storage.update_user_password, email, hashed_password)
+
+    async def close(self):
+        pass
+
+
+users = PineconeAsyncUsers() if storage.STORAGE_BACKEND == "pinecone" else PooledUsers()
+
+
+async def get_user_by_email(email):
+    with span("storage.async_get_user"):
+        return await users.get_user_by_email(email)
+
+
+async def update_user_password(email, hashed_password):
+    with span("storage.async_update_user_password"):
+        await users.update_user_password(email, hashed_password)
+
+
+async def close():
+    """Release the async client of the running loop (call from the app's shutdown hook)"""
+    await users.close()
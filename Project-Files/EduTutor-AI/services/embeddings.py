@@ -0,0 +1,124 @@
+# embeddings.py
+# Local CPU text embeddings for semantic question retrieval.
+#
+#   EMBEDDING_MODEL=BAAI/bge-large-en-v1.5   sentence-transformers model (1024-d,
+#                                            the Pinecone index dimension);
+#                                            "hashing" for the dependency-free fallback
+#   EMBEDDING_BATCH_SIZE=32
+
+import os
+import re
+import threading
+import zlib
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+HASHING_DIM = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and character trigrams; lexical, but needs no model"""
+
+    name = "hashing"
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+
+    def _features(self, text):
+        words = _WORD.findall(text.lower())
+        for word in words:
+            yield word
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+        for first, second in zip(words, words[1:]):
+            yield f"{first} {second}"
+
+    def embed(self, texts):
+        import numpy as np
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """A sentence-transformers model run on the CPU"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        import numpy as np
+        vectors = self._model.encode(list(texts), batch_size=EMBEDDING_BATCH_SIZE,
+                                     normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32, copy=False)
+
+
+def _normalize(vectors):
+    import numpy as np
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+_embedder = None
+_embedder_error = None
+_embedder_lock = threading.Lock()
+_warm_thread = None
+_warm_lock = threading.Lock()  # not _embedder_lock, which the loading thread holds
+
+
+def get_embedder(wait=True):
+    """
+    The process-wide embedder, loaded on first use; None if the model cannot be
+    loaded. With wait=False a model that is not loaded yet starts loading in the
+    background (warm_embedder) and None is returned, so requests never wait on
+    the (possibly downloading) model.
+    """
+    global _embedder, _embedder_error
+    if _embedder is None and _embedder_error is None:
+        if not wait and EMBEDDING_MODEL != "hashing":
+            warm_embedder()
+            return None
+        with _embedder_lock:
+            if _embedder is None and _embedder_error is None:
+                if EMBEDDING_MODEL == "hashing":
+                    _embedder = HashingEmbedder()
+                else:
+                    try:
+                        _embedder = SentenceTransformerEmbedder()
+                    except Exception as e:
+                        # Missing package, failed download or a broken model file. The
+                        # failure is kept so later cache misses do not retry the load;
+                        # callers skip semantic retrieval and generate instead.
+                        print(f"⚠️ Could not load embedding model {EMBEDDING_MODEL}: {e}; "
+                              "semantic retrieval is off")
+                        _embedder_error = e
+    return _embedder
+
+
+def warm_embedder():
+    """Start loading the embedder on a background thread (once)"""
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=get_embedder, name="embedder-warmup", daemon=True)
+            _warm_thread.start()
+    return _warm_thread
+
+
+def embed_texts(texts):
+    """Unit-length float32 vectors, one row per text"""
+    embedder = get_embedder()
+    if embedder is None:
+        raise RuntimeError(f"embedding model {EMBEDDING_MODEL} is unavailable: {_embedder_error}")
+    return embedder.embed(list(texts))
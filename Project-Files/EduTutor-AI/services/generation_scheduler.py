@@ -0,0 +1,244 @@
+# generation_scheduler.py
+# Admission control for LLM generation. Every generation that will reach the
+# provider waits here for a slot:
+#   - at most GENERATION_MAX_CONCURRENCY run at once,
+#   - starts are paced by a token bucket (GENERATION_RATE_PER_SECOND, burst
+#     GENERATION_BURST) kept under the provider's rate limit,
+#   - waiting requests are served round-robin across classes, then across
+#     users within a class, so one busy class or user cannot starve the rest,
+#   - when the queue is full the request is refused with a retry-after
+#     estimate instead of joining a queue it would time out in.
+#
+#   GENERATION_MAX_CONCURRENCY=4  GENERATION_RATE_PER_SECOND=2  GENERATION_BURST=4
+#   GENERATION_MAX_QUEUE=200  GENERATION_MAX_QUEUE_PER_USER=8
+#   GENERATION_QUEUE_TIMEOUT_SECONDS=120
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from services.metrics import inc, span
+
+MAX_CONCURRENCY = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))
+RATE_PER_SECOND = float(os.getenv("GENERATION_RATE_PER_SECOND", "2"))
+BURST = int(os.getenv("GENERATION_BURST", "4"))
+MAX_QUEUE = int(os.getenv("GENERATION_MAX_QUEUE", "200"))
+MAX_QUEUE_PER_USER = int(os.getenv("GENERATION_MAX_QUEUE_PER_USER", "8"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("GENERATION_QUEUE_TIMEOUT_SECONDS", "120"))
+# How often waiters wake to report their queue position
+POSITION_POLL_SECONDS = 0.5
+
+
+class GenerationOverloaded(Exception):
+    """The generation queue is full or the wait timed out; retry_after is in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        if self.rate <= 0:
+            return 0
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class Ticket:
+    __slots__ = ("user", "group", "enqueued", "granted")
+
+    def __init__(self, user, group):
+        self.user = user
+        self.group = group
+        self.enqueued = time.monotonic()
+        self.granted = False
+
+
+class GenerationScheduler:
+    """Concurrency cap + token bucket + fair (class, then user) round-robin queue"""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, rate=RATE_PER_SECOND, burst=BURST,
+                 max_queue=MAX_QUEUE, max_queue_per_user=MAX_QUEUE_PER_USER,
+                 queue_timeout=QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.avg_seconds = 5.0  # moving average of generation time
+        # group -> user -> deque of tickets; both levels rotate round-robin
+        self._queues = OrderedDict()
+        self._cond = threading.Condition()
+        self._refill_wait = 0
+
+    def _throughput(self):
+        """Generations started per second at steady state"""
+        by_slots = self.max_concurrency / max(self.avg_seconds, 0.01)
+        return min(by_slots, self.bucket.rate) if self.bucket.rate > 0 else by_slots
+
+    def _retry_after(self, ahead):
+        return max(1, math.ceil(ahead / self._throughput()))
+
+    def _order(self):
+        """Waiting tickets in the order they will be granted"""
+        lanes = [[deque(tickets) for tickets in users.values()] for users in self._queues.values()]
+        order = []
+        while any(lanes):
+            for group in lanes:
+                if not group:
+                    continue
+                user = group.pop(0)
+                order.append(user.popleft())
+                if user:
+                    group.append(user)
+            lanes = [group for group in lanes if group]
+        return order
+
+    def _submit(self, user, group):
+        users = self._queues.get(group, {})
+        pending = len(users.get(user, ()))
+        if self.queued >= self.max_queue or pending >= self.max_queue_per_user:
+            self.shed += 1
+            inc("generation.shed")
+            raise GenerationOverloaded("Quiz generation is busy, please try again shortly",
+                                       self._retry_after(self.queued))
+        ticket = Ticket(user, group)
+        self._queues.setdefault(group, OrderedDict()).setdefault(user, deque()).append(ticket)
+        self.queued += 1
+        return ticket
+
+    def _dispatch(self):
+        """Grant waiting tickets while slots and tokens allow (lock held)"""
+        self._refill_wait = 0
+        while self._queues and self.running < self.max_concurrency:
+            wait = self.bucket.try_take()
+            if wait:
+                self._refill_wait = wait
+                return
+            group, users = next(iter(self._queues.items()))
+            user, tickets = next(iter(users.items()))
+            ticket = tickets.popleft()
+            # Rotate: this user to the back of its class, this class to the back
+            del users[user]
+            if tickets:
+                users[user] = tickets
+            del self._queues[group]
+            if users:
+                self._queues[group] = users
+            ticket.granted = True
+            self.queued -= 1
+            self.running += 1
+            self.admitted += 1
+            self._cond.notify_all()
+
+    def _withdraw(self, ticket):
+        users = self._queues.get(ticket.group)
+        tickets = users.get(ticket.user) if users else None
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            self.queued -= 1
+            if not tickets:
+                del users[ticket.user]
+            if not users:
+                del self._queues[ticket.group]
+
+    def position(self, ticket):
+        """1-based place in the queue, or 0 once granted"""
+        with self._cond:
+            if ticket.granted:
+                return 0
+            return next((i for i, t in enumerate(self._order(), start=1) if t is ticket), 0)
+
+    @contextmanager
+    def admit(self, user, class_id="default", on_wait=None):
+        """
+        Hold a generation slot for the duration of the block.
+        on_wait(position, retry_after) is called while queued.
+        Raises GenerationOverloaded when shed or when the wait times out.
+        """
+        with self._cond:
+            ticket = self._submit(user, class_id)
+            self._dispatch()
+        try:
+            with span("generation.queue_wait"):
+                self._wait(ticket, on_wait)
+        except BaseException:
+            with self._cond:
+                self._withdraw(ticket)
+            if ticket.granted:
+                self._release(0)
+            raise
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    def _wait(self, ticket, on_wait):
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            with self._cond:
+                self._dispatch()
+                if ticket.granted:
+                    return
+                if time.monotonic() >= deadline:
+                    self.shed += 1
+                    inc("generation.timeouts")
+                    raise GenerationOverloaded("Timed out waiting for a generation slot",
+                                               self._retry_after(self.queued))
+            if on_wait:
+                position = self.position(ticket)
+                if position:
+                    on_wait(position, self._retry_after(position))
+            with self._cond:
+                if not ticket.granted:
+                    remaining = max(0.0, deadline - time.monotonic())
+                    self._cond.wait(min(remaining, self._refill_wait or POSITION_POLL_SECONDS,
+                                        POSITION_POLL_SECONDS))
+
+    def _release(self, seconds):
+        with self._cond:
+            self.running -= 1
+            if seconds:
+                self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+            self._dispatch()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"running": self.running, "queued": self.queued, "admitted": self.admitted,
+                    "shed": self.shed, "avg_seconds": round(self.avg_seconds, 3)}
+
+
+scheduler = GenerationScheduler()
+
+
+def class_of(email):
+    """Scheduling class for a user without an explicit one: their email domain (school)"""
+    return str(email or "").rpartition("@")[2].lower() or "default"
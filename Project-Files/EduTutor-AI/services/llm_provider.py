@@ -0,0 +1,335 @@
+# llm_provider.py
+# One client layer for every text generation call. Providers share the same
+# two methods, generate(prompt, params) and stream(prompt, params):
+#
+#   LLM_PROVIDER=watsonx  IBM watsonx.ai REST API over a pooled HTTP session (default)
+#   LLM_PROVIDER=stub     deterministic offline quizzes, for load tests on a CPU-only box
+#   LLM_PROVIDER=replay   responses recorded in LLM_REPLAY_FILE, stub output on a miss
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from services.metrics import inc, span
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "watsonx").lower()
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY_SECONDS", "0"))
+LLM_REPLAY_FILE = os.getenv("LLM_REPLAY_FILE", "llm_replay.jsonl")
+
+WATSONX_API_VERSION = "2023-05-29"
+IAM_TOKEN_URL = "https://iam.cloud.ibm.com/identity/token"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """A generation request failed"""
+
+
+class ProviderUnavailable(ProviderError):
+    """The circuit breaker is open; retry_after is in seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures, then lets one trial call through per cooldown"""
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                inc("llm.breaker_rejections")
+                raise ProviderUnavailable("LLM provider circuit is open", remaining)
+            # Half-open: let this call through, re-open right away if it fails
+            self.opened_at = None
+            self.failures = self.threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class WatsonxProvider:
+    """watsonx.ai text generation with a pooled session, IAM token refresh, retries and a breaker"""
+
+    name = "watsonx"
+
+    def __init__(self, model_id, url, apikey, project_id, timeout=LLM_TIMEOUT_SECONDS,
+                 max_retries=LLM_MAX_RETRIES, pool_size=LLM_POOL_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.model_id = model_id
+        self.url = url.rstrip("/")
+        self.apikey = apikey
+        self.project_id = project_id
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = threading.Lock()
+
+    def _get_token(self):
+        """IAM bearer token, refreshed lazily a minute before it expires"""
+        with self._token_lock:
+            if self._token is None or time.time() > self._token_expires - 60:
+                with span("llm.iam_token"):
+                    response = self.session.post(IAM_TOKEN_URL, data={
+                        "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
+                        "apikey": self.apikey
+                    }, timeout=self.timeout)
+                response.raise_for_status()
+                token = response.json()
+                self._token = token["access_token"]
+                self._token_expires = token.get("expiration", time.time() + 3600)
+            return self._token
+
+    def _body(self, prompt, params):
+        body = {"model_id": self.model_id, "input": prompt, "parameters": params or {}}
+        if self.project_id:
+            body["project_id"] = self.project_id
+        return body
+
+    def _post(self, path, prompt, params, stream=False):
+        """POST with retry/backoff on connection errors, timeouts, 429 and 5xx"""
+        import requests
+
+        self.breaker.before_call()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    f"{self.url}{path}",
+                    params={"version": WATSONX_API_VERSION},
+                    json=self._body(prompt, params),
+                    headers={"Authorization": f"Bearer {self._get_token()}"},
+                    timeout=self.timeout,
+                    stream=stream
+                )
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    self.breaker.record_success()
+                    return response
+                last_error = ProviderError(f"watsonx returned HTTP {response.status_code}")
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = ProviderError(f"watsonx request failed: {e}")
+            except requests.HTTPError as e:
+                self.breaker.record_failure()
+                raise ProviderError(f"watsonx request failed: {e}") from e
+            if attempt < self.max_retries:
+                inc("llm.retries")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() \
+                    else 0.5 * 2 ** attempt * random.uniform(0.5, 1.5)
+                time.sleep(min(delay, 30))
+        self.breaker.record_failure()
+        raise last_error
+
+    def generate(self, prompt, params=None):
+        response = self._post("/ml/v1/text/generation", prompt, params)
+        return response.json().get("results", [{}])[0].get("generated_text", "")
+
+    def stream(self, prompt, params=None):
+        response = self._post("/ml/v1/text/generation_stream", prompt, params, stream=True)
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):].strip() or "{}")
+                text = event.get("results", [{}])[0].get("generated_text", "")
+                if text:
+                    yield text
+
+
+class StubProvider:
+    """Deterministic, offline quiz text in the format the prompts ask for"""
+
+    name = "stub"
+
+    def __init__(self, latency=STUB_LLM_LATENCY):
+        self.latency = latency
+
+    def _quiz(self, topic, count, seed):
+        rng = random.Random(f"{seed}|{topic}")
+        blocks = []
+        for i in range(1, count + 1):
+            n = rng.randint(1, 10 ** 6)
+            blocks.append(
+                f"Q{i}. Which statement about {topic} is correct? (#{n})\n"
+                f"A) Statement {n} one\nB) Statement {n} two\n"
+                f"C) Statement {n} three\nD) Statement {n} four\n"
+                f"Answer: {'ABCD'[n % 4]}"
+            )
+        return "\n\n".join(blocks)
+
+    def _respond(self, prompt):
+        seed = hashlib.sha256(prompt.encode()).hexdigest()
+        count_match = re.search(r"Generate (\d+)", prompt)
+        count = int(count_match.group(1)) if count_match else 3
+        packed = re.search(r"for EACH of these topics:\n((?:- .*\n?)+)", prompt)
+        if packed:
+            topics = [t[2:].strip() for t in packed.group(1).splitlines() if t.startswith("- ")]
+            return "\n\n".join(f"Topic: {t}\n{self._quiz(t, count, seed)}" for t in topics)
+        topic_match = re.search(r'topic "([^"]*)"', prompt) or re.search(r"topic \"?(.+?)\"?\.", prompt)
+        return self._quiz(topic_match.group(1) if topic_match else "the topic", count, seed)
+
+    def generate(self, prompt, params=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    def stream(self, prompt, params=None):
+        text = self._respond(prompt)
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+def prompt_key(prompt, params=None):
+    return hashlib.sha256(json.dumps([prompt, params or {}], sort_keys=True).encode()).hexdigest()
+
+
+class ReplayProvider:
+    """Serve responses recorded by RecordingProvider; unknown prompts get stub output"""
+
+    name = "replay"
+
+    def __init__(self, path=LLM_REPLAY_FILE, fallback=None, latency=STUB_LLM_LATENCY):
+        self.fallback = fallback or StubProvider(latency=latency)
+        self.latency = latency
+        self.responses = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record["key"]] = record["response"]
+
+    def generate(self, prompt, params=None):
+        response = self.responses.get(prompt_key(prompt, params))
+        if response is None:
+            return self.fallback.generate(prompt, params)
+        if self.latency:
+            time.sleep(self.latency)
+        return response
+
+    def stream(self, prompt, params=None):
+        response = self.responses.get(prompt_key(prompt, params))
+        if response is None:
+            yield from self.fallback.stream(prompt, params)
+            return
+        for i in range(0, len(response), 16):
+            yield response[i:i + 16]
+
+
+class RecordingProvider:
+    """Wrap a provider and append every response to a replay file"""
+
+    def __init__(self, provider, path=LLM_REPLAY_FILE):
+        self.provider = provider
+        self.name = provider.name
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, prompt, params, response):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": prompt_key(prompt, params), "prompt": prompt,
+                                "response": response}) + "\n")
+
+    def generate(self, prompt, params=None):
+        response = self.provider.generate(prompt, params)
+        self._record(prompt, params, response)
+        return response
+
+    def stream(self, prompt, params=None):
+        chunks = []
+        for chunk in self.provider.stream(prompt, params):
+            chunks.append(chunk)
+            yield chunk
+        self._record(prompt, params, "".join(chunks))
+
+
+class PromptChain:
+    """prompt template + provider + params, with the invoke/stream interface callers use"""
+
+    def __init__(self, template, provider, params):
+        self.template = template
+        self.provider = provider
+        self.params = params
+
+    def invoke(self, inputs):
+        with span("llm.generate"):
+            return self.provider.generate(self.template.format(**inputs), self.params)
+
+    def stream(self, inputs):
+        # The span covers the whole stream, including time the caller spends between chunks
+        with span("llm.stream"):
+            yield from self.provider.stream(self.template.format(**inputs), self.params)
+
+
+# Providers hold the HTTP session and token, so one per model/endpoint per process
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(model_id, url=None, apikey=None, project_id=None, name=LLM_PROVIDER):
+    key = (name, model_id, url, project_id)
+    provider = _providers.get(key)
+    if provider is not None:
+        return provider
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            if name == "watsonx":
+                provider = WatsonxProvider(model_id, url, apikey, project_id)
+            elif name == "stub":
+                provider = StubProvider()
+            elif name == "replay":
+                provider = ReplayProvider()
+            else:
+                raise ValueError(f"Unknown LLM_PROVIDER: {name}")
+            if os.getenv("LLM_RECORD_FILE"):
+                provider = RecordingProvider(provider, os.getenv("LLM_RECORD_FILE"))
+            _providers[key] = provider
+    return provider
+
+
+def clear_providers():
+    with _providers_lock:
+        _providers.clear()
@@ -0,0 +1,136 @@
+# mcq_batch.py
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services.generation_scheduler import GenerationOverloaded, scheduler
+from services.mcq_generator2 import (MCQ_PARAMS, generate_mcqs, get_mcq_chain,
+                                     generation_params, is_error_response, repair_questions)
+from services.quiz_parser import parse_quiz_text
+
+BATCH_MAX_WORKERS = int(os.getenv("MCQ_BATCH_MAX_WORKERS", "4"))
+BATCH_RETRIES = int(os.getenv("MCQ_BATCH_RETRIES", "2"))
+
+PACKED_TEMPLATE = """Generate {num_questions} multiple choice questions for EACH of these topics:
+{topic_list}
+
+Each question should be based on {difficulty} level.
+Start every topic with a line "Topic: <topic name>" and then follow this exact format:
+
+Topic: <topic name>
+Q1. <question>
+A) <option 1>
+B) <option 2>
+C) <option 3>
+D) <option 4>
+Answer: <A/B/C/D>
+
+Continue for all {num_questions} questions of every topic.
+
+Start generating:"""
+
+_topic_header = re.compile(r"^\s*Topic:\s*(.+?)\s*$", re.MULTILINE)
+
+
+def split_packed_response(text, topics):
+    """Split a packed response into {topic: quiz_text} using the Topic: headers"""
+    wanted = {t.strip().lower(): t for t in topics}
+    headers = list(_topic_header.finditer(text))
+    sections = {}
+    for i, header in enumerate(headers):
+        topic = wanted.get(header.group(1).strip().strip('"').lower())
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        if topic:
+            sections[topic] = text[header.end():end].strip()
+    return sections
+
+
+def _generate_packed(topics, num_questions, difficulty):
+    """One LLM call for several topics; returns {topic: valid questions} (may be short)"""
+    params = generation_params(num_questions * len(topics), slack=100)
+    params["min_new_tokens"] = 0
+    params["stop_sequences"] = MCQ_PARAMS["stop_sequences"]
+    chain = get_mcq_chain(params=params, template=PACKED_TEMPLATE)
+    text = chain.invoke({
+        "topic_list": "\n".join(f"- {t}" for t in topics),
+        "num_questions": num_questions,
+        "difficulty": difficulty
+    })
+    return {topic: parse_quiz_text(section)
+            for topic, section in split_packed_response(text or "", topics).items()}
+
+
+def _admitted(user, class_id, fn, *args):
+    """Run one provider call in its own generation scheduler slot"""
+    with scheduler.admit(user, class_id):
+        return fn(*args)
+
+
+def _overloaded(e):
+    return f"{e} (retry in {e.retry_after}s)"
+
+
+def _generate_single(user, class_id, topic, num_questions, difficulty, retries):
+    """generate_mcqs for one topic with retries; returns (questions, error)"""
+    error = None
+    for _ in range(retries + 1):
+        quiz_text = _admitted(user, class_id, generate_mcqs, topic, num_questions, difficulty)
+        if is_error_response(quiz_text):
+            error = quiz_text.splitlines()[0]
+            continue
+        questions = parse_quiz_text(quiz_text)
+        if len(questions) >= num_questions:
+            return questions[:num_questions], None
+        error = f"Got {len(questions)} valid questions instead of {num_questions}"
+    return None, error
+
+
+def _run_group(user, class_id, group, num_questions, difficulty, retries):
+    """
+    Generate a group of topics, packed if it has several; short topics are repaired, then retried alone.
+    Every provider call (packed, repair, retry) waits for its own scheduler slot, so a
+    group never holds a slot between calls.
+    """
+    results = {}
+    if len(group) > 1:
+        try:
+            results = _admitted(user, class_id, _generate_packed, group, num_questions, difficulty)
+        except GenerationOverloaded as e:
+            return [(topic, None, _overloaded(e)) for topic in group]
+        except Exception as e:
+            print("⚠️ Packed generation failed, falling back per topic:", str(e))
+    out = []
+    for topic in group:
+        try:
+            questions = results.get(topic)
+            if questions and len(questions) < num_questions:
+                questions = _admitted(user, class_id, repair_questions, topic, num_questions, difficulty, questions)
+            if questions and len(questions) >= num_questions:
+                out.append((topic, questions[:num_questions], None))
+            else:
+                questions, error = _generate_single(user, class_id, topic, num_questions, difficulty, retries)
+                out.append((topic, questions, error))
+        except GenerationOverloaded as e:
+            out.append((topic, None, _overloaded(e)))
+    return out
+
+
+def generate_mcqs_batch(topics, num_questions=3, difficulty="Medium",
+                        max_workers=BATCH_MAX_WORKERS, pack_size=1, retries=BATCH_RETRIES,
+                        user="anonymous", class_id="default"):
+    """
+    Generate quizzes for many topics with bounded concurrency.
+    Yields (topic, questions, error) as each topic finishes; questions is None on failure.
+    pack_size > 1 asks for that many topics in a single prompt.
+    Each provider call waits for a generation scheduler slot as user/class_id.
+    """
+    topics = list(dict.fromkeys(t.strip() for t in topics if t and t.strip()))
+    pack_size = max(1, pack_size)
+    groups = [topics[i:i + pack_size] for i in range(0, len(topics), pack_size)]
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcq-batch") as executor:
+        futures = [executor.submit(_run_group, user, class_id, g, num_questions, difficulty, retries)
+                   for g in groups]
+        for future in as_completed(futures):
+            yield from future.result()
@@ -0,0 +1,330 @@
+# mcq_cache.py
+
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from services.mcq_generator2 import generate_mcqs, is_error_response, stream_mcq_questions
+from services.quiz_parser import format_quiz_text, parse_quiz_text, shuffle_options
+from services.generation_scheduler import GenerationOverloaded, scheduler
+from services.semantic_questions import index_questions_async, retrieve_questions
+
+CACHE_MAX_ENTRIES = int(os.getenv("MCQ_CACHE_MAX_ENTRIES", "500"))
+CACHE_TTL_SECONDS = int(os.getenv("MCQ_CACHE_TTL_SECONDS", str(24 * 3600)))
+CACHE_VARIANTS = int(os.getenv("MCQ_CACHE_VARIANTS", "3"))
+CACHE_DB_PATH = os.getenv("MCQ_CACHE_DB")  # optional, e.g. "mcq_cache.sqlite3"
+COALESCE_WAIT_SECONDS = float(os.getenv("MCQ_COALESCE_WAIT_SECONDS", "120"))
+
+# Common spellings that should share a cache entry
+TOPIC_SYNONYMS = {
+    "maths": "math",
+    "mathematics": "math",
+    "bio": "biology",
+    "chem": "chemistry",
+    "phys": "physics",
+    "cs": "computer science",
+    "ai": "artificial intelligence",
+    "ml": "machine learning",
+    "ww2": "world war ii",
+    "wwii": "world war ii",
+}
+
+
+def normalize_topic(topic):
+    """Lowercase, collapse whitespace/punctuation and map simple synonyms"""
+    topic = re.sub(r"[^\w\s']", " ", str(topic).lower())
+    topic = re.sub(r"\s+", " ", topic).strip()
+    return TOPIC_SYNONYMS.get(topic, topic)
+
+
+def make_cache_key(topic, difficulty, num_questions):
+    return f"{normalize_topic(topic)}|{str(difficulty).lower()}|{int(num_questions)}"
+
+
+class MCQCache:
+    """LRU + TTL cache of generated quiz texts, several variants per key"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS,
+                 variants=CACHE_VARIANTS, db_path=CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = variants
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (created, [quiz_text, ...])
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS mcq_cache ("
+                "key TEXT, created REAL, quiz_text TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS mcq_cache_key ON mcq_cache (key)")
+            self._db.commit()
+            self._load_from_db()
+
+    def _load_from_db(self):
+        cutoff = time.time() - self.ttl
+        self._db.execute("DELETE FROM mcq_cache WHERE created < ?", (cutoff,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, created, quiz_text FROM mcq_cache ORDER BY created"
+        ).fetchall()
+        for key, created, quiz_text in rows:
+            entry = self._entries.pop(key, (created, []))
+            entry[1].append(quiz_text)
+            self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        key, _ = self._entries.popitem(last=False)
+        self.evictions += 1
+        if self._db:
+            self._db.execute("DELETE FROM mcq_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _live_entry(self, key):
+        """The key's entry, dropping it if it has expired; holds _lock"""
+        entry = self._entries.get(key)
+        if entry and time.time() - entry[0] > self.ttl:
+            del self._entries[key]
+            if self._db:
+                self._db.execute("DELETE FROM mcq_cache WHERE key = ?", (key,))
+                self._db.commit()
+            entry = None
+        return entry
+
+    def get(self, key):
+        """Return a random cached variant, or None on a miss; see missing_variants"""
+        with self._lock:
+            entry = self._live_entry(key)
+            if not entry:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return random.choice(entry[1])
+
+    def missing_variants(self, key):
+        """How many more variants a cached key wants (0 if it is full or not cached)"""
+        with self._lock:
+            entry = self._live_entry(key)
+            return max(0, self.variants - len(entry[1])) if entry else 0
+
+    def put(self, key, quiz_text):
+        with self._lock:
+            created, texts = self._entries.pop(key, (time.time(), []))
+            if len(texts) < self.variants:
+                texts.append(quiz_text)
+                if self._db:
+                    self._db.execute(
+                        "INSERT INTO mcq_cache (key, created, quiz_text) VALUES (?, ?, ?)",
+                        (key, created, quiz_text)
+                    )
+                    self._db.commit()
+            self._entries[key] = (created, texts)
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db:
+                self._db.execute("DELETE FROM mcq_cache")
+                self._db.commit()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one in-flight generation"""
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Return (future, is_leader); only the leader should generate"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is not None and not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def wait(self, future):
+        """The leader's result, or None if it took too long; re-raises the leader's exception"""
+        try:
+            return future.result(timeout=COALESCE_WAIT_SECONDS)
+        except FutureTimeout:
+            return None
+
+
+mcq_cache = MCQCache()
+in_flight = SingleFlight()
+
+# A key is served from its first variant; the rest are generated here, off the request path
+_variant_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcq-variants")
+_filling = set()
+_filling_lock = threading.Lock()
+
+
+def _fill_variants(key, topic, num_questions, difficulty, question_type):
+    try:
+        while mcq_cache.missing_variants(key):
+            # Queued as their own class, like question bank refills, so they never take priority
+            with scheduler.admit("mcq-cache", "background"):
+                quiz_text = generate_mcqs(topic=topic, num_questions=num_questions,
+                                          difficulty=difficulty, question_type=question_type)
+            if is_error_response(quiz_text):
+                print("⚠️ Could not generate another cached variant for:", key)
+                break
+            mcq_cache.put(key, quiz_text)
+            index_questions_async(topic, difficulty, parse_quiz_text(quiz_text), question_type)
+    except GenerationOverloaded:
+        print("⚠️ Cached variants deferred, generation is busy:", key)
+    except Exception as e:
+        print(f"⚠️ Could not generate another cached variant for {key}: {e}")
+    finally:
+        with _filling_lock:
+            _filling.discard(key)
+
+
+def fill_variants_async(key, topic, num_questions, difficulty, question_type):
+    """Generate the key's missing variants in the background, once at a time per key"""
+    with _filling_lock:
+        if key in _filling or not mcq_cache.missing_variants(key):
+            return None
+        _filling.add(key)
+    return _variant_executor.submit(_fill_variants, key, topic, num_questions, difficulty, question_type)
+
+
+def _shuffled_text(quiz_text):
+    """Same questions with options reordered, so coalesced callers don't share answer letters"""
+    return format_quiz_text(shuffle_options(parse_quiz_text(quiz_text)))
+
+
+def cached_generate_mcqs(topic, num_questions=3, difficulty="Medium", question_type="General",
+                         user="anonymous", class_id="default", on_wait=None):
+    """
+    generate_mcqs with a cache and request coalescing in front; errors are never cached.
+    Generations wait for a slot in the scheduler as user/class_id (see generation_scheduler.admit).
+    """
+    key = make_cache_key(topic, difficulty, num_questions)
+    quiz_text = mcq_cache.get(key)
+    if quiz_text is not None:
+        fill_variants_async(key, topic, num_questions, difficulty, question_type)
+        return quiz_text
+    questions = retrieve_questions(topic, num_questions, difficulty, question_type)
+    if questions:
+        return format_quiz_text(shuffle_options(questions))
+
+    future, leader = in_flight.begin(key)
+    if not leader:
+        quiz_text = in_flight.wait(future)
+        if quiz_text and not is_error_response(quiz_text):
+            return _shuffled_text(quiz_text)
+        # The shared generation failed; fall back to our own
+        with scheduler.admit(user, class_id, on_wait):
+            return generate_mcqs(topic=topic, num_questions=num_questions,
+                                 difficulty=difficulty, question_type=question_type)
+
+    quiz_text, error = None, None
+    try:
+        with scheduler.admit(user, class_id, on_wait):
+            quiz_text = generate_mcqs(topic=topic, num_questions=num_questions,
+                                      difficulty=difficulty, question_type=question_type)
+        if not is_error_response(quiz_text):
+            mcq_cache.put(key, quiz_text)
+            index_questions_async(topic, difficulty, parse_quiz_text(quiz_text), question_type)
+    except Exception as e:
+        error = e  # e.g. GenerationOverloaded; followers get it too
+        raise
+    finally:
+        in_flight.finish(key, quiz_text, error)
+    return quiz_text
+
+
+def stream_cached_mcq_questions(topic, num_questions=3, difficulty="Medium", question_type="General",
+                                user="anonymous", class_id="default", on_wait=None):
+    """Yield parsed questions from the cache, or stream them (once admitted) and cache the full text"""
+    key = make_cache_key(topic, difficulty, num_questions)
+    quiz_text = mcq_cache.get(key)
+    if quiz_text is not None:
+        fill_variants_async(key, topic, num_questions, difficulty, question_type)
+        yield from parse_quiz_text(quiz_text)
+        return
+    questions = retrieve_questions(topic, num_questions, difficulty, question_type)
+    if questions:
+        yield from shuffle_options(questions)
+        return
+
+    future, leader = in_flight.begin(key)
+    if not leader:
+        quiz_text = in_flight.wait(future)
+        questions = parse_quiz_text(quiz_text) if quiz_text else []
+        if len(questions) >= num_questions:
+            yield from shuffle_options(questions)
+            return
+        # The shared generation failed or was abandoned; stream our own
+        with scheduler.admit(user, class_id, on_wait):
+            yield from stream_mcq_questions(topic, num_questions=num_questions, difficulty=difficulty,
+                                            question_type=question_type)
+        return
+
+    result = []
+
+    def on_text(text):
+        result.append(text)
+        questions = parse_quiz_text(text)
+        if len(questions) >= num_questions:
+            mcq_cache.put(key, text)
+            index_questions_async(topic, difficulty, questions, question_type)
+
+    error = None
+    try:
+        with scheduler.admit(user, class_id, on_wait):
+            yield from stream_mcq_questions(topic, num_questions=num_questions, difficulty=difficulty,
+                                            question_type=question_type, on_text=on_text)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Also runs if the caller stops early, so waiters are never left hanging
+        in_flight.finish(key, result[0] if result else None, error)
+
+
+def get_cache_stats():
+    stats = mcq_cache.stats()
+    stats["coalesced"] = in_flight.coalesced
+    stats["generations"] = in_flight.leaders
+    stats["scheduler"] = scheduler.stats()
+    return stats
@@ -1,48 +1,30 @@
 # mcq_generator.py
 
-from langchain_ibm import WatsonxLLM
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 import os
+import json
+import math
+import threading
+import time
+from collections import deque
 from dotenv import load_dotenv
 import streamlit as st
 
+from services.llm_provider import LLM_PROVIDER, PromptChain, clear_providers, get_provider
+from services.quiz_parser import IncrementalQuizParser, format_quiz_text, parse_quiz
 
-def generate_mcqs(topic, num_questions=3, difficulty="Medium", question_type="General"):
-    """
-    Generate MCQs with enhanced parameters
-    """
-    # Load environment variables
-    #load_dotenv(dotenv_path=".env")
 
-    # Corrected: Use 'apikey' instead of 'api_key'
-    apikey = st.secrets.get("WATSONX_API_KEY") or st.secrets.get("WATSONX_APIKEY")
-
-    # Validate environment variables
-    if not all([os.getenv("WATSONX_URL"), apikey, os.getenv("WATSONX_PROJECT_ID")]):
-        missing_vars = []
-        if not os.getenv("WATSONX_URL"): missing_vars.append("WATSONX_URL")
-        if not apikey: missing_vars.append("WATSONX_API_KEY or WATSONXAPIKEY")
-        if not os.getenv("WATSONX_PROJECT_ID"): missing_vars.append("WATSONX_PROJECT_ID")
-        return f"Error: Missing environment variables: {', '.join(missing_vars)}"
+MCQ_MODEL_ID = "ibm/granite-3-3-8b-instruct"
 
-    try:
-        llm = WatsonxLLM(
-            model_id="ibm/granite-3-3-8b-instruct",
-            url=os.getenv("WATSONX_URL"),
-            apikey=apikey,  # ✅ Correct key name
-            project_id=os.getenv("WATSONX_PROJECT_ID"),
-            params={
-                "max_new_tokens": 1000,
-                "min_new_tokens": 200,
-                "temperature": 0.3,
-                "top_p": 0.9,
-                "repetition_penalty": 1.05,
-                "stop_sequences": ["###", "---"]
-            }
-        )
+MCQ_PARAMS = {
+    "max_new_tokens": 1000,
+    "min_new_tokens": 200,
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "repetition_penalty": 1.05,
+    "stop_sequences": ["###", "---"]
+}
 
-        template = """Generate {num_questions} multiple choice questions on the topic "{topic}".
+MCQ_TEMPLATE = """Generate {num_questions} multiple choice questions on the topic "{topic}".
 
 Each question should be based on {difficulty} level and follow this exact format:
 
@@ -70,20 +52,205 @@ Continue for all {num_questions} questions.
 Topic: {topic}
 Start generating:"""
 
-        prompt = PromptTemplate.from_template(template)
-        output_parser = StrOutputParser()
-        mcq_chain = prompt | llm | output_parser
+REPAIR_TEMPLATE = """Generate {num_questions} more multiple choice questions on the topic "{topic}".
+
+Each question should be based on {difficulty} level. Do not repeat any of these questions:
+{existing}
+
+Follow this exact format:
+
+Q1. <question>
+A) <option 1>
+B) <option 2>
+C) <option 3>
+D) <option 4>
+Answer: <A/B/C/D>
+
+Start generating:"""
+
+# Roughly what one question costs the model; used until enough history exists
+TOKENS_PER_QUESTION = 90
+REPAIR_TOKEN_SLACK = 40
+
+# Adaptive budgets: max_new_tokens comes from the p90 tokens-per-question of
+# recent generations (estimated at ~4 characters per token) plus headroom, and
+# is rounded up to BUDGET_STEP so the chain registry only sees a few variants.
+CHARS_PER_TOKEN = 4
+BUDGET_HEADROOM = 1.3
+BUDGET_STEP = 50
+BUDGET_MIN_SAMPLES = 5
+_tokens_per_question_history = deque(maxlen=200)
 
-        response = mcq_chain.invoke({
+# Token usage and latency of main generations
+token_stats = {"generations": 0, "early_stops": 0, "tokens_estimated": 0,
+               "tokens_budgeted": 0, "total_time": 0.0}
+_token_lock = threading.Lock()
+
+# Token budgets of repairs compared with regenerating the whole quiz
+repair_stats = {"repairs": 0, "questions_requested": 0, "questions_repaired": 0,
+                "tokens_budgeted": 0, "tokens_saved": 0}
+_repair_lock = threading.Lock()
+
+# Messages generate_mcqs returns instead of a usable quiz
+ERROR_PREFIXES = ("Error", "Partial response detected", "Response too short")
+
+# Recent streaming timings: time to first question and total generation time
+generation_timings = deque(maxlen=500)
+
+# Process-wide registry of chains, shared by every Streamlit session. Chains
+# are cheap; the provider behind them keeps the pooled HTTP session and
+# refreshes the IAM token lazily, so warm calls skip both.
+_chain_registry = {}
+_chain_lock = threading.Lock()
+
+
+def get_mcq_provider(model_id=MCQ_MODEL_ID):
+    if LLM_PROVIDER != "watsonx":
+        return get_provider(model_id)  # offline providers need no credentials
+    apikey = st.secrets.get("WATSONX_API_KEY") or st.secrets.get("WATSONX_APIKEY")
+    return get_provider(model_id, url=os.getenv("WATSONX_URL"), apikey=apikey,
+                        project_id=os.getenv("WATSONX_PROJECT_ID"))
+
+
+def get_mcq_chain(model_id=MCQ_MODEL_ID, params=None, template=MCQ_TEMPLATE):
+    """Return the shared prompt + provider chain for a model, its params and prompt"""
+    params = params or MCQ_PARAMS
+    key = (model_id, json.dumps(params, sort_keys=True), template)
+    chain = _chain_registry.get(key)
+    if chain is not None:
+        return chain
+
+    with _chain_lock:
+        chain = _chain_registry.get(key)
+        if chain is None:
+            chain = PromptChain(template, get_mcq_provider(model_id), params)
+            _chain_registry[key] = chain
+    return chain
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def tokens_per_question():
+    """p90 tokens per question over recent generations"""
+    with _token_lock:
+        history = sorted(_tokens_per_question_history)
+    if len(history) < BUDGET_MIN_SAMPLES:
+        return TOKENS_PER_QUESTION
+    return history[int(0.9 * (len(history) - 1))]
+
+
+def generation_params(num_questions, slack=0):
+    """MCQ_PARAMS with a token budget and stop sequences sized for num_questions"""
+    budget = tokens_per_question() * num_questions * BUDGET_HEADROOM + slack
+    params = dict(MCQ_PARAMS)
+    params["max_new_tokens"] = min(MCQ_PARAMS["max_new_tokens"] * 4,
+                                   BUDGET_STEP * math.ceil(budget / BUDGET_STEP))
+    params["min_new_tokens"] = min(MCQ_PARAMS["min_new_tokens"],
+                                   BUDGET_STEP * int(budget / 2 // BUDGET_STEP))
+    # The model tends to continue with an extra "Q<n+1>." block; stop right there
+    params["stop_sequences"] = MCQ_PARAMS["stop_sequences"] + [f"Q{num_questions + 1}."]
+    return params
+
+
+def _record_generation(text, question_count, params, elapsed, early_stop):
+    tokens = estimate_tokens(text)
+    with _token_lock:
+        if question_count:
+            _tokens_per_question_history.append(tokens / question_count)
+        token_stats["generations"] += 1
+        token_stats["early_stops"] += int(early_stop)
+        token_stats["tokens_estimated"] += tokens
+        token_stats["tokens_budgeted"] += params["max_new_tokens"]
+        token_stats["total_time"] += elapsed
+
+
+def get_token_stats():
+    with _token_lock:
+        stats = dict(token_stats)
+    stats["tokens_per_question"] = tokens_per_question()
+    return stats
+
+
+def _generate_text(chain, inputs, num_questions):
+    """
+    Stream the chain and stop reading as soon as num_questions complete
+    questions (Answer: lines) have arrived. Returns (text, early_stop).
+    """
+    parser = IncrementalQuizParser()
+    chunks = []
+    complete = 0
+    early_stop = False
+    stream = chain.stream(inputs)
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+            complete += len(parser.feed(chunk))
+            if complete >= num_questions:
+                early_stop = True
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    text = "".join(chunks)
+    if early_stop:
+        # Drop whatever was already streamed of an extra question
+        text = text[:len(text) - len(parser.buffer)]
+    return text, early_stop
+
+
+def clear_mcq_chains():
+    """Drop all cached chains and providers, e.g. after rotating credentials"""
+    with _chain_lock:
+        _chain_registry.clear()
+    clear_providers()
+
+
+def generate_mcqs(topic, num_questions=3, difficulty="Medium", question_type="General"):
+    """
+    Generate MCQs with enhanced parameters
+    """
+    # Load environment variables
+    #load_dotenv(dotenv_path=".env")
+
+    # Validate environment variables (the offline providers need none)
+    if LLM_PROVIDER == "watsonx":
+        # Corrected: Use 'apikey' instead of 'api_key'
+        apikey = st.secrets.get("WATSONX_API_KEY") or st.secrets.get("WATSONX_APIKEY")
+
+        if not all([os.getenv("WATSONX_URL"), apikey, os.getenv("WATSONX_PROJECT_ID")]):
+            missing_vars = []
+            if not os.getenv("WATSONX_URL"): missing_vars.append("WATSONX_URL")
+            if not apikey: missing_vars.append("WATSONX_API_KEY or WATSONXAPIKEY")
+            if not os.getenv("WATSONX_PROJECT_ID"): missing_vars.append("WATSONX_PROJECT_ID")
+            return f"Error: Missing environment variables: {', '.join(missing_vars)}"
+
+    try:
+        params = generation_params(num_questions)
+        mcq_chain = get_mcq_chain(params=params)
+
+        start = time.perf_counter()
+        response, early_stop = _generate_text(mcq_chain, {
             "topic": topic,
             "num_questions": num_questions,
             "difficulty": difficulty,
             "question_type": question_type
-        })
+        }, num_questions)
 
         if response:
             response = response.strip()
-            question_count = response.count("Q")
+            questions = parse_quiz(response).questions
+            question_count = len(questions)
+            _record_generation(response, question_count, params,
+                               time.perf_counter() - start, early_stop)
+
+            if question_count < num_questions:
+                # Ask only for the missing/invalid questions instead of starting over
+                questions = repair_questions(topic, num_questions, difficulty, questions, question_type)
+                if len(questions) >= num_questions:
+                    return format_quiz_text(questions)
 
             if question_count < num_questions:
                 return f"Partial response detected. Got {question_count} questions instead of {num_questions}.\n\nResponse:\n{response}"
@@ -99,22 +266,145 @@ Start generating:"""
         return f"Error generating MCQs: {str(e)}\n\nPlease check:\n1. API credentials\n2. Network connection\n3. Watson service status"
 
 
+def repair_questions(topic, num_questions, difficulty, questions, question_type="General"):
+    """
+    Request only the questions missing from a partial or partly invalid quiz,
+    with a token budget sized for them, and return the merged list.
+    """
+    questions = list(questions[:num_questions])
+    missing = num_questions - len(questions)
+    if missing <= 0:
+        return questions
+
+    params = generation_params(missing, slack=REPAIR_TOKEN_SLACK)
+    params["min_new_tokens"] = 0
+    try:
+        chain = get_mcq_chain(params=params, template=REPAIR_TEMPLATE)
+        text = chain.invoke({
+            "topic": topic,
+            "num_questions": missing,
+            "difficulty": difficulty,
+            "existing": "\n".join(f"- {q['question']}" for q in questions) or "- (none)"
+        })
+    except Exception as e:
+        print("⚠️ Question repair failed:", str(e))
+        return questions
+
+    seen = {q["question"].lower() for q in questions}
+    added = []
+    for q in parse_quiz(text or "").questions:
+        if len(added) < missing and q["question"].lower() not in seen:
+            seen.add(q["question"].lower())
+            added.append(q)
+
+    with _repair_lock:
+        repair_stats["repairs"] += 1
+        repair_stats["questions_requested"] += missing
+        repair_stats["questions_repaired"] += len(added)
+        repair_stats["tokens_budgeted"] += params["max_new_tokens"]
+        # Against the budget a full regeneration of the quiz would get
+        repair_stats["tokens_saved"] += (generation_params(num_questions)["max_new_tokens"]
+                                         - params["max_new_tokens"])
+    return questions + added
+
+
+def get_repair_stats():
+    with _repair_lock:
+        return dict(repair_stats)
+
+
+def stream_mcq_questions(topic, num_questions=3, difficulty="Medium", question_type="General",
+                         on_text=None):
+    """
+    Stream MCQs from the model and yield each parsed question as soon as its
+    Answer: line arrives. Missing or invalid questions are repaired at the end.
+    on_text, if given, receives the full quiz text at the end.
+    """
+    params = generation_params(num_questions)
+    mcq_chain = get_mcq_chain(params=params)
+    parser = IncrementalQuizParser()
+    chunks = []
+    questions = []
+    start = time.perf_counter()
+    first_question_at = None
+
+    stream = mcq_chain.stream({
+        "topic": topic,
+        "num_questions": num_questions,
+        "difficulty": difficulty,
+        "question_type": question_type
+    })
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+            for question in parser.feed(chunk):
+                if first_question_at is None:
+                    first_question_at = time.perf_counter() - start
+                questions.append(question)
+                yield question
+            if len(questions) >= num_questions:
+                break  # stop reading once every question has its Answer: line
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    early_stop = len(questions) >= num_questions
+    if not early_stop:
+        for question in parser.close():
+            if first_question_at is None:
+                first_question_at = time.perf_counter() - start
+            questions.append(question)
+            yield question
+
+    raw_text = "".join(chunks)
+    if early_stop:
+        raw_text = raw_text[:len(raw_text) - len(parser.buffer)]
+    raw_text = raw_text.strip()
+    _record_generation(raw_text, len(questions), params, time.perf_counter() - start, early_stop)
+    if len(questions) < num_questions:
+        repaired = repair_questions(topic, num_questions, difficulty, questions, question_type)
+        for question in repaired[len(questions):]:
+            if first_question_at is None:
+                first_question_at = time.perf_counter() - start
+            yield question
+        questions = repaired
+        raw_text = format_quiz_text(questions)
+
+    generation_timings.append({
+        "topic": topic,
+        "questions": len(questions),
+        "time_to_first_question": first_question_at,
+        "total_time": time.perf_counter() - start
+    })
+    if on_text:
+        on_text(raw_text)
+
+
+def get_generation_timings():
+    """Recent streaming timings, newest last"""
+    return list(generation_timings)
+
+
+def is_error_response(response):
+    """True if generate_mcqs returned one of its error/partial messages"""
+    return not response or response.startswith(ERROR_PREFIXES)
+
+
 def test_connection():
     """Test Watson connection with minimal request"""
     load_dotenv(dotenv_path=".env")
     apikey = st.secrets.get("WATSONX_API_KEY") or st.secrets.get("WATSONXAPIKEY")
 
     try:
-        llm = WatsonxLLM(
-            model_id="ibm/granite-13b-instruct-v2",
+        provider = get_provider(
+            "ibm/granite-13b-instruct-v2",
             url=os.getenv("WATSONX_URL"),
-            apikey=apikey,  # ✅ Correct key name
-            project_id=os.getenv("WATSONX_PROJECT_ID"),
-            params={"max_new_tokens": 50, "temperature": 0.1}
+            apikey=apikey,
+            project_id=os.getenv("WATSONX_PROJECT_ID")
         )
 
-        response = llm.invoke("Hello")
+        response = provider.generate("Hello", {"max_new_tokens": 50, "temperature": 0.1})
         return f"Connection successful! Test response: {response}"
 
     except Exception as e:
-        return f"Connection failed: {str(e)}" 
\ No newline at end of file
+        return f"Connection failed: {str(e)}"
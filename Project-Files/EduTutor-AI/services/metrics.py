@@ -0,0 +1,194 @@
+# metrics.py
+# Lightweight spans, counters and latency histograms for the hot paths
+# (LLM calls, storage, bcrypt, quiz parsing).
+#
+#   METRICS_ENABLED=1     turn recording on (off by default; span() is then a shared no-op)
+#   METRICS_PORT=9464     serve Prometheus text format on http://<host>:<port>/metrics
+#   METRICS_FILE=path     rewrite Prometheus text format to this file every METRICS_FILE_SECONDS
+#                         (node_exporter textfile collector / any Prometheus scraper)
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_FILE_SECONDS = float(os.getenv("METRICS_FILE_SECONDS", "15"))
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_histograms = {}  # span name -> [bucket counts..., +Inf count, sum]
+_counters = {}    # counter name -> value
+_lock = threading.Lock()
+# Spans recorded by the current thread, i.e. the current Streamlit rerun
+_session = threading.local()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _observe(name, seconds):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[len(BUCKETS)] += 1
+        hist[-1] += seconds
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except GeneratorExit:
+        raise  # a stream closed early by its consumer is not an error
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _observe(name, seconds)
+        if failed:
+            inc(f"{name}.errors")
+        spans = getattr(_session, "spans", None)
+        if spans is not None:
+            spans.append((name, seconds))
+
+
+def span(name):
+    """Time a block: `with span("storage.get_user"): ...`"""
+    return _span(name) if METRICS_ENABLED else _NOOP
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def wrap(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        def inner(*args, **kwargs):
+            with _span(name):
+                return fn(*args, **kwargs)
+        inner.__name__ = fn.__name__
+        inner.__doc__ = fn.__doc__
+        return inner
+    return wrap
+
+
+def inc(name, value=1):
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def start_session():
+    """Start collecting this thread's spans (call at the top of each rerun)"""
+    _session.spans = [] if METRICS_ENABLED else None
+
+
+def get_session_spans():
+    """(name, seconds) pairs recorded since start_session() in this thread"""
+    return list(getattr(_session, "spans", None) or [])
+
+
+def _metric_name(name):
+    return "edututor_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def summary():
+    """{span name: {"count", "mean_ms"}} for every span seen so far"""
+    with _lock:
+        return {
+            name: {"count": sum(hist[:-1]),
+                   "mean_ms": round(1000 * hist[-1] / max(1, sum(hist[:-1])), 2)}
+            for name, hist in sorted(_histograms.items())
+        }
+
+
+def render_prometheus():
+    """All counters and histograms in Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            metric = _metric_name(name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, hist in sorted(_histograms.items()):
+            metric = _metric_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            cumulative += hist[len(BUCKETS)]
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {cumulative}')
+            lines.append(f"{metric}_sum {hist[-1]:.6f}")
+            lines.append(f"{metric}_count {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _serve(port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+def _write_file(path):
+    while True:
+        time.sleep(METRICS_FILE_SECONDS)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp, path)
+
+
+_exporters_started = False
+
+
+def start_exporters():
+    """Start the HTTP endpoint and/or file writer once per process, if configured"""
+    global _exporters_started
+    with _lock:
+        if _exporters_started or not METRICS_ENABLED:
+            return
+        _exporters_started = True
+    if METRICS_PORT:
+        threading.Thread(target=_serve, args=(int(METRICS_PORT),), name="metrics-http",
+                         daemon=True).start()
+    if METRICS_FILE:
+        threading.Thread(target=_write_file, args=(METRICS_FILE,), name="metrics-file",
+                         daemon=True).start()
@@ -0,0 +1,88 @@
+# migrate_email_case.py
+# Lowercase the emails of existing records, to match services.storage, which
+# normalizes every email it writes or looks up (record_ids.normalize_email).
+# On SQLite, users whose emails differ only in case are merged: the row under
+# record_ids.user_id(email) is kept (else the one already in lower case), and
+# attempt counters keep the highest sequence. On Pinecone user ids already come
+# from the lowercased email, so only metadata changes. The quiz aggregates are
+# rebuilt afterwards. Safe to run again.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m services.migrate_email_case [--backend sqlite|pinecone] [--dry-run]
+
+import sys
+from collections import defaultdict
+
+from services import record_ids, sqlite_store
+from services.record_ids import normalize_email
+from services.storage import STORAGE_BACKEND
+
+
+def _users_to_drop(users):
+    """Ids of users that lose a case-only duplicate of their email to another row"""
+    by_email = defaultdict(list)
+    for user_id, email in users:
+        by_email[normalize_email(email)].append((user_id, email))
+    drop = []
+    for email, rows in by_email.items():
+        if len(rows) > 1:
+            keep = max(rows, key=lambda row: (row[0] == record_ids.user_id(email), row[1] == email))
+            drop += [user_id for user_id, _ in rows if user_id != keep[0]]
+    return drop
+
+
+def migrate_sqlite(dry_run=False):
+    conn = sqlite_store.get_connection()
+    conn.create_function("normalize_email", 1, normalize_email, deterministic=True)
+    conn.executescript(record_ids.SCHEMA)
+    drop = _users_to_drop([(row["id"], row["email"]) for row in conn.execute("SELECT id, email FROM users")])
+    users = conn.execute("SELECT COUNT(*) FROM users WHERE email != normalize_email(email)").fetchone()[0]
+    results = conn.execute("SELECT COUNT(*) FROM quiz_results WHERE email != normalize_email(email)").fetchone()[0]
+    if not dry_run:
+        with conn:
+            conn.executemany("DELETE FROM users WHERE id = ?", [(user_id,) for user_id in drop])
+            conn.execute("UPDATE users SET email = normalize_email(email) WHERE email != normalize_email(email)")
+            conn.execute("UPDATE quiz_results SET email = normalize_email(email) "
+                         "WHERE email != normalize_email(email)")
+            conn.execute(
+                "INSERT INTO attempt_sequences (email, last_seq) "
+                "SELECT normalize_email(email), MAX(last_seq) FROM attempt_sequences "
+                "WHERE email != normalize_email(email) GROUP BY normalize_email(email) "
+                "ON CONFLICT(email) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)"
+            )
+            conn.execute("DELETE FROM attempt_sequences WHERE email != normalize_email(email)")
+    return users, len(drop), results
+
+
+def migrate_pinecone(dry_run=False):
+    from services import pinecone_service
+    from services.migrate_pinecone_to_sqlite import iter_records
+
+    index = pinecone_service.get_index()
+    users = results = 0
+    for vector_id, metadata in iter_records():
+        email = metadata.get("email")
+        if not email or email == normalize_email(email):
+            continue
+        if metadata.get("type") == "user":
+            users += 1
+        else:
+            results += 1
+        if not dry_run:
+            index.update(id=vector_id, set_metadata={"email": normalize_email(email)})
+    return users, 0, results
+
+
+def migrate(backend=STORAGE_BACKEND, dry_run=False):
+    users, merged, results = (migrate_pinecone if backend == "pinecone" else migrate_sqlite)(dry_run)
+    if not dry_run and backend == STORAGE_BACKEND:
+        from services.quiz_analytics import rebuild_aggregates
+        rebuild_aggregates()
+    print(f"✅ Lowercased emails of users: {users} (merged duplicates: {merged}), quiz results: {results} "
+          f"({backend})" + (" (dry run)" if dry_run else ""))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backend = args[args.index("--backend") + 1] if "--backend" in args else STORAGE_BACKEND
+    migrate(backend=backend, dry_run="--dry-run" in args)
@@ -0,0 +1,82 @@
+# migrate_pinecone_to_sqlite.py
+# Copy user and quiz metadata out of the Pinecone index into the local store.
+# Attempt ids are kept; results still on older email_time ids get a sequence
+# id, remembered in migrated_attempt_ids so running again reuses it instead of
+# inserting the result a second time.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m services.migrate_pinecone_to_sqlite [--dry-run]
+
+import sys
+
+from services import record_ids, sqlite_store
+from services.pinecone_service import get_index
+
+FETCH_BATCH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS migrated_attempt_ids (
+    old_id TEXT PRIMARY KEY,
+    new_id TEXT NOT NULL
+);
+"""
+
+
+def iter_records():
+    """Yield (id, metadata) for every vector in the index"""
+    index = get_index()
+    for ids in index.list():
+        for start in range(0, len(ids), FETCH_BATCH):
+            fetched = index.fetch(ids=ids[start:start + FETCH_BATCH])
+            for vector_id, vector in fetched.vectors.items():
+                yield vector_id, vector.metadata or {}
+
+
+def attempt_id_for(vector_id, email):
+    """The local id of a Pinecone quiz record; legacy ids map to the same new id on every run"""
+    if record_ids.attempt_seq(email, vector_id):
+        return vector_id
+    conn = sqlite_store.get_connection()
+    conn.executescript(SCHEMA)
+    row = conn.execute("SELECT new_id FROM migrated_attempt_ids WHERE old_id = ?", (vector_id,)).fetchone()
+    if row:
+        return row["new_id"]
+    new_id = record_ids.new_attempt_id(email, lambda: sqlite_store.max_attempt_seq(email))
+    with conn:
+        # Recorded before the result is stored, so an interrupted run resumes with the same id
+        conn.execute("INSERT INTO migrated_attempt_ids (old_id, new_id) VALUES (?, ?)", (vector_id, new_id))
+    return new_id
+
+
+def migrate(dry_run=False):
+    users = quizzes = skipped = 0
+    for vector_id, metadata in iter_records():
+        record_type = metadata.get("type")
+        email = record_ids.normalize_email(metadata["email"]) if metadata.get("email") else None
+        if record_type == "user" and email:
+            users += 1
+            if not dry_run:
+                sqlite_store.upsert_user_data(record_ids.user_id(email), {
+                    "email": email,
+                    "password": metadata.get("password", ""),
+                    "role": metadata.get("role", "student"),
+                    "name": metadata.get("name", "")
+                })
+        elif record_type == "quiz" and email:
+            quizzes += 1
+            if not dry_run:
+                sqlite_store.store_quiz_result(email, {
+                    "id": attempt_id_for(vector_id, email),
+                    "topic": metadata.get("topic", ""),
+                    "score": metadata.get("score", 0),
+                    "total": metadata.get("total", 0),
+                    "time": metadata.get("time", "")
+                })
+        else:
+            skipped += 1
+    print(f"✅ Users: {users}, quiz results: {quizzes}, skipped: {skipped}"
+          + (" (dry run)" if dry_run else ""))
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,109 @@
+# migrate_record_ids.py
+# Re-key existing records to the deterministic ids of services.record_ids:
+# users from random uuids to user_<hash of email>, quiz results from
+# "<email>_<time>" to per-student sequence ids (oldest first). Safe to run
+# again; records that already have their new id are left alone. On Pinecone
+# each record is written under its new id, carrying its old id as legacy_id,
+# before the old one is deleted; a run interrupted in between only deletes the
+# leftovers next time instead of re-keying them to fresh sequences.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m services.migrate_record_ids [--backend sqlite|pinecone] [--dry-run]
+
+import sys
+from collections import defaultdict
+
+from services import record_ids, sqlite_store
+from services.storage import STORAGE_BACKEND
+
+
+def _legacy_attempts(attempts):
+    """{email: [(time, old_id), ...]} for attempts still on old ids, oldest first"""
+    legacy = defaultdict(list)
+    for old_id, email, time in attempts:
+        if record_ids.attempt_seq(email, old_id) is None:
+            legacy[email].append((time or "", old_id))
+    return {email: sorted(items) for email, items in legacy.items()}
+
+
+def _new_attempt_ids(email, items, seed):
+    """Map old ids to freshly reserved sequence ids, in time order"""
+    first = record_ids.reserve_attempt_seqs(email, len(items), seed)
+    return {old_id: record_ids.attempt_id(email, first + n) for n, (_, old_id) in enumerate(items)}
+
+
+def migrate_sqlite(dry_run=False):
+    conn = sqlite_store.get_connection()
+    users = [(row["id"], row["email"]) for row in conn.execute("SELECT id, email FROM users")]
+    users = [(old_id, email) for old_id, email in users if old_id != record_ids.user_id(email)]
+    legacy = _legacy_attempts(
+        (row["id"], row["email"], row["time"]) for row in conn.execute("SELECT id, email, time FROM quiz_results"))
+    if not dry_run:
+        with conn:
+            conn.executemany("UPDATE users SET id = ? WHERE id = ?",
+                             [(record_ids.user_id(email), old_id) for old_id, email in users])
+        for email, items in legacy.items():
+            mapping = _new_attempt_ids(email, items, lambda: sqlite_store.max_attempt_seq(email))
+            with conn:
+                conn.executemany("UPDATE quiz_results SET id = ? WHERE id = ?",
+                                 [(new_id, old_id) for old_id, new_id in mapping.items()])
+    return len(users), sum(len(items) for items in legacy.values())
+
+
+def migrate_pinecone(dry_run=False):
+    from services import pinecone_service
+    from services.migrate_pinecone_to_sqlite import iter_records
+
+    index = pinecone_service.get_index()
+    users, attempts, metadata_by_id, migrated = [], [], {}, {}
+    for vector_id, metadata in iter_records():
+        email = metadata.get("email")
+        if not email:
+            continue
+        if metadata.get("type") == "user" and vector_id != record_ids.user_id(email):
+            users.append((vector_id, email))
+            metadata_by_id[vector_id] = metadata
+        elif metadata.get("type") == "quiz":
+            attempts.append((vector_id, email, metadata.get("time")))
+            metadata_by_id[vector_id] = metadata
+            if metadata.get("legacy_id"):
+                migrated[metadata["legacy_id"]] = vector_id
+    legacy = _legacy_attempts(attempts)
+    # Old records whose copy was written by an interrupted run only need deleting
+    leftovers = [old_id for items in legacy.values() for _, old_id in items if old_id in migrated]
+    legacy = {email: [item for item in items if item[1] not in migrated] for email, items in legacy.items()}
+    if dry_run:
+        return len(users), sum(len(items) for items in legacy.values()) + len(leftovers)
+
+    renames = {old_id: record_ids.user_id(email) for old_id, email in users}
+    for email, items in legacy.items():
+        if items:
+            renames.update(_new_attempt_ids(email, items, lambda: pinecone_service.max_attempt_seq(email)))
+    old_ids = list(renames)
+    batch = pinecone_service.UPSERT_BATCH_SIZE
+    for start in range(0, len(leftovers), batch):
+        index.delete(ids=leftovers[start:start + batch])
+    for start in range(0, len(old_ids), batch):
+        chunk = old_ids[start:start + batch]
+        index.upsert(vectors=[{"id": renames[old_id], "values": pinecone_service.SAFE_DUMMY_VECTOR,
+                               "metadata": _renamed_metadata(old_id, metadata_by_id[old_id])}
+                              for old_id in chunk])
+        index.delete(ids=chunk)
+    return len(users), len(old_ids) - len(users) + len(leftovers)
+
+
+def _renamed_metadata(old_id, metadata):
+    # Quiz results remember their old id; user ids come from the email, so a re-run finds them anyway
+    return dict(metadata, legacy_id=old_id) if metadata.get("type") == "quiz" else metadata
+
+
+def migrate(backend=STORAGE_BACKEND, dry_run=False):
+    users, attempts = (migrate_pinecone if backend == "pinecone" else migrate_sqlite)(dry_run)
+    print(f"✅ Re-keyed users: {users}, quiz results: {attempts} ({backend})"
+          + (" (dry run)" if dry_run else ""))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backend = args[args.index("--backend") + 1] if "--backend" in args else STORAGE_BACKEND
+    migrate(backend=backend, dry_run="--dry-run" in args)
@@ -0,0 +1,96 @@
+# passwords.py
+# bcrypt hashing and verification on a bounded process pool, so login spikes
+# don't block the Streamlit script thread or the FastAPI event loop.
+#
+#   BCRYPT_ROUNDS=12           cost factor for new hashes; older hashes are
+#                              rehashed transparently on the next good login
+#   PASSWORD_WORKERS=<cpus>    worker processes (0 = hash inline, no pool)
+#   PASSWORD_MAX_PENDING=64    requests allowed in the pool before callers wait
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from services.metrics import span
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_MAX_PENDING)
+
+
+def _hasher(rounds):
+    from passlib.hash import bcrypt
+    return bcrypt.using(rounds=rounds)
+
+
+# Worker functions run in the pool processes, so they must stay module-level
+def _hash(password, rounds):
+    return _hasher(rounds).hash(password)
+
+
+def _verify(password, hashed, rounds):
+    """(matches, new_hash); new_hash is set when the stored hash uses another cost"""
+    hasher = _hasher(rounds)
+    try:
+        if not hasher.verify(password, hashed):
+            return False, None
+    except (ValueError, TypeError):
+        return False, None  # not a bcrypt hash, e.g. "google_oauth" accounts
+    return True, hasher.hash(password) if hasher.needs_update(hashed) else None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # fork would copy this multi-threaded process, including locks other
+                # threads hold at that moment; forkserver workers start clean
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS,
+                                            mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def _submit(fn, *args):
+    """Run fn in the pool, waiting for a slot once PASSWORD_MAX_PENDING are queued"""
+    if PASSWORD_WORKERS <= 0:
+        return None
+    _pending.acquire()
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+def hash_password(password):
+    with span("auth.bcrypt_hash"):
+        future = _submit(_hash, password, BCRYPT_ROUNDS)
+        return future.result() if future else _hash(password, BCRYPT_ROUNDS)
+
+
+def verify_password(password, hashed):
+    """Return (matches, new_hash); store new_hash when it is not None"""
+    with span("auth.bcrypt_verify"):
+        future = _submit(_verify, password, hashed, BCRYPT_ROUNDS)
+        return future.result() if future else _verify(password, hashed, BCRYPT_ROUNDS)
+
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    # Acquiring a pool slot can block, so do it off the event loop too
+    return await loop.run_in_executor(None, hash_password, password)
+
+
+async def verify_password_async(password, hashed):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, verify_password, password, hashed)
@@ -1,48 +1,88 @@
+import bisect
 import os
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
-from passlib.hash import bcrypt
 import streamlit as st
 
+from services import record_ids
+from services.metrics import inc
+
 # Load environment variables from .env
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-# Load environment variables
-PINECONE_API_KEY = st.secrets["PINECONE_API_KEY"]
-PINECONE_INDEX_NAME = st.secrets["PINECONE_INDEX_NAME"]
-
-if not PINECONE_API_KEY:
-    raise ValueError("PINECONE_API_KEY is not set. Please check your .env file.")
-
 # Define a non-zero dummy vector
 SAFE_DUMMY_VECTOR = [1e-6] + [0.0] * 1023  # Length = 1024
 
-# Initialize Pinecone client with API key
-pc = Pinecone(api_key=PINECONE_API_KEY)
+# The client and index are created on first use, not at import, so importing
+# this module makes no network calls; the index existence check runs once.
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return the Pinecone index, creating the client (and index) on first use."""
+    global _index
+    if _index is not None:
+        return _index
+    with _index_lock:
+        if _index is None:
+            from pinecone import Pinecone, ServerlessSpec
+
+            # Load environment variables
+            PINECONE_API_KEY = st.secrets["PINECONE_API_KEY"]
+            PINECONE_INDEX_NAME = st.secrets["PINECONE_INDEX_NAME"]
+
+            if not PINECONE_API_KEY:
+                raise ValueError("PINECONE_API_KEY is not set. Please check your .env file.")
+
+            # Initialize Pinecone client with API key
+            pc = Pinecone(api_key=PINECONE_API_KEY)
+
+            # Create index if not exists
+            if PINECONE_INDEX_NAME not in pc.list_indexes().names():
+                pc.create_index(
+                    name=PINECONE_INDEX_NAME,
+                    dimension=1024,
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud="aws", region="us-west-2")
+                )
 
-# Create index if not exists
-if PINECONE_INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=PINECONE_INDEX_NAME,
-        dimension=1024,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-west-2")
-    )
+            # Access the index
+            _index = pc.Index(PINECONE_INDEX_NAME)
+    return _index
 
-# Access the index
-index = pc.Index(PINECONE_INDEX_NAME)
+
+def __getattr__(name):
+    # Keeps `from services.pinecone_service import index` working, lazily
+    if name == "index":
+        return get_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # === USER AUTH DATA ===
 
+# Ids per fetch request; they travel in the query string
+FETCH_BATCH = 100
+
+def _fetch(ids):
+    """Fetch records by id in batches; returns {id: vector}."""
+    found = {}
+    for start in range(0, len(ids), FETCH_BATCH):
+        found.update(get_index().fetch(ids=ids[start:start + FETCH_BATCH]).vectors)
+    return found
+
 def upsert_user_data(user_id: str, user_data: dict):
-    """Store user login/signup data with safe dummy vector and hashed password."""
+    """Store user login/signup data with safe dummy vector and hashed password.
+    user_id should be record_ids.user_id(email), which lookups fetch directly."""
     metadata = {
         "type": "user",
         "email": user_data["email"],
         "password": user_data["password"],
-        "role": user_data["role"]
+        "role": user_data["role"],
+        "name": user_data.get("name", "")
     }
-    index.upsert(vectors=[
+    get_index().upsert(vectors=[
         {
             "id": user_id,
             "values": SAFE_DUMMY_VECTOR,
@@ -52,24 +92,21 @@ def upsert_user_data(user_id: str, user_data: dict):
 
 def get_user_by_email(email: str):
     """Retrieve user by email."""
-    results = index.query(
-        vector=SAFE_DUMMY_VECTOR,
-        top_k=1,
-        filter={
-            "type": "user",
-            "email": {"$eq": email}
-        },
-        include_metadata=True
-    )
-    if results and results.matches:
-        return results.matches[0].metadata
-    return None
+    record = _fetch([record_ids.user_id(email)]).get(record_ids.user_id(email))
+    return record.metadata if record is not None else None
+
+def get_users_by_emails(emails):
+    """Users for many emails at once, as {email: user}; unknown emails are left out."""
+    ids = {record_ids.user_id(email): email for email in emails}
+    return {ids[vector_id]: vector.metadata for vector_id, vector in _fetch(list(ids)).items()}
+
+def update_user_password(email: str, hashed_password: str):
+    """Replace a user's stored password hash, e.g. after a cost change."""
+    get_index().update(id=record_ids.user_id(email), set_metadata={"password": hashed_password})
 
 # === QUIZ RESULT DATA ===
 
-def store_quiz_result(student_email: str, quiz_data: dict):
-    print("📥 Storing quiz for:", student_email)
-    """Store quiz result for a student."""
+def _quiz_vector(student_email: str, quiz_data: dict):
     metadata = {
         "type": "quiz",
         "email": student_email,
@@ -78,33 +115,126 @@ def store_quiz_result(student_email: str, quiz_data: dict):
         "total": quiz_data["total"], 
         "time": quiz_data["time"]  # Format: 'YYYY-MM-DD HH:MM:SS'
     }
-    quiz_id = f"{student_email}_{quiz_data['time']}"
-    index.upsert(vectors=[
-        {
-            "id": quiz_id,
-            "values": SAFE_DUMMY_VECTOR,
-            "metadata": metadata
-        }
-    ])
+    quiz_id = quiz_data.get("id") or record_ids.new_attempt_id(
+        student_email, lambda: max_attempt_seq(student_email), shared=True)
+    return {
+        "id": quiz_id,
+        "values": SAFE_DUMMY_VECTOR,
+        "metadata": metadata
+    }
+
+def store_quiz_result(student_email: str, quiz_data: dict):
+    """Store quiz result for a student."""
+    inc("pinecone.quiz_results_stored")
+    get_index().upsert(vectors=[_quiz_vector(student_email, quiz_data)])
+
+# Pinecone recommends upserting at most 100 vectors per request
+UPSERT_BATCH_SIZE = 100
+
+def store_quiz_results(items):
+    """Store many (student_email, quiz_data) results with batched upserts."""
+    vectors = [_quiz_vector(email, quiz_data) for email, quiz_data in items]
+    for start in range(0, len(vectors), UPSERT_BATCH_SIZE):
+        get_index().upsert(vectors=vectors[start:start + UPSERT_BATCH_SIZE])
+
+def max_attempt_seq(email: str):
+    """Highest attempt sequence stored for a student (0 if none)."""
+    seqs = [record_ids.attempt_seq(email, vector_id)
+            for ids in get_index().list(prefix=record_ids.user_id(email) + "_")
+            for vector_id in ids]
+    return max((seq for seq in seqs if seq), default=0)
+
+def get_attempts(ids):
+    """Quiz results for many attempt ids at once, in the order asked; missing ids are left out."""
+    ids = list(dict.fromkeys(ids))
+    found = _fetch(ids)
+    return [dict(found[i].metadata, id=i) for i in ids if i in found]
+
+def _attempt_ids(email=None):
+    """Ids of stored quiz results, for one student or all, from the id listing alone."""
+    prefix = record_ids.user_id(email) + "_" if email else "user_"
+    for ids in get_index().list(prefix=prefix):
+        for vector_id in ids:
+            if record_ids.is_attempt_id(vector_id):
+                yield vector_id
+
+def _iter_attempts(email=None):
+    """Every stored quiz result (for one student or all), fetched FETCH_BATCH ids at a time."""
+    batch = []
+    for vector_id in _attempt_ids(email):
+        batch.append(vector_id)
+        if len(batch) == FETCH_BATCH:
+            yield from get_attempts(batch)
+            batch = []
+    if batch:
+        yield from get_attempts(batch)
 
 def get_all_quiz_results():
     """Return all quiz entries (for educators)."""
-    results = index.query(
-        vector=SAFE_DUMMY_VECTOR,
-        top_k=1000,
-        include_metadata=True,
-        filter={"type": "quiz"}
-    )
-    return [match.metadata for match in results.matches]
+    return sorted(_iter_attempts(), key=lambda r: r.get("time", ""), reverse=True)
 
 def get_quizzes_by_student(email: str):
-    results = index.query(
-        vector=SAFE_DUMMY_VECTOR,
-        top_k=100,
-        filter={
-            "type": "quiz",
-            "email": {"$eq": email}
-        },
-        include_metadata=True
-    )
-    return [match.metadata for match in results.matches] 
\ No newline at end of file
+    return sorted(_iter_attempts(email), key=lambda r: r.get("time", ""), reverse=True)
+
+def _matches(r, topic=None, start_date=None, end_date=None):
+    """The topic/date filters of get_quiz_results_page, applied to a fetched record."""
+    when = r.get("time", "")
+    return ((not topic or str(r.get("topic", "")).lower() == topic.lower())
+            and (not start_date or when >= str(start_date))
+            and (not end_date or when <= f"{end_date} 23:59:59"))
+
+def iter_quiz_results(chunk_size=1000, email=None, topic=None, start_date=None, end_date=None):
+    """Every matching quiz result in chunks, in listing order (not by time), in one pass over the index."""
+    chunk = []
+    for r in _iter_attempts(email):
+        if _matches(r, topic, start_date, end_date):
+            chunk.append(r)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+# Pinecone cannot list records by time, so the first page of a query walks the
+# whole listing once and keeps the sorted (time, id) keys of the matches; later
+# pages bisect their cursor into those keys and fetch only their own ids. A page
+# whose snapshot has expired (or been evicted) walks the listing again.
+PAGE_SNAPSHOT_TTL = float(os.getenv("PINECONE_PAGE_SNAPSHOT_TTL_SECONDS", "300"))
+PAGE_SNAPSHOT_MAX = int(os.getenv("PINECONE_PAGE_SNAPSHOT_MAX", "8"))
+_page_snapshots = OrderedDict()  # filters -> (expires_at, keys oldest first)
+_page_snapshots_lock = threading.Lock()
+
+def _page_keys(filters, fresh):
+    """Sorted (time, id) keys of the records matching filters, reusing a snapshot unless fresh."""
+    now = time.time()
+    with _page_snapshots_lock:
+        entry = _page_snapshots.get(filters)
+        if entry and not fresh and entry[0] > now:
+            _page_snapshots.move_to_end(filters)
+            return entry[1]
+    inc("pinecone.page_snapshots_built")
+    email, topic, start_date, end_date = filters
+    keys = sorted((r.get("time", ""), r["id"]) for r in _iter_attempts(email)
+                  if _matches(r, topic, start_date, end_date))
+    with _page_snapshots_lock:
+        _page_snapshots[filters] = (now + PAGE_SNAPSHOT_TTL, keys)
+        _page_snapshots.move_to_end(filters)
+        while len(_page_snapshots) > PAGE_SNAPSHOT_MAX:
+            _page_snapshots.popitem(last=False)
+    return keys
+
+def get_quiz_results_page(cursor=None, page_size=50, email=None, topic=None,
+                          start_date=None, end_date=None):
+    """
+    One page of quiz results, newest first. Returns (results, next_cursor).
+    Metadata queries cap top_k and cannot sort, so the first page walks the id
+    listing (only the student's ids when email is given) and snapshots the
+    sorted keys; pages after it fetch just their own page_size ids.
+    """
+    filters = (email, topic, str(start_date or ""), str(end_date or ""))
+    keys = _page_keys(filters, fresh=cursor is None)
+    end = bisect.bisect_left(keys, tuple(cursor.split("|", 1))) if cursor else len(keys)
+    page_keys = keys[max(0, end - page_size):end][::-1]
+    page = get_attempts([vector_id for _, vector_id in page_keys])
+    next_cursor = f"{page_keys[-1][0]}|{page_keys[-1][1]}" if end > page_size else None
+    return page, next_cursor
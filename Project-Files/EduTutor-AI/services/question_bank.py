@@ -0,0 +1,154 @@
+# question_bank.py
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from services.generation_scheduler import GenerationOverloaded, scheduler
+from services.mcq_cache import normalize_topic
+from services.mcq_generator2 import generate_mcqs, is_error_response
+from services.quiz_parser import parse_quiz_text
+
+BANK_LOW_WATER = int(os.getenv("QUESTION_BANK_LOW_WATER", "6"))
+BANK_HIGH_WATER = int(os.getenv("QUESTION_BANK_HIGH_WATER", "15"))
+BANK_BATCH_SIZE = int(os.getenv("QUESTION_BANK_BATCH_SIZE", "5"))
+BANK_WORKERS = int(os.getenv("QUESTION_BANK_WORKERS", "2"))
+# A topic is "popular" (kept topped up) once it has been requested this often
+# within the window
+BANK_POPULAR_AFTER = int(os.getenv("QUESTION_BANK_POPULAR_AFTER", "2"))
+BANK_POPULAR_WINDOW = float(os.getenv("QUESTION_BANK_POPULAR_WINDOW_SECONDS", "3600"))
+# Topics tracked (request times and pools); the least recently used are dropped
+BANK_MAX_TOPICS = int(os.getenv("QUESTION_BANK_MAX_TOPICS", "200"))
+
+
+class QuestionBank:
+    """Per topic/difficulty pools of parsed questions, refilled in the background"""
+
+    def __init__(self, generate=generate_mcqs, low_water=BANK_LOW_WATER,
+                 high_water=BANK_HIGH_WATER, batch_size=BANK_BATCH_SIZE,
+                 workers=BANK_WORKERS, popular_after=BANK_POPULAR_AFTER,
+                 popular_window=BANK_POPULAR_WINDOW, max_topics=BANK_MAX_TOPICS):
+        self.generate = generate
+        self.low_water = low_water
+        self.high_water = high_water
+        self.batch_size = batch_size
+        self.popular_after = popular_after
+        self.popular_window = popular_window
+        self.max_topics = max_topics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pools = OrderedDict()     # (topic, difficulty) -> deque of question dicts, LRU order
+        self._requests = OrderedDict()  # (topic, difficulty) -> deque of request times, LRU order
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="question-bank")
+
+    def _key(self, topic, difficulty):
+        return normalize_topic(topic), str(difficulty).lower()
+
+    def _touch(self, entries, key, default):
+        """entries[key] (created from default if missing), marked most recently used; holds _lock"""
+        if key in entries:
+            entries.move_to_end(key)
+        else:
+            entries[key] = default()
+            while len(entries) > self.max_topics:
+                entries.popitem(last=False)
+                self.evictions += 1
+        return entries[key]
+
+    def _record_request(self, key, count=1):
+        # Only the last popular_after request times matter
+        times = self._touch(self._requests, key, lambda: deque(maxlen=self.popular_after))
+        times.extend([time.time()] * count)
+
+    def _is_popular(self, key):
+        times = self._requests.get(key, ())
+        if len(times) < self.popular_after:
+            return False
+        return not times or time.time() - times[0] <= self.popular_window
+
+    def take(self, topic, difficulty, num_questions):
+        """Pop num_questions from the pool, or None if it cannot serve them"""
+        key = self._key(topic, difficulty)
+        with self._lock:
+            self._record_request(key)
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+            if pool is not None and len(pool) >= num_questions:
+                questions = [pool.popleft() for _ in range(num_questions)]
+                self.hits += 1
+            else:
+                questions = None
+                self.misses += 1
+        self._maybe_refill(key, topic)
+        if questions:
+            # Option order is already fixed per question; vary the question order
+            random.shuffle(questions)
+        return questions
+
+    def add(self, topic, difficulty, questions):
+        """Add already parsed questions, e.g. from a live generation"""
+        key = self._key(topic, difficulty)
+        added = 0
+        with self._lock:
+            pool = self._touch(self._pools, key, deque)
+            seen = {q["question"] for q in pool}
+            for q in questions:
+                if q["question"] not in seen and len(pool) < self.high_water:
+                    pool.append(q)
+                    seen.add(q["question"])
+                    added += 1
+        return added
+
+    def warm(self, topic, difficulty):
+        """Mark a topic as popular and start filling its pool right away"""
+        key = self._key(topic, difficulty)
+        with self._lock:
+            self._record_request(key, self.popular_after)
+        self._maybe_refill(key, topic)
+
+    def _maybe_refill(self, key, topic):
+        with self._lock:
+            if not self._is_popular(key) or key in self._refilling:
+                return
+            if len(self._pools.get(key, ())) >= self.low_water:
+                return
+            self._refilling.add(key)
+        self._executor.submit(self._refill, key, topic)
+
+    def _refill(self, key, topic):
+        try:
+            while len(self._pools.get(key, ())) < self.high_water:
+                # Refills queue as their own class, so they take a fair share of slots, not priority
+                with scheduler.admit("question-bank", "background"):
+                    quiz_text = self.generate(topic=topic, num_questions=self.batch_size,
+                                              difficulty=key[1])
+                questions = [] if is_error_response(quiz_text) else parse_quiz_text(quiz_text)
+                if not questions:
+                    print("⚠️ Question bank refill failed for:", key)
+                    break
+                if not self.add(topic, key[1], questions):
+                    break  # only duplicates came back
+        except GenerationOverloaded:
+            print("⚠️ Question bank refill deferred, generation is busy:", key)
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "pools": {f"{t}|{d}": len(p) for (t, d), p in self._pools.items()},
+            }
+
+
+question_bank = QuestionBank()
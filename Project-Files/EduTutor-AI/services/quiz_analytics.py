@@ -0,0 +1,197 @@
+# quiz_analytics.py
+# Running aggregates of quiz results, updated on every store_quiz_result, so the
+# educator dashboard reads small summaries instead of scanning every attempt.
+#
+# Rebuild from raw results (from Project-Files/EduTutor-AI):
+#   python -m services.quiz_analytics --rebuild
+
+import os
+import sys
+
+from services.record_ids import normalize_email
+from services.sqlite_store import get_connection
+
+PASS_PERCENT = float(os.getenv("QUIZ_PASS_PERCENT", "60"))
+
+# Scopes an attempt is counted under; the histogram (our percentile sketch:
+# one bucket per whole percent) is kept for all of them except student_day.
+SCOPES = ("all", "topic", "student", "day", "student_day")
+HISTOGRAM_SCOPES = ("all", "topic", "student", "day")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_aggregates (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    percent_sum REAL NOT NULL DEFAULT 0,
+    passes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS quiz_score_histogram (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key, bucket)
+);
+"""
+
+
+_schema_ready = False
+
+
+def _connection():
+    global _schema_ready
+    conn = get_connection()
+    if not _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready = True
+    return conn
+
+
+def _normalize_topic(topic):
+    return " ".join(str(topic).lower().split())
+
+
+def _percent(quiz_data):
+    total = float(quiz_data.get("total") or 0)
+    return 100.0 * float(quiz_data.get("score") or 0) / total if total else 0.0
+
+
+def _scope_keys(student_email, quiz_data):
+    day = str(quiz_data.get("time", ""))[:10]
+    return {
+        "all": "",
+        "topic": _normalize_topic(quiz_data.get("topic", "")),
+        "student": student_email,
+        "day": day,
+        "student_day": f"{student_email}|{day}",
+    }
+
+
+def _apply(conn, student_email, quiz_data):
+    percent = _percent(quiz_data)
+    passed = int(percent >= PASS_PERCENT)
+    bucket = int(round(percent))
+    for scope, key in _scope_keys(student_email, quiz_data).items():
+        conn.execute(
+            "INSERT INTO quiz_aggregates (scope, key, attempts, percent_sum, passes) "
+            "VALUES (?, ?, 1, ?, ?) ON CONFLICT(scope, key) DO UPDATE SET "
+            "attempts = attempts + 1, percent_sum = percent_sum + excluded.percent_sum, "
+            "passes = passes + excluded.passes",
+            (scope, key, percent, passed)
+        )
+        if scope in HISTOGRAM_SCOPES:
+            conn.execute(
+                "INSERT INTO quiz_score_histogram (scope, key, bucket, count) "
+                "VALUES (?, ?, ?, 1) ON CONFLICT(scope, key, bucket) DO UPDATE SET "
+                "count = count + 1",
+                (scope, key, bucket)
+            )
+
+
+def update_aggregates(student_email: str, quiz_data: dict):
+    """Count one new quiz attempt in every aggregate it belongs to."""
+    conn = _connection()
+    with conn:
+        _apply(conn, student_email, quiz_data)
+
+
+def rebuild_aggregates(results=None):
+    """Recompute every aggregate from raw quiz results."""
+    if results is None:
+        from services.storage import iter_quiz_results
+        results = (r for chunk in iter_quiz_results() for r in chunk)
+    conn = _connection()
+    count = 0
+    with conn:
+        conn.execute("DELETE FROM quiz_aggregates")
+        conn.execute("DELETE FROM quiz_score_histogram")
+        for result in results:
+            _apply(conn, result["email"], result)
+            count += 1
+    return count
+
+# === READ SIDE ===
+
+def _percentiles(scope, key, quantiles=(0.5, 0.9)):
+    rows = _connection().execute(
+        "SELECT bucket, count FROM quiz_score_histogram WHERE scope = ? AND key = ? "
+        "ORDER BY bucket", (scope, key)
+    ).fetchall()
+    total = sum(row["count"] for row in rows)
+    out = {}
+    for q in quantiles:
+        seen = 0
+        out[q] = None
+        for row in rows:
+            seen += row["count"]
+            if seen >= q * total:
+                out[q] = row["bucket"]
+                break
+    return out
+
+
+def _summary(row, with_percentiles=True):
+    attempts = row["attempts"]
+    summary = {
+        "attempts": attempts,
+        "mean_percent": round(row["percent_sum"] / attempts, 1) if attempts else None,
+        "pass_rate": round(100.0 * row["passes"] / attempts, 1) if attempts else None,
+    }
+    if with_percentiles:
+        p = _percentiles(row["scope"], row["key"])
+        summary["p50_percent"] = p[0.5]
+        summary["p90_percent"] = p[0.9]
+    return summary
+
+
+def get_overall_summary():
+    row = _connection().execute(
+        "SELECT * FROM quiz_aggregates WHERE scope = 'all' AND key = ''"
+    ).fetchone()
+    return _summary(row) if row else None
+
+
+def get_topic_summaries(limit=50):
+    """Most attempted topics first."""
+    rows = _connection().execute(
+        "SELECT * FROM quiz_aggregates WHERE scope = 'topic' ORDER BY attempts DESC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return [{"topic": row["key"], **_summary(row)} for row in rows]
+
+
+def get_student_summary(email):
+    row = _connection().execute(
+        "SELECT * FROM quiz_aggregates WHERE scope = 'student' AND key = ?", (normalize_email(email),)
+    ).fetchone()
+    return _summary(row) if row else None
+
+
+def get_student_trend(email, days=30):
+    """Per-day mean score for one student, oldest first."""
+    email = normalize_email(email)
+    # Keys are "<email>|<day>"; a range on the prefix matches the email exactly
+    # ("}" sorts right after "|"), where LIKE would treat _ and % as wildcards.
+    rows = _connection().execute(
+        "SELECT * FROM quiz_aggregates WHERE scope = 'student_day' AND key >= ? AND key < ? "
+        "ORDER BY key DESC LIMIT ?", (f"{email}|", f"{email}}}", days)
+    ).fetchall()
+    return [{"day": row["key"].split("|", 1)[1], **_summary(row, with_percentiles=False)}
+            for row in reversed(rows)]
+
+
+def get_daily_summaries(days=30):
+    """Per-day summaries for the whole class, oldest first."""
+    rows = _connection().execute(
+        "SELECT * FROM quiz_aggregates WHERE scope = 'day' ORDER BY key DESC LIMIT ?", (days,)
+    ).fetchall()
+    return [{"day": row["key"], **_summary(row, with_percentiles=False)} for row in reversed(rows)]
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        print(f"✅ Rebuilt aggregates from {rebuild_aggregates()} quiz results")
+    else:
+        print("Usage: python -m services.quiz_analytics --rebuild")
@@ -0,0 +1,182 @@
+# quiz_parser.py
+# Single-pass parser for LLM quiz output. Accepts the formats both generators
+# produce ("Q1." / "Q1:" / "Question 1)", "A)" / "a)" / "(a)" / "A.",
+# "Answer: B" / "Answer: b) ..." / "Correct answer: B") in one scan over the lines.
+
+import random
+import re
+
+from services.metrics import traced
+
+OPTION_LETTERS = "ABCD"
+EXPECTED_OPTIONS = len(OPTION_LETTERS)
+
+_QUESTION = r"Q(?:uestion)?\s*(?P<number>\d+)\s*[.:)]\s*(?P<question>.*)"
+_ANSWER_HEAD = r"(?:Correct\s+)?Answer\s*[:\-]\s*\(?[A-Da-d]\b"
+_ANSWER = r"(?:Correct\s+)?Answer\s*[:\-]\s*\(?(?P<answer>[A-Da-d])\b.*"
+_OPTION = r"\(?(?P<letter>[A-Da-d])\s*[).:]\s*(?P<option>.*)"
+
+# One precompiled alternation classifies each line; the answer branch comes
+# before the option branch so "Answer: ..." is never read as option "A"
+_LINE = re.compile(rf"^\s*(?:{_QUESTION}|{_ANSWER}|{_OPTION})$", re.IGNORECASE)
+
+
+class Question:
+    """One parsed question; also readable as q["question"], q["options"], q["correct"]"""
+
+    __slots__ = ("number", "question", "options", "correct")
+
+    def __init__(self, number, question, options, correct):
+        self.number = number
+        self.question = question
+        self.options = options
+        self.correct = correct
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def to_dict(self):
+        return {"question": self.question, "options": self.options, "correct": self.correct}
+
+    def problems(self):
+        """Validation problems; an empty list means the question is usable"""
+        problems = []
+        if not self.question:
+            problems.append("missing question text")
+        if len(self.options) != EXPECTED_OPTIONS:
+            problems.append(f"expected {EXPECTED_OPTIONS} options, got {len(self.options)}")
+        if len({o.strip().lower() for o in self.options}) != len(self.options):
+            problems.append("duplicate options")
+        if not self.correct:
+            problems.append("missing answer")
+        elif OPTION_LETTERS.index(self.correct) >= len(self.options):
+            problems.append(f"answer {self.correct} has no matching option")
+        return problems
+
+    def __repr__(self):
+        return f"Question({self.number}, {self.question!r}, {self.options!r}, {self.correct!r})"
+
+
+class ParseResult:
+    """Valid questions plus a report of every question that was rejected"""
+
+    __slots__ = ("questions", "errors")
+
+    def __init__(self):
+        self.questions = []
+        self.errors = []  # [{"number": 2, "question": "...", "problems": [...]}]
+
+
+def _finish(result, current):
+    if current is None:
+        return
+    current.question = current.question.strip()
+    problems = current.problems()
+    if problems:
+        result.errors.append({
+            "number": current.number,
+            "question": current.question,
+            "problems": problems
+        })
+    else:
+        result.questions.append(current)
+
+
+@traced("quiz.parse")
+def parse_quiz(quiz_text):
+    """Parse quiz text into a ParseResult in a single pass over its lines"""
+    result = ParseResult()
+    current = None
+    for line in quiz_text.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            # Question text may wrap onto following lines until the first option
+            if current is not None and not current.options and line.strip():
+                current.question += " " + line.strip()
+            continue
+        # The last group a branch closes names the kind of line it matched
+        kind = match.lastgroup
+        if kind == "question":
+            _finish(result, current)
+            current = Question(int(match.group("number")), match.group("question"), [], None)
+        elif current is None:
+            continue
+        elif kind == "answer":
+            if current.correct is None:
+                current.correct = match.group("answer").upper()
+        elif current.correct is None:
+            # Anything option-like after the answer line is commentary, not an option
+            current.options.append(match.group("option").strip())
+    _finish(result, current)
+    return result
+
+
+# Helper to parse quiz text
+def parse_quiz_text(quiz_text):
+    """Valid questions only, as Question objects (readable like the old dicts)"""
+    return parse_quiz(quiz_text).questions
+
+
+class IncrementalQuizParser:
+    """Parse streamed quiz text, emitting each question once its Answer line is complete"""
+
+    _complete_block = re.compile(
+        rf"^\s*Q(?:uestion)?\s*\d+\s*[.:)].*?^\s*{_ANSWER_HEAD}[^\n]*\n",
+        re.DOTALL | re.MULTILINE | re.IGNORECASE
+    )
+
+    def __init__(self):
+        self.buffer = ""
+        self.errors = []
+
+    def _parse(self, text):
+        result = parse_quiz(text)
+        self.errors.extend(result.errors)
+        return result.questions
+
+    def feed(self, chunk):
+        """Add a chunk of text and return the questions it completed"""
+        self.buffer += chunk
+        parsed = []
+        while True:
+            match = self._complete_block.search(self.buffer)
+            if not match:
+                break
+            parsed.extend(self._parse(match.group(0)))
+            self.buffer = self.buffer[match.end():]
+        return parsed
+
+    def close(self):
+        """Parse whatever is left once the stream has ended"""
+        parsed = self._parse(self.buffer)
+        self.buffer = ""
+        return parsed
+
+
+def format_quiz_text(questions):
+    """Render questions back into the canonical Q1./A)/Answer: format"""
+    blocks = []
+    for i, q in enumerate(questions, start=1):
+        lines = [f"Q{i}. {q['question']}"]
+        lines += [f"{letter}) {option}" for letter, option in zip(OPTION_LETTERS, q["options"])]
+        lines.append(f"Answer: {q['correct']}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def shuffle_options(questions, rng=None):
+    """Copies of the questions with their options shuffled and answers remapped"""
+    rng = rng or random.Random()
+    shuffled = []
+    for q in questions:
+        order = list(range(len(q["options"])))
+        rng.shuffle(order)
+        options = [q["options"][i] for i in order]
+        correct = OPTION_LETTERS[order.index(OPTION_LETTERS.index(q["correct"]))]
+        shuffled.append(Question(q.get("number"), q["question"], options, correct))
+    return shuffled
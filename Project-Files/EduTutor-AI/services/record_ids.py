@@ -0,0 +1,95 @@
+# record_ids.py
+# Deterministic record ids shared by both storage backends:
+#
+#   users     user_<sha256(email)[:32]>      derived from the email, so a user is a fetch by id
+#   attempts  <user id>_<seq, 10 digits>     seq is a per-student counter, so two submissions
+#                                            in the same second never overwrite each other
+#             <user id>_<seq>_<8 hex>        on a shared backend (Pinecone)
+#
+# Sequence numbers are handed out from the local SQLite file
+# (attempt_sequences) for both backends. A student without a counter row is
+# seeded from the highest sequence the backend already holds. Several app
+# instances writing to Pinecone each have their own counters, so there a random
+# suffix keeps two instances' attempt <seq> from overwriting each other.
+
+import hashlib
+import re
+import secrets
+
+from services import sqlite_store
+
+SEQ_DIGITS = 10
+SUFFIX_HEX = 8
+
+_attempt_id_pattern = re.compile(rf"^user_[0-9a-f]{{32}}_\d{{{SEQ_DIGITS}}}(?:_[0-9a-f]{{{SUFFIX_HEX}}})?$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempt_sequences (
+    email TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL
+);
+"""
+
+_schema_ready = False
+
+
+def normalize_email(email):
+    """The form every email is stored and looked up in; emails are case-insensitive"""
+    return str(email).strip().lower()
+
+
+def user_id(email):
+    return "user_" + hashlib.sha256(normalize_email(email).encode("utf-8")).hexdigest()[:32]
+
+
+def attempt_id(email, seq, suffix=None):
+    record_id = f"{user_id(email)}_{int(seq):0{SEQ_DIGITS}d}"
+    return f"{record_id}_{suffix}" if suffix else record_id
+
+
+def attempt_seq(email, record_id):
+    """The sequence number of one of this student's attempt ids, or None for other ids"""
+    record_id = str(record_id)
+    if not record_id.startswith(user_id(email) + "_") or not is_attempt_id(record_id):
+        return None
+    return int(record_id[len(user_id(email)) + 1:][:SEQ_DIGITS])
+
+
+def is_attempt_id(record_id):
+    """True for any student's attempt id (as opposed to a user id)"""
+    return bool(_attempt_id_pattern.match(str(record_id)))
+
+
+def _connection():
+    global _schema_ready
+    conn = sqlite_store.get_connection()
+    if not _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready = True
+    return conn
+
+
+def reserve_attempt_seqs(email, count=1, seed=None):
+    """
+    Reserve count consecutive sequence numbers for a student; returns the first.
+    seed() gives the highest sequence already stored, for students without a counter yet.
+    """
+    conn = _connection()
+    known = conn.execute("SELECT 1 FROM attempt_sequences WHERE email = ?", (email,)).fetchone()
+    start = 0 if known or seed is None else seed() or 0
+    with conn:
+        # The upsert takes the write lock, so concurrent reservations never overlap
+        conn.execute(
+            "INSERT INTO attempt_sequences (email, last_seq) VALUES (?, ?) "
+            "ON CONFLICT(email) DO UPDATE SET last_seq = last_seq + ?",
+            (email, start + count, count)
+        )
+        last = conn.execute("SELECT last_seq FROM attempt_sequences WHERE email = ?",
+                            (email,)).fetchone()[0]
+    return last - count + 1
+
+
+def new_attempt_id(email, seed=None, shared=False):
+    """shared: other app instances allocate ids for the same backend with their own counters"""
+    suffix = secrets.token_hex(SUFFIX_HEX // 2) if shared else None
+    return attempt_id(email, reserve_attempt_seqs(email, 1, seed), suffix)
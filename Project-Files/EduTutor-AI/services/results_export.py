@@ -0,0 +1,219 @@
+# results_export.py
+# Columnar snapshot of quiz attempts for analytics and downloads.
+#
+# export_results() appends attempts added since the last run to Parquet files
+# partitioned by day (RESULTS_EXPORT_DIR/date=YYYY-MM-DD/part-*.parquet),
+# each sorted by student and topic so row-group statistics can skip data.
+# Reads open the dataset memory-mapped, prune whole days with the date filter
+# and skip row groups by their student statistics, so only matching data is
+# decoded (topics match case-insensitively, so that filter runs per batch).
+# Results reach the backend late when they sit in the write-behind journal,
+# so each run re-reads an overlap window and skips ids it has already exported.
+#
+#   RESULTS_EXPORT_DIR=results_export
+#   RESULTS_EXPORT_OVERLAP_SECONDS=3600
+#   RESULTS_EXPORT_MAX_FILES=16      files per day before a partition is compacted
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m services.results_export [--full]
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from services import record_ids
+
+RESULTS_EXPORT_DIR = os.getenv("RESULTS_EXPORT_DIR", "results_export")
+EXPORT_OVERLAP_SECONDS = int(os.getenv("RESULTS_EXPORT_OVERLAP_SECONDS", "3600"))
+EXPORT_MAX_FILES = int(os.getenv("RESULTS_EXPORT_MAX_FILES", "16"))
+EXPORT_CHUNK_SIZE = 50000
+ROW_GROUP_SIZE = 65536
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+STATE_FILE = "_state.json"
+SORT_KEYS = [("email", "ascending"), ("topic", "ascending"), ("time", "ascending")]
+
+_export_lock = threading.Lock()
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("email", pa.string()),
+        ("topic", pa.string()),
+        ("score", pa.int32()),
+        ("total", pa.int32()),
+        ("time", pa.string()),
+    ])
+
+
+def _load_state(path):
+    try:
+        with open(os.path.join(path, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"watermark": "", "recent_ids": {}}
+
+
+def _save_state(path, state):
+    tmp = os.path.join(path, STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(path, STATE_FILE))
+
+
+def _minus_overlap(timestamp):
+    return (datetime.strptime(timestamp, TIME_FORMAT)
+            - timedelta(seconds=EXPORT_OVERLAP_SECONDS)).strftime(TIME_FORMAT)
+
+
+def _write_partitions(path, rows, run_id, part):
+    """Write rows as one sorted Parquet file per day"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    schema = _schema()
+    table = pa.table([pa.array([row.get(field.name) for row in rows], type=field.type) for field in schema],
+                     schema=schema)
+    days = pc.utf8_slice_codeunits(table["time"], 0, 10)
+    dates = days.unique().to_pylist()
+    for date in dates:
+        day = table.filter(pc.equal(days, date)).sort_by(SORT_KEYS)
+        directory = os.path.join(path, f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+        pq.write_table(day, os.path.join(directory, f"part-{run_id}-{part}.parquet"),
+                       row_group_size=ROW_GROUP_SIZE)
+    return dates
+
+
+def export_results(path=RESULTS_EXPORT_DIR, full=False):
+    """Append attempts added since the last export; full=True rebuilds the snapshot. Returns rows written."""
+    from services.storage import iter_quiz_results
+
+    with _export_lock:
+        if full and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+        state = _load_state(path)
+        since = _minus_overlap(state["watermark"]) if state["watermark"] else ""
+        recent, cutoff = state["recent_ids"], None
+        run_id, written, touched = uuid.uuid4().hex[:12], 0, set()
+        filters = {"start_date": since[:10]} if since else {}
+        for part, chunk in enumerate(iter_quiz_results(chunk_size=EXPORT_CHUNK_SIZE, **filters)):
+            # Chunks come in no particular order, so the watermark is the newest time seen so far
+            state["watermark"] = max(state["watermark"], max(str(r["time"]) for r in chunk))
+            cutoff = _minus_overlap(state["watermark"])
+            new_rows = [r for r in chunk if str(r["time"]) >= since and r.get("id") not in recent]
+            if not new_rows:
+                continue
+            touched.update(_write_partitions(path, new_rows, run_id, part))
+            written += len(new_rows)
+            # Ids only need remembering while they can still fall inside the overlap window
+            recent.update((r["id"], str(r["time"])) for r in new_rows if str(r["time"]) >= cutoff)
+        if cutoff is not None:
+            state["recent_ids"] = {i: t for i, t in recent.items() if t >= cutoff}
+        _save_state(path, state)
+        for date in touched:
+            _compact(os.path.join(path, f"date={date}"))
+        return written
+
+
+def _compact(directory, max_files=EXPORT_MAX_FILES):
+    """Merge a day's files into one once incremental runs have left too many"""
+    import pyarrow.parquet as pq
+
+    files = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+    if len(files) <= max_files:
+        return
+    table = pq.read_table([os.path.join(directory, f) for f in files], schema=_schema())
+    table = table.sort_by(SORT_KEYS)
+    merged = os.path.join(directory, f"part-compacted-{uuid.uuid4().hex[:12]}.parquet")
+    pq.write_table(table, merged, row_group_size=ROW_GROUP_SIZE)
+    for f in files:
+        os.remove(os.path.join(directory, f))
+
+
+def _dataset(path):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    partitioning = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+    return ds.dataset(path, format="parquet", schema=_schema().append(partitioning.schema.field(0)),
+                      partitioning=partitioning,
+                      filesystem=fs.LocalFileSystem(use_mmap=True),
+                      exclude_invalid_files=False, ignore_prefixes=[".", "_"])
+
+
+def _filter(email=None, topic=None, start_date=None, end_date=None):
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    conditions = []
+    if email:
+        # Stored emails are normalized (services.storage), so the filter must be too
+        conditions.append(ds.field("email") == record_ids.normalize_email(email))
+    if topic:
+        conditions.append(pc.utf8_lower(ds.field("topic")) == str(topic).lower())
+    if start_date:
+        conditions.append(ds.field("date") >= str(start_date))
+        conditions.append(ds.field("time") >= str(start_date))
+    if end_date:
+        conditions.append(ds.field("date") <= str(end_date))
+        conditions.append(ds.field("time") <= f"{end_date} 23:59:59")
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def iter_result_batches(path=RESULTS_EXPORT_DIR, columns=None, **filters):
+    """Matching attempts as Arrow record batches (same filters as get_quiz_results_page)"""
+    if not os.path.isdir(path):
+        return
+    dataset = _dataset(path)
+    columns = columns or _schema().names
+    yield from dataset.to_batches(columns=columns, filter=_filter(**filters))
+
+
+def read_results(path=RESULTS_EXPORT_DIR, columns=None, **filters):
+    """Matching attempts as one Arrow table"""
+    import pyarrow as pa
+
+    batches = list(iter_result_batches(path, columns=columns, **filters))
+    if not batches:
+        schema = _schema()
+        return schema.empty_table().select(columns) if columns else schema.empty_table()
+    return pa.Table.from_batches(batches)
+
+
+def write_download(file_format="parquet", path=RESULTS_EXPORT_DIR, **filters):
+    """
+    Stream matching attempts batch by batch into a temporary file and return it
+    opened for reading, so a download never holds the full result set in memory.
+    """
+    import pyarrow.csv as csv
+    import pyarrow.parquet as pq
+
+    out = tempfile.TemporaryFile()
+    writer = (csv.CSVWriter(out, _schema()) if file_format == "csv"
+              else pq.ParquetWriter(out, _schema()))
+    for batch in iter_result_batches(path, **filters):
+        writer.write_batch(batch)
+    writer.close()
+    out.seek(0)
+    return out
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    rows = export_results(full="--full" in sys.argv)
+    print(f"✅ Exported {rows} quiz results in {time.perf_counter() - start:.1f}s")
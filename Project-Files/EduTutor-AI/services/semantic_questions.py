@@ -0,0 +1,111 @@
+# semantic_questions.py
+# Answers quiz requests from previously generated, validated questions whose
+# embeddings are close to the requested topic, so "Newton's 2nd law" can be
+# served from questions generated for "Newton's second law of motion"
+# without calling the LLM.
+#
+#   SEMANTIC_RETRIEVAL=1         set to 0 to always generate
+#   SEMANTIC_MIN_SCORE=0.85      cosine similarity a question must reach
+#   SEMANTIC_TOPIC_MIN_SCORE=0.9 similarity its stored topic must reach
+#   SEMANTIC_CANDIDATES=4        neighbours fetched per requested question
+#
+# bge-large scores unrelated text around 0.6-0.8, so a question is only served
+# when it is close to the request and was generated for a topic that is itself
+# close to the requested one (or the same once normalized). The model loads in
+# the background on the first request; until it is ready, requests generate.
+
+import hashlib
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from services.embeddings import embed_texts, get_embedder
+from services.metrics import inc, span
+from services.quiz_parser import Question
+from services.vector_index import get_question_index
+
+SEMANTIC_RETRIEVAL = os.getenv("SEMANTIC_RETRIEVAL", "1") == "1"
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.85"))
+SEMANTIC_TOPIC_MIN_SCORE = float(os.getenv("SEMANTIC_TOPIC_MIN_SCORE", "0.9"))
+SEMANTIC_CANDIDATES = int(os.getenv("SEMANTIC_CANDIDATES", "4"))
+
+# Embedding runs off the request path
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-index")
+
+
+def question_id(q):
+    text = "\n".join([q["question"].strip().lower()] + sorted(o.strip().lower() for o in q["options"]))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_topic(topic):
+    return " ".join(re.findall(r"\w+", str(topic).lower()))
+
+
+def _close_topics(topic, stored_topics):
+    """The stored topics that match topic once normalized or embed within SEMANTIC_TOPIC_MIN_SCORE"""
+    wanted = normalize_topic(topic)
+    others = sorted({t for t in stored_topics if normalize_topic(t) != wanted})
+    close = {t for t in stored_topics if normalize_topic(t) == wanted}
+    if others:
+        vectors = embed_texts([topic] + others)
+        close.update(t for t, score in zip(others, vectors[1:] @ vectors[0])
+                     if score >= SEMANTIC_TOPIC_MIN_SCORE)
+    return close
+
+
+def _index():
+    return get_question_index(get_embedder().dim)
+
+
+def index_questions(topic, difficulty, questions, question_type="General"):
+    """Embed and store validated questions; returns how many were new"""
+    questions = [q for q in questions if not Question(None, q["question"], q["options"], q["correct"]).problems()]
+    if not questions or get_embedder() is None:
+        return 0
+    with span("semantic.index"):
+        vectors = embed_texts(f"{topic}: {q['question']}" for q in questions)
+        payloads = [{"topic": topic, "difficulty": str(difficulty).lower(), "type": question_type,
+                     "question": q["question"], "options": list(q["options"]), "correct": q["correct"]}
+                    for q in questions]
+        return _index().add([question_id(q) for q in questions], vectors, payloads)
+
+
+def _index_in_background(*args):
+    try:
+        index_questions(*args)
+    except Exception as e:
+        print(f"⚠️ Could not index questions: {e}")
+
+
+def index_questions_async(topic, difficulty, questions, question_type="General"):
+    if SEMANTIC_RETRIEVAL:
+        _executor.submit(_index_in_background, topic, difficulty, list(questions), question_type)
+
+
+def retrieve_questions(topic, num_questions, difficulty, question_type="General", min_score=None):
+    """num_questions stored questions near the topic, or [] if there are not enough close ones"""
+    # Never waits for the model: the first requests generate while it loads
+    if not SEMANTIC_RETRIEVAL or get_embedder(wait=False) is None:
+        return []
+    min_score = SEMANTIC_MIN_SCORE if min_score is None else min_score
+    try:
+        with span("semantic.retrieve"):
+            matches = _index().search(embed_texts([topic])[0], k=num_questions * SEMANTIC_CANDIDATES)
+            matches = [(score, p) for score, _, p in matches
+                       if score >= min_score and p.get("difficulty") == str(difficulty).lower()
+                       and p.get("type", "General") == question_type]
+            topics = _close_topics(topic, {p.get("topic", "") for _, p in matches})
+    except Exception as e:
+        # Retrieval is an optimisation; the caller falls back to generating
+        print(f"⚠️ Semantic retrieval failed: {e}")
+        return []
+    questions = [Question(None, p["question"], p["options"], p["correct"])
+                 for _, p in matches if p.get("topic", "") in topics]
+    if len(questions) < num_questions:
+        inc("semantic.misses")
+        return []
+    inc("semantic.hits")
+    # Vary which close questions are served between requests
+    return random.sample(questions[:num_questions * 2], num_questions)
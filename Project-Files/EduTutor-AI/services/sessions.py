@@ -0,0 +1,171 @@
+# sessions.py
+# Signed, expiring session tokens shared by the FastAPI routers and the
+# Streamlit app. Tokens are verified locally (HMAC, no backend round trip);
+# a small revocation list covers logout and refresh-token rotation.
+#
+#   ACCESS_TOKEN_TTL_SECONDS=900        short-lived token for API calls
+#   REFRESH_TOKEN_TTL_SECONDS=1209600   long-lived token that restores a session
+#   SESSION_COOKIE_NAME=edututor_session  HttpOnly cookie holding the refresh token
+#   SESSION_COOKIE_SECURE=1             send the cookie over HTTPS only
+#   SESSION_CODE_TTL_SECONDS=60         lifetime of a one-time session code
+#
+# The refresh token never appears in a URL. The FastAPI auth routes keep it in
+# an HttpOnly cookie; the Streamlit app, which cannot set cookies, receives a
+# one-time code in the URL instead and redeems it here.
+
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from config import JWT_ALGORITHM, JWT_SECRET
+from services.sqlite_store import get_connection
+
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL_SECONDS", "900"))
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL_SECONDS", str(14 * 24 * 3600)))
+# Revocations made by other processes are picked up this often
+REVOCATION_RELOAD_SECONDS = float(os.getenv("REVOCATION_RELOAD_SECONDS", "30"))
+SESSION_COOKIE = os.getenv("SESSION_COOKIE_NAME", "edututor_session")
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "1") == "1"
+SESSION_CODE_TTL = int(os.getenv("SESSION_CODE_TTL_SECONDS", "60"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_codes (
+    code TEXT PRIMARY KEY,
+    refresh_token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+_revoked = {}  # jti -> expires_at
+_revoked_loaded_at = 0.0
+_revoked_lock = threading.Lock()
+
+
+def _encode(claims, token_type, ttl):
+    from jose import jwt
+
+    now = int(time.time())
+    payload = dict(claims, type=token_type, iat=now, exp=now + ttl, jti=uuid.uuid4().hex)
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def _decode(token, token_type):
+    from jose import JWTError, jwt
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    if claims.get("type") != token_type or is_revoked(claims.get("jti")):
+        return None
+    return claims
+
+
+def issue_tokens(email, role, name=""):
+    """Return (access_token, refresh_token) for a freshly authenticated user"""
+    claims = {"sub": email, "role": role, "name": name or ""}
+    return (_encode(claims, "access", ACCESS_TOKEN_TTL),
+            _encode(claims, "refresh", REFRESH_TOKEN_TTL))
+
+
+def verify_access_token(token):
+    """Claims ({"sub", "role", "name", ...}) of a valid access token, else None"""
+    return _decode(token, "access") if token else None
+
+
+def verify_refresh_token(token):
+    return _decode(token, "refresh") if token else None
+
+
+def refresh_tokens(refresh_token):
+    """Rotate a refresh token: revoke it and return a new (access, refresh) pair, or None"""
+    claims = verify_refresh_token(refresh_token)
+    if not claims:
+        return None
+    _revoke_claims(claims)
+    return issue_tokens(claims["sub"], claims.get("role", "student"), claims.get("name", ""))
+
+
+def issue_session_code(refresh_token):
+    """A one-time code that redeem_session_code exchanges for refresh_token within SESSION_CODE_TTL"""
+    code = secrets.token_urlsafe(32)
+    conn = get_connection()
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.execute("DELETE FROM session_codes WHERE expires_at < ?", (time.time(),))
+        conn.execute("INSERT INTO session_codes (code, refresh_token, expires_at) VALUES (?, ?, ?)",
+                     (code, refresh_token, time.time() + SESSION_CODE_TTL))
+    return code
+
+
+def redeem_session_code(code):
+    """The refresh token behind a one-time code, or None; a code works once"""
+    if not code:
+        return None
+    conn = get_connection()
+    with conn:
+        conn.executescript(SCHEMA)
+        row = conn.execute("SELECT refresh_token, expires_at FROM session_codes WHERE code = ?",
+                           (code,)).fetchone()
+        if row is None or not conn.execute("DELETE FROM session_codes WHERE code = ?", (code,)).rowcount:
+            return None
+    return row["refresh_token"] if row["expires_at"] >= time.time() else None
+
+
+def session_route_url(auth_base_url, next_url, code=None):
+    """URL of the FastAPI /auth/session route, which sets the cookie and returns to next_url with a fresh code"""
+    from urllib.parse import urlencode
+
+    params = {"next": next_url, **({"session_code": code} if code else {})}
+    return f"{auth_base_url.rstrip('/')}/auth/session?{urlencode(params)}"
+
+
+def revoke_token(token):
+    """Revoke a token (e.g. on logout); invalid tokens are ignored"""
+    from jose import JWTError, jwt
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return
+    _revoke_claims(claims)
+
+
+def _revoke_claims(claims):
+    jti, expires_at = claims.get("jti"), float(claims.get("exp", 0))
+    if not jti:
+        return
+    conn = get_connection()
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+                     (jti, expires_at))
+    with _revoked_lock:
+        _revoked[jti] = expires_at
+
+
+def _reload_revoked():
+    """Refresh the in-memory list from the shared table, dropping expired entries"""
+    global _revoked_loaded_at
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (now,))
+    rows = conn.execute("SELECT jti, expires_at FROM revoked_tokens").fetchall()
+    with _revoked_lock:
+        _revoked.clear()
+        _revoked.update((row["jti"], row["expires_at"]) for row in rows)
+        _revoked_loaded_at = now
+
+
+def is_revoked(jti):
+    if time.time() - _revoked_loaded_at > REVOCATION_RELOAD_SECONDS:
+        _reload_revoked()
+    return jti in _revoked
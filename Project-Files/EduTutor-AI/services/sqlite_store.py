@@ -0,0 +1,213 @@
+# sqlite_store.py
+# Local storage backend for users and quiz results (same functions as pinecone_service)
+
+import os
+import sqlite3
+import threading
+
+from services import record_ids
+
+SQLITE_DB_PATH = os.getenv(
+    "SQLITE_DB_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'edututor.sqlite3')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT,
+    role TEXT,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS quiz_results (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    topic TEXT COLLATE NOCASE,
+    score INTEGER,
+    total INTEGER,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS quiz_results_email_time_id ON quiz_results (email, time, id);
+CREATE INDEX IF NOT EXISTS quiz_results_time_id ON quiz_results (time, id);
+CREATE INDEX IF NOT EXISTS quiz_results_topic_time_id ON quiz_results (topic COLLATE NOCASE, time, id);
+"""
+
+# Stay well under SQLite's bound-parameter limit in IN (...) lookups
+IN_BATCH = 500
+
+_local = threading.local()
+
+
+def get_connection():
+    """One connection per thread; WAL lets readers run alongside the writer"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(SQLITE_DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _user_row(row):
+    return {
+        "type": "user",
+        "email": row["email"],
+        "password": row["password"],
+        "role": row["role"],
+        "name": row["name"] or ""
+    }
+
+
+def _quiz_row(row):
+    return {
+        "type": "quiz",
+        "id": row["id"],
+        "email": row["email"],
+        "topic": row["topic"],
+        "score": row["score"],
+        "total": row["total"],
+        "time": row["time"]
+    }
+
+# === USER AUTH DATA ===
+
+def upsert_user_data(user_id: str, user_data: dict):
+    """Store user login/signup data; the email is unique."""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO users (id, email, password, role, name) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(email) DO UPDATE SET password=excluded.password, "
+            "role=excluded.role, name=excluded.name",
+            (user_id, user_data["email"], user_data["password"],
+             user_data["role"], user_data.get("name", ""))
+        )
+
+def get_user_by_email(email: str):
+    """Retrieve user by email."""
+    row = get_connection().execute(
+        "SELECT * FROM users WHERE email = ?", (email,)
+    ).fetchone()
+    return _user_row(row) if row else None
+
+def get_users_by_emails(emails):
+    """Users for many emails at once, as {email: user}; unknown emails are left out."""
+    emails = list(dict.fromkeys(emails))
+    users = {}
+    for start in range(0, len(emails), IN_BATCH):
+        batch = emails[start:start + IN_BATCH]
+        rows = get_connection().execute(
+            f"SELECT * FROM users WHERE email IN ({','.join('?' * len(batch))})", batch
+        ).fetchall()
+        users.update((row["email"], _user_row(row)) for row in rows)
+    return users
+
+def update_user_password(email: str, hashed_password: str):
+    """Replace a user's stored password hash, e.g. after a cost change."""
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE users SET password = ? WHERE email = ?", (hashed_password, email))
+
+# === QUIZ RESULT DATA ===
+
+def store_quiz_result(student_email: str, quiz_data: dict):
+    """Store quiz result for a student."""
+    store_quiz_results([(student_email, quiz_data)])
+
+def store_quiz_results(items):
+    """Store many (student_email, quiz_data) results in one transaction.
+    quiz_data["id"] is the attempt id; one is allocated when it is missing."""
+    rows = [(quiz_data.get("id") or record_ids.new_attempt_id(email, lambda: max_attempt_seq(email)),
+             email, quiz_data["topic"], quiz_data["score"], quiz_data["total"], quiz_data["time"])
+            for email, quiz_data in items]
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO quiz_results (id, email, topic, score, total, time) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+def max_attempt_seq(email: str):
+    """Highest attempt sequence stored for a student (0 if none)."""
+    prefix = record_ids.user_id(email) + "_"
+    row = get_connection().execute(
+        "SELECT id FROM quiz_results WHERE email = ? AND substr(id, 1, ?) = ? ORDER BY id DESC LIMIT 1",
+        (email, len(prefix), prefix)
+    ).fetchone()
+    return record_ids.attempt_seq(email, row["id"]) or 0 if row else 0
+
+def get_attempts(ids):
+    """Quiz results for many attempt ids at once, in the order asked; missing ids are left out."""
+    ids = list(dict.fromkeys(ids))
+    found = {}
+    for start in range(0, len(ids), IN_BATCH):
+        batch = ids[start:start + IN_BATCH]
+        rows = get_connection().execute(
+            f"SELECT * FROM quiz_results WHERE id IN ({','.join('?' * len(batch))})", batch
+        ).fetchall()
+        found.update((row["id"], _quiz_row(row)) for row in rows)
+    return [found[i] for i in ids if i in found]
+
+def get_all_quiz_results():
+    """Return all quiz entries (for educators)."""
+    rows = get_connection().execute(
+        "SELECT * FROM quiz_results ORDER BY time DESC"
+    ).fetchall()
+    return [_quiz_row(row) for row in rows]
+
+def get_quizzes_by_student(email: str):
+    rows = get_connection().execute(
+        "SELECT * FROM quiz_results WHERE email = ? ORDER BY time DESC", (email,)
+    ).fetchall()
+    return [_quiz_row(row) for row in rows]
+
+def get_quiz_results_page(cursor=None, page_size=50, email=None, topic=None,
+                          start_date=None, end_date=None):
+    """
+    One page of quiz results, newest first, filtered in SQL.
+    Returns (results, next_cursor); next_cursor is None on the last page.
+    Dates are 'YYYY-MM-DD' strings and both ends are inclusive.
+    """
+    clauses, params = [], []
+    if email:
+        clauses.append("email = ?")
+        params.append(email)
+    if topic:
+        clauses.append("topic = ?")
+        params.append(topic)
+    if start_date:
+        clauses.append("time >= ?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append("time <= ?")
+        params.append(f"{end_date} 23:59:59")
+    if cursor:
+        # Keyset pagination: continue strictly after the last (time, id) served
+        last_time, last_id = cursor.split("|", 1)
+        clauses.append("(time < ? OR (time = ? AND id < ?))")
+        params.extend([last_time, last_time, last_id])
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = get_connection().execute(
+        f"SELECT * FROM quiz_results {where} ORDER BY time DESC, id DESC LIMIT ?",
+        params + [page_size + 1]
+    ).fetchall()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = f"{rows[-1]['time']}|{rows[-1]['id']}"
+    return [_quiz_row(row) for row in rows], next_cursor
+
+def iter_quiz_results(chunk_size=1000, **filters):
+    """Every matching quiz result in chunks, newest first; each chunk is one indexed keyset page."""
+    cursor = None
+    while True:
+        results, cursor = get_quiz_results_page(cursor=cursor, page_size=chunk_size, **filters)
+        if results:
+            yield results
+        if not cursor:
+            break
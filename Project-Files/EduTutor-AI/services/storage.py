@@ -0,0 +1,223 @@
+# storage.py
+# Picks the backend for users and quiz results. Both backends expose the same
+# functions: upsert_user_data, get_user_by_email, get_users_by_emails,
+# store_quiz_result, get_attempts, get_all_quiz_results, get_quizzes_by_student,
+# get_quiz_results_page and iter_quiz_results.
+# Record ids come from services.record_ids: users are keyed by a hash of their
+# email and quiz attempts by a per-student sequence number. Emails are
+# normalized (record_ids.normalize_email) here, on every write and lookup, so
+# the backends only ever see one spelling of each.
+#
+#   STORAGE_BACKEND=sqlite    local SQLite/WAL file with real indexes (default)
+#   STORAGE_BACKEND=pinecone  metadata on dummy vectors in the Pinecone index
+#
+# Reads are memoized per process and invalidated when a write touches the same
+# email, so Streamlit reruns don't repeat backend round trips. Other processes
+# only see a write once their entry expires (STORAGE_CACHE_TTL_SECONDS).
+#
+# With STORAGE_WRITE_BEHIND=1 (the default for Pinecone) quiz results are
+# journaled locally and flushed in batches by services.write_behind; reads
+# for a student merge in their journaled results so they see their own writes.
+
+import os
+import threading
+import time
+
+from services import record_ids
+from services.metrics import span
+from services.quiz_analytics import update_aggregates
+from services.write_behind import WriteBehindQueue
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+
+if STORAGE_BACKEND == "pinecone":
+    from services import pinecone_service as backend
+elif STORAGE_BACKEND == "sqlite":
+    from services import sqlite_store as backend
+else:
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+STORAGE_WRITE_BEHIND = os.getenv(
+    "STORAGE_WRITE_BEHIND", "1" if STORAGE_BACKEND == "pinecone" else "0") == "1"
+
+STORAGE_CACHE_TTL = float(os.getenv("STORAGE_CACHE_TTL_SECONDS", "300"))
+STORAGE_CACHE_MAX_ENTRIES = int(os.getenv("STORAGE_CACHE_MAX_ENTRIES", "10000"))
+
+# Cache tag for reads that span every student
+ALL_RESULTS = "*"
+
+_read_cache = {}     # (name, args) -> (expires_at, value)
+_tag_versions = {}   # tag -> bumped on every write, so in-flight reads can't cache stale data
+_cache_lock = threading.Lock()
+# Streamlit runs each session's script in its own thread, so this counts per rerun
+_call_counter = threading.local()
+
+
+def _count_backend_call():
+    _call_counter.count = getattr(_call_counter, "count", 0) + 1
+
+def get_backend_call_count():
+    """Backend calls made by this thread since the last reset."""
+    return getattr(_call_counter, "count", 0)
+
+def reset_backend_call_count():
+    _call_counter.count = 0
+
+def _cached(tags, name, args, load):
+    key = (name, args)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _read_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        versions = [_tag_versions.get(tag, 0) for tag in tags]
+    _count_backend_call()
+    with span(f"storage.{name}"):
+        value = load()
+    with _cache_lock:
+        if versions == [_tag_versions.get(tag, 0) for tag in tags]:
+            if len(_read_cache) >= STORAGE_CACHE_MAX_ENTRIES:
+                _read_cache.clear()
+            _read_cache[key] = (now + STORAGE_CACHE_TTL, value, tags)
+    return value
+
+def invalidate(*tags):
+    """Drop cached reads for these emails (or ALL_RESULTS)."""
+    tags = [record_ids.normalize_email(tag) for tag in tags]
+    with _cache_lock:
+        for tag in tags:
+            _tag_versions[tag] = _tag_versions.get(tag, 0) + 1
+        for key in [k for k, v in _read_cache.items() if set(v[2]) & set(tags)]:
+            del _read_cache[key]
+
+def clear_cache():
+    with _cache_lock:
+        _read_cache.clear()
+
+
+def _on_results_flushed(emails):
+    invalidate(*emails, ALL_RESULTS)
+
+write_queue = WriteBehindQueue(backend.store_quiz_results, on_flushed=_on_results_flushed) \
+    if STORAGE_WRITE_BEHIND else None
+
+def _with_pending(results, email=None, topic=None, start_date=None, end_date=None):
+    """Merge journaled, not yet flushed results into a newest-first result list."""
+    if not write_queue:
+        return results
+    pending = []
+    for pending_email, quiz_data in write_queue.pending(email):
+        if topic and str(quiz_data["topic"]).lower() != topic.lower():
+            continue
+        if start_date and quiz_data["time"] < str(start_date):
+            continue
+        if end_date and quiz_data["time"] > f"{end_date} 23:59:59":
+            continue
+        pending.append({"type": "quiz", "email": pending_email, **quiz_data})
+    if not pending:
+        return results
+    # A batch can be in the backend and the journal for a moment; show it once
+    seen = {r.get("id") for r in results}
+    merged = results + [r for r in pending if r.get("id") not in seen]
+    return sorted(merged, key=lambda r: r.get("time", ""), reverse=True)
+
+
+def upsert_user_data(user_id: str, user_data: dict):
+    user_data = dict(user_data, email=record_ids.normalize_email(user_data["email"]))
+    _count_backend_call()
+    with span("storage.upsert_user"):
+        result = backend.upsert_user_data(user_id, user_data)
+    invalidate(user_data["email"])
+    return result
+
+def get_user_by_email(email: str):
+    email = record_ids.normalize_email(email)
+    return _cached((email,), "user", (email,), lambda: backend.get_user_by_email(email))
+
+def get_users_by_emails(emails):
+    """{email: user} for many emails in one backend round trip (per batch), keyed as given."""
+    emails = list(dict.fromkeys(e for e in emails if e))
+    if not emails:
+        return {}
+    _count_backend_call()
+    with span("storage.get_users_by_emails"):
+        users = backend.get_users_by_emails(list({record_ids.normalize_email(e) for e in emails}))
+    return {e: users[record_ids.normalize_email(e)] for e in emails if record_ids.normalize_email(e) in users}
+
+def update_user_password(email: str, hashed_password: str):
+    email = record_ids.normalize_email(email)
+    _count_backend_call()
+    with span("storage.update_user_password"):
+        result = backend.update_user_password(email, hashed_password)
+    invalidate(email)
+    return result
+
+def store_quiz_result(student_email: str, quiz_data: dict):
+    """Store one quiz attempt and return its id."""
+    student_email = record_ids.normalize_email(student_email)
+    if not quiz_data.get("id"):
+        # Allocated up front so a journaled result keeps its id through retries
+        quiz_data = dict(quiz_data, id=record_ids.new_attempt_id(
+            student_email, lambda: backend.max_attempt_seq(student_email), shared=STORAGE_BACKEND != "sqlite"))
+    if write_queue:
+        with span("storage.enqueue_quiz_result"):
+            write_queue.enqueue(student_email, quiz_data)
+    else:
+        _count_backend_call()
+        with span("storage.store_quiz_result"):
+            backend.store_quiz_result(student_email, quiz_data)
+    update_aggregates(student_email, quiz_data)
+    invalidate(student_email, ALL_RESULTS)
+    return quiz_data["id"]
+
+def get_attempts(ids):
+    """Quiz attempts for many ids in one backend round trip (per batch), in the order asked."""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    _count_backend_call()
+    with span("storage.get_attempts"):
+        found = {r["id"]: r for r in backend.get_attempts(ids)}
+    if write_queue:
+        for email, quiz_data in write_queue.pending():
+            if quiz_data.get("id") in ids and quiz_data["id"] not in found:
+                found[quiz_data["id"]] = {"type": "quiz", "email": email, **quiz_data}
+    return [found[i] for i in ids if i in found]
+
+def get_all_quiz_results():
+    return _with_pending(_cached((ALL_RESULTS,), "all_results", (), backend.get_all_quiz_results))
+
+def get_quizzes_by_student(email: str):
+    email = record_ids.normalize_email(email)
+    results = _cached((email,), "student_results", (email,),
+                      lambda: backend.get_quizzes_by_student(email))
+    return _with_pending(results, email=email)
+
+def get_quiz_results_page(cursor=None, page_size=50, email=None, topic=None,
+                          start_date=None, end_date=None):
+    """One page of quiz results, newest first. Returns (results, next_cursor)."""
+    email = record_ids.normalize_email(email) if email else email
+    args = (cursor, page_size, email, topic, str(start_date or ""), str(end_date or ""))
+    results, next_cursor = _cached(
+        (email or ALL_RESULTS,), "results_page", args,
+        lambda: backend.get_quiz_results_page(cursor=cursor, page_size=page_size, email=email,
+                                              topic=topic, start_date=start_date, end_date=end_date)
+    )
+    if cursor is None:
+        # Unflushed results are always the newest, so they belong on the first page
+        results = _with_pending(results, email=email, topic=topic,
+                                start_date=start_date, end_date=end_date)
+    return results, next_cursor
+
+def iter_quiz_results(chunk_size=1000, **filters):
+    """
+    Stream every matching quiz result in chunks without loading them all at once.
+    Chunks come in no particular order (Pinecone yields them in listing order),
+    and the whole walk costs one pass over the backend.
+    """
+    if filters.get("email"):
+        filters["email"] = record_ids.normalize_email(filters["email"])
+    for chunk in backend.iter_quiz_results(chunk_size=chunk_size, **filters):
+        _count_backend_call()
+        yield chunk
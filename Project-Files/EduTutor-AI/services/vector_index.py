@@ -0,0 +1,281 @@
+# vector_index.py
+# Vector indexes for question embeddings.
+#
+# LocalVectorIndex keeps unit vectors in a memory-mapped float32 file and
+# payloads in SQLite. Below IVF_MIN_ROWS it scans exactly; above that an IVF
+# index (spherical k-means lists, nprobe lists scanned per query) is built in
+# the background and rows added since the last build are scanned exactly.
+# PineconeVectorIndex stores the same records in a namespace of the existing
+# Pinecone index (dimension 1024, cosine).
+#
+#   VECTOR_BACKEND=local            or "pinecone"
+#   VECTOR_INDEX_DIR=vector_index   directory of the local index
+#   IVF_MIN_ROWS=20000  IVF_NPROBE=16  IVF_REBUILD_FRACTION=0.2
+#   PINECONE_QUESTION_NAMESPACE=questions
+
+import json
+import math
+import os
+import sqlite3
+import threading
+
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "local")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "20000"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+# Rebuild the lists once rows added since the last build exceed this fraction
+IVF_REBUILD_FRACTION = float(os.getenv("IVF_REBUILD_FRACTION", "0.2"))
+PINECONE_QUESTION_NAMESPACE = os.getenv("PINECONE_QUESTION_NAMESPACE", "questions")
+
+SCAN_CHUNK_ROWS = 65536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL
+);
+"""
+
+
+def _top_k(scores, rows, k):
+    """(scores, rows) of the k best, best first"""
+    import numpy as np
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[best], rows[best]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], rows[order]
+
+
+class LocalVectorIndex:
+    """Memory-mapped cosine index with exact search and an optional IVF layer"""
+
+    def __init__(self, path=VECTOR_INDEX_DIR, dim=None, ivf_min_rows=IVF_MIN_ROWS,
+                 nprobe=IVF_NPROBE, rebuild_fraction=IVF_REBUILD_FRACTION):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.rebuild_fraction = rebuild_fraction
+        self._lock = threading.RLock()
+        self._building = False
+        self._db = sqlite3.connect(os.path.join(path, "items.sqlite3"), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        info = dict(self._db.execute("SELECT key, value FROM info").fetchall())
+        stored_dim = int(info["dim"]) if "dim" in info else None
+        if dim and stored_dim and dim != stored_dim:
+            raise ValueError(f"Index at {path} has dimension {stored_dim}, not {dim}")
+        self.dim = stored_dim or dim
+        if not self.dim:
+            raise ValueError("dim is required for a new index")
+        with self._db:
+            self._db.execute("INSERT OR IGNORE INTO info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+        self._count = self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._vectors = None
+        self._capacity = 0
+        if os.path.exists(self._vectors_path):
+            self._map(os.path.getsize(self._vectors_path) // (4 * self.dim))
+        self._ivf = self._load_ivf()
+
+    def __len__(self):
+        return self._count
+
+    # --- Storage ---
+
+    def _map(self, capacity):
+        import numpy as np
+        if self._vectors is not None:
+            self._vectors.flush()
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self.dim)) if capacity else None
+        self._capacity = capacity
+
+    def _reserve(self, rows):
+        if rows > self._capacity:
+            self._map(max(rows, self._capacity * 2, 1024))
+
+    def add(self, ids, vectors, payloads):
+        """Add new (id, vector, payload) records; known ids are skipped. Returns the number added."""
+        import numpy as np
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        added = 0
+        with self._lock:
+            self._reserve(self._count + len(vectors))
+            with self._db:
+                for item_id, vector, payload in zip(ids, vectors, payloads):
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO items (row, id, payload) VALUES (?, ?, ?)",
+                        (self._count, item_id, json.dumps(payload)))
+                    if cursor.rowcount:
+                        self._vectors[self._count] = vector
+                        self._count += 1
+                        added += 1
+            if added:
+                self._vectors.flush()
+        if added:
+            self._maybe_rebuild()
+        return added
+
+    # --- Search ---
+
+    def _scan(self, query, start, stop, k):
+        import numpy as np
+        best_scores, best_rows = np.empty(0, np.float32), np.empty(0, np.int64)
+        for chunk in range(start, stop, SCAN_CHUNK_ROWS):
+            end = min(chunk + SCAN_CHUNK_ROWS, stop)
+            scores = self._vectors[chunk:end] @ query
+            best_scores, best_rows = _top_k(np.concatenate([best_scores, scores]),
+                                            np.concatenate([best_rows, np.arange(chunk, end)]), k)
+        return best_scores, best_rows
+
+    def _search_ivf(self, query, ivf, k, nprobe):
+        import numpy as np
+        centroids, order, offsets, built = ivf
+        nprobe = min(nprobe, len(centroids))
+        lists = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        candidates = np.sort(np.concatenate([order[offsets[i]:offsets[i + 1]] for i in lists]))
+        scores, rows = _top_k(self._vectors[candidates] @ query, candidates, k)
+        if built < self._count:
+            # Rows added since the lists were built
+            tail_scores, tail_rows = self._scan(query, built, self._count, k)
+            scores, rows = _top_k(np.concatenate([scores, tail_scores]),
+                                  np.concatenate([rows, tail_rows]), k)
+        return scores, rows
+
+    def search(self, vector, k=10, nprobe=None, exact=False):
+        """[(score, id, payload), ...] of the k nearest vectors, best first"""
+        import numpy as np
+        query = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if not self._count:
+                return []
+            ivf = self._ivf
+            if ivf is not None and not exact:
+                scores, rows = self._search_ivf(query, ivf, k, nprobe or self.nprobe)
+            else:
+                scores, rows = self._scan(query, 0, self._count, k)
+            placeholders = ",".join("?" * len(rows))
+            found = {row: (item_id, payload) for row, item_id, payload in self._db.execute(
+                f"SELECT row, id, payload FROM items WHERE row IN ({placeholders})", [int(r) for r in rows])}
+        return [(float(score), found[int(row)][0], json.loads(found[int(row)][1]))
+                for score, row in zip(scores, rows)]
+
+    # --- IVF ---
+
+    def _ivf_files(self):
+        return [os.path.join(self.path, name) for name in ("ivf_centroids.npy", "ivf_order.npy", "ivf_offsets.npy")]
+
+    def _load_ivf(self):
+        import numpy as np
+        files = self._ivf_files()
+        if not all(os.path.exists(f) for f in files):
+            return None
+        centroids, order, offsets = (np.load(f, mmap_mode="r") for f in files)
+        return np.asarray(centroids), order, np.asarray(offsets), len(order)
+
+    def _maybe_rebuild(self):
+        if self._count < self.ivf_min_rows or self._building:
+            return
+        built = self._ivf[3] if self._ivf else 0
+        if self._count - built > self.rebuild_fraction * built:
+            self._building = True
+            threading.Thread(target=self.build_ivf, daemon=True, name="ivf-build").start()
+
+    def build_ivf(self, n_lists=None, seed=0):
+        """(Re)build the IVF lists over the current rows with spherical k-means"""
+        import numpy as np
+        self._building = True
+        try:
+            with self._lock:
+                count, vectors = self._count, self._vectors
+            if not count:
+                return
+            n_lists = n_lists or max(1, int(math.sqrt(count)))
+            rng = np.random.default_rng(seed)
+            sample_size = min(count, n_lists * KMEANS_SAMPLE_PER_LIST)
+            sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))])
+            centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                sizes = np.bincount(assign, minlength=n_lists)
+                sums = np.zeros_like(centroids)
+                nonempty = sizes > 0
+                starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])[nonempty]
+                sums[nonempty] = np.add.reduceat(sample[np.argsort(assign, kind="stable")], starts)
+                empty = ~nonempty
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                centroids = (sums / norms).astype(np.float32)
+
+            assign = np.empty(count, dtype=np.int32)
+            for chunk in range(0, count, SCAN_CHUNK_ROWS):
+                end = min(chunk + SCAN_CHUNK_ROWS, count)
+                assign[chunk:end] = np.argmax(vectors[chunk:end] @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable").astype(np.int64)
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+
+            for path, array in zip(self._ivf_files(), (centroids, order, offsets)):
+                np.save(path, array)
+            with self._lock:
+                self._ivf = (centroids, order, offsets, count)
+        finally:
+            self._building = False
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._db.close()
+
+
+class PineconeVectorIndex:
+    """Question vectors in their own namespace of the Pinecone index"""
+
+    def __init__(self, namespace=PINECONE_QUESTION_NAMESPACE, dim=1024):
+        self.namespace = namespace
+        self.dim = dim
+
+    def add(self, ids, vectors, payloads):
+        from services.pinecone_service import get_index
+
+        records = [{"id": item_id, "values": [float(x) for x in vector], "metadata": payload}
+                   for item_id, vector, payload in zip(ids, vectors, payloads)]
+        for start in range(0, len(records), 100):
+            get_index().upsert(vectors=records[start:start + 100], namespace=self.namespace)
+        return len(records)
+
+    def search(self, vector, k=10, **_):
+        from services.pinecone_service import get_index
+
+        response = get_index().query(vector=[float(x) for x in vector], top_k=k,
+                                     include_metadata=True, namespace=self.namespace)
+        return [(match.score, match.id, dict(match.metadata)) for match in response.matches]
+
+
+_question_index = None
+_question_index_lock = threading.Lock()
+
+
+def get_question_index(dim):
+    """The process-wide question index for VECTOR_BACKEND, opened on first use"""
+    global _question_index
+    if _question_index is None:
+        with _question_index_lock:
+            if _question_index is None:
+                if VECTOR_BACKEND == "pinecone":
+                    _question_index = PineconeVectorIndex(dim=dim)
+                else:
+                    _question_index = LocalVectorIndex(dim=dim)
+    return _question_index
@@ -1,13 +1,15 @@
 import os
-import requests
 from dotenv import load_dotenv
 import streamlit as st
 
+from services.llm_provider import get_provider
+
 load_dotenv()
 
 WATSONX_API_KEY = st.secrets["WATSONX_API_KEY"]
 WATSONX_URL = st.secrets["WATSONX_URL"]  # Example: https://us-south.ml.cloud.ibm.com
 WATSONX_MODEL_ID = st.secrets.get("WATSONX_MODEL_ID", "ibm/granite-13b-instruct-v2")
+WATSONX_PROJECT_ID = st.secrets.get("WATSONX_PROJECT_ID") or os.getenv("WATSONX_PROJECT_ID")
 
 def generate_quiz_from_watsonx(topic: str, difficulty: str):
     prompt = f"""
@@ -23,22 +25,9 @@ def generate_quiz_from_watsonx(topic: str, difficulty: str):
     Answer: b
     """
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {WATSONX_API_KEY}"
-    }
-
-    data = {
-        "model_id": WATSONX_MODEL_ID,
-        "input": prompt,
-        "parameters": {
-            "decoding_method": "greedy",
-            "max_new_tokens": 500
-        }
-    }
-
-    response = requests.post(f"{WATSONX_URL}/ml/v1/text/generation", json=data, headers=headers)
-    response.raise_for_status()
-    
-    result = response.json()
-    return result.get("results", [{}])[0].get("generated_text", "") 
\ No newline at end of file
+    provider = get_provider(WATSONX_MODEL_ID, url=WATSONX_URL, apikey=WATSONX_API_KEY,
+                            project_id=WATSONX_PROJECT_ID)
+    return provider.generate(prompt, {
+        "decoding_method": "greedy",
+        "max_new_tokens": 500
+    })
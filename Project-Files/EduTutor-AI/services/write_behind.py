@@ -0,0 +1,129 @@
+# write_behind.py
+# Durable write-behind queue for quiz results. Submits are journaled to the
+# local SQLite file and return immediately; a background thread flushes them
+# to the storage backend in batches, retrying with backoff. Journaled rows
+# survive a crash and are flushed on the next start.
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+
+from services.metrics import inc, span
+from services.sqlite_store import get_connection
+
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "2"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF_SECONDS", "60"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    quiz_data TEXT NOT NULL,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quiz_journal_email ON quiz_journal (email);
+"""
+
+
+class WriteBehindQueue:
+    """Journal quiz results locally and flush them with write_batch(items) in the background"""
+
+    def __init__(self, write_batch, on_flushed=None, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval=WRITE_BEHIND_FLUSH_SECONDS, max_backoff=WRITE_BEHIND_MAX_BACKOFF):
+        self.write_batch = write_batch
+        self.on_flushed = on_flushed
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.flushed = 0
+        self.failures = 0
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        get_connection().executescript(SCHEMA)
+        if self.pending_count():
+            self._ensure_worker()  # results left over from a previous run
+        atexit.register(self._flush_on_exit)
+
+    def enqueue(self, student_email: str, quiz_data: dict):
+        conn = get_connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO quiz_journal (email, quiz_data, enqueued_at) VALUES (?, ?, ?)",
+                (student_email, json.dumps(quiz_data), time.time())
+            )
+        self._ensure_worker()
+        if self.pending_count() >= self.batch_size:
+            self._wake.set()
+
+    def pending(self, email=None):
+        """Journaled results not yet flushed, as (email, quiz_data) pairs"""
+        query = "SELECT email, quiz_data FROM quiz_journal"
+        params = ()
+        if email:
+            query += " WHERE email = ?"
+            params = (email,)
+        rows = get_connection().execute(query + " ORDER BY seq", params).fetchall()
+        return [(row["email"], json.loads(row["quiz_data"])) for row in rows]
+
+    def pending_count(self):
+        return get_connection().execute("SELECT COUNT(*) FROM quiz_journal").fetchone()[0]
+
+    def flush(self):
+        """Write one batch to the backend; returns how many results were flushed"""
+        with self._flush_lock:
+            conn = get_connection()
+            rows = conn.execute(
+                "SELECT seq, email, quiz_data FROM quiz_journal ORDER BY seq LIMIT ?",
+                (self.batch_size,)
+            ).fetchall()
+            if not rows:
+                return 0
+            with span("storage.flush_quiz_results"):
+                self.write_batch([(row["email"], json.loads(row["quiz_data"])) for row in rows])
+            with conn:
+                conn.executemany("DELETE FROM quiz_journal WHERE seq = ?",
+                                 [(row["seq"],) for row in rows])
+            self.flushed += len(rows)
+            inc("storage.flushed_quiz_results", len(rows))
+        if self.on_flushed:
+            self.on_flushed({row["email"] for row in rows})
+        return len(rows)
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="quiz-write-behind",
+                                                daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        failures = 0
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.failures += 1
+                delay = min(self.max_backoff, self.flush_interval * 2 ** failures)
+                print(f"⚠️ Quiz write-behind flush failed ({e}), retrying in {delay:.0f}s")
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _flush_on_exit(self):
+        try:
+            while self.flush():
+                pass
+        except Exception as e:
+            print("⚠️ Quiz results left in the journal for the next start:", str(e))
+
+    def stats(self):
+        return {"pending": self.pending_count(), "flushed": self.flushed, "failures": self.failures}
@@ -0,0 +1,29 @@
+# conftest.py
+# Points every service at offline stand-ins before anything imports them:
+# the stub LLM provider, a throwaway SQLite database, no semantic retrieval
+# and a fixed JWT secret.
+#
+# Usage (from Project-Files/EduTutor-AI):
+#   python -m pytest tests
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix="edututor-tests-")
+os.environ.update({
+    "LLM_PROVIDER": "stub",
+    "STUB_LLM_LATENCY_SECONDS": "0",
+    "STORAGE_BACKEND": "sqlite",
+    "STORAGE_WRITE_BEHIND": "0",
+    "SQLITE_DB_PATH": os.path.join(_workdir, "tests.sqlite3"),
+    "SEMANTIC_RETRIEVAL": "0",
+    "VECTOR_INDEX_DIR": os.path.join(_workdir, "vector_index"),
+    "RESULTS_EXPORT_DIR": os.path.join(_workdir, "results_export"),
+    "JWT_SECRET": "tests-secret",
+    "JWT_ALGORITHM": "HS256",
+})
@@ -0,0 +1,61 @@
+import pytest
+
+from services import migrate_email_case, sqlite_store, storage
+from services.record_ids import user_id
+
+
+@pytest.fixture(autouse=True)
+def fresh_tables():
+    conn = sqlite_store.get_connection()
+    with conn:
+        conn.execute("DELETE FROM users")
+        conn.execute("DELETE FROM quiz_results")
+    storage.clear_cache()
+
+
+def signup(email, name):
+    storage.upsert_user_data(user_id(email), {"email": email, "password": "x", "role": "student", "name": name})
+
+
+def test_emails_differing_only_in_case_are_one_user():
+    signup("alice@example.com", "First")
+    signup("Alice@Example.com", "Second")  # used to raise IntegrityError on users.id
+
+    assert storage.get_user_by_email("ALICE@example.com")["name"] == "Second"
+    assert sqlite_store.get_connection().execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+    assert storage.get_users_by_emails(["Alice@example.com"]) == {
+        "Alice@example.com": storage.get_user_by_email("alice@example.com")}
+
+
+def test_results_are_found_whatever_the_case():
+    for email in ("bob@example.com", "Bob@Example.com"):
+        storage.store_quiz_result(email, {"topic": "t", "score": 1, "total": 3, "time": "2026-01-01 10:00:00"})
+    assert len(storage.get_quizzes_by_student("BOB@example.com")) == 2
+    assert len(storage.get_quiz_results_page(email="bob@EXAMPLE.com")[0]) == 2
+
+
+def test_migration_lowercases_and_merges_existing_rows():
+    conn = sqlite_store.get_connection()
+    with conn:
+        conn.executemany("INSERT INTO users (id, email, password, role, name) VALUES (?, ?, 'x', 'student', ?)",
+                         [("legacy-uuid", "Carol@Example.com", "legacy"),
+                          (user_id("carol@example.com"), "carol@example.com", "canonical"),
+                          ("other-uuid", "Dave@Example.com", "dave")])
+        conn.execute("INSERT INTO quiz_results (id, email, topic, score, total, time) "
+                     "VALUES ('r1', 'Carol@Example.com', 't', 1, 3, '2026-01-01 10:00:00')")
+
+    migrate_email_case.migrate(backend="sqlite")
+
+    rows = {row["email"]: row["name"] for row in conn.execute("SELECT email, name FROM users")}
+    assert rows == {"carol@example.com": "canonical", "dave@example.com": "dave"}
+    assert conn.execute("SELECT email FROM quiz_results WHERE id = 'r1'").fetchone()[0] == "carol@example.com"
+    assert migrate_email_case.migrate_sqlite() == (0, 0, 0)
+
+
+def test_export_filter_matches_whatever_the_case(tmp_path):
+    from services import results_export
+
+    storage.store_quiz_result("Carol@Example.com", {"topic": "t", "score": 2, "total": 3,
+                                                    "time": "2026-01-02 10:00:00"})
+    assert results_export.export_results(str(tmp_path)) == 1
+    assert results_export.read_results(str(tmp_path), email="CAROL@example.com").num_rows == 1
@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+import pytest
+
+from services import embeddings, semantic_questions
+
+
+@pytest.fixture(autouse=True)
+def fresh_embedder(monkeypatch):
+    monkeypatch.setattr(embeddings, "_embedder", None)
+    monkeypatch.setattr(embeddings, "_embedder_error", None)
+    monkeypatch.setattr(embeddings, "_warm_thread", None)
+    monkeypatch.setattr(semantic_questions, "SEMANTIC_RETRIEVAL", True)
+
+
+def test_model_load_failure_is_cached_and_retrieval_falls_back(monkeypatch):
+    attempts = []
+
+    def broken_model():
+        attempts.append(1)
+        raise OSError("model download failed")
+
+    monkeypatch.setattr(embeddings, "EMBEDDING_MODEL", "some/model")
+    monkeypatch.setattr(embeddings, "SentenceTransformerEmbedder", broken_model)
+
+    for _ in range(3):
+        assert semantic_questions.retrieve_questions("photosynthesis", 3, "easy") == []
+    embeddings._warm_thread.join()
+    question = {"question": "What do plants absorb?", "options": ["CO2", "O2", "N2", "He"], "correct": "A"}
+    assert semantic_questions.index_questions("photosynthesis", "easy", [question]) == 0
+    assert len(attempts) == 1
+
+
+def test_requests_do_not_wait_for_the_model(monkeypatch):
+    loading = threading.Event()
+
+    class SlowModel:
+        dim = 4
+
+        def __init__(self):
+            loading.wait(5)
+
+    monkeypatch.setattr(embeddings, "EMBEDDING_MODEL", "some/model")
+    monkeypatch.setattr(embeddings, "SentenceTransformerEmbedder", SlowModel)
+
+    assert semantic_questions.retrieve_questions("photosynthesis", 3, "easy") == []
+    assert semantic_questions.retrieve_questions("photosynthesis", 3, "easy") == []
+    loading.set()
+    embeddings._warm_thread.join()
+    assert isinstance(embeddings.get_embedder(wait=False), SlowModel)
+
+
+# Unit vectors by keyword; "newton"/"force" texts are close to each other,
+# "cell" texts are 0.8 away from them, about where bge-large puts unrelated text
+AXES = {"newton": [1, 0, 0], "force": [0.96, 0.28, 0], "cell": [0.8, 0, 0.6]}
+
+
+class FakeEmbedder:
+    dim = 3
+
+    def embed(self, texts):
+        return np.array([next(v for k, v in AXES.items() if k in t.lower()) for t in texts], dtype=np.float32)
+
+
+class FakeIndex:
+    def __init__(self, matches):
+        self.matches = matches
+
+    def search(self, vector, k=10):
+        return self.matches[:k]
+
+
+def bank_entry(topic, n):
+    return {"topic": topic, "difficulty": "easy", "type": "General",
+            "question": f"{topic} question {n}?", "options": ["a", "b", "c", "d"], "correct": "A"}
+
+
+def test_off_topic_bank_entries_are_rejected(monkeypatch):
+    monkeypatch.setattr(embeddings, "_embedder", FakeEmbedder())
+    on_topic = [(0.97, f"n{n}", bank_entry("Newton's laws of FORCE", n)) for n in range(2)]
+    same_topic = [(0.9, f"s{n}", bank_entry("newtons second law", n)) for n in range(2)]
+    # Off-topic questions that still score above the question threshold
+    off_topic = [(0.86, f"c{n}", bank_entry("Cell biology", n)) for n in range(4)]
+    monkeypatch.setattr(semantic_questions, "_index", lambda: FakeIndex(on_topic + off_topic + same_topic))
+
+    served = semantic_questions.retrieve_questions("Newton's second law", 4, "easy")
+    assert len(served) == 4
+    assert not any("Cell" in q.question for q in served)
+    # Not enough close questions for five, so it falls back to generating
+    assert semantic_questions.retrieve_questions("Newton's second law", 5, "easy") == []
+
+
+def test_questions_below_the_score_threshold_are_rejected(monkeypatch):
+    monkeypatch.setattr(embeddings, "_embedder", FakeEmbedder())
+    weak = [(0.8, f"n{n}", bank_entry("Newton's second law", n)) for n in range(4)]
+    monkeypatch.setattr(semantic_questions, "_index", lambda: FakeIndex(weak))
+    assert semantic_questions.retrieve_questions("Newton's second law", 3, "easy") == []
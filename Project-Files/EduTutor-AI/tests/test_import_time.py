@@ -0,0 +1,16 @@
+from benchmarks.import_time import BUDGET_MS, STARTUP_MODULES, heavy_imports, profile, startup_ms
+
+# Shared CI machines are noisy; a real regression (a heavy library back on the
+# startup path) costs far more than this
+BUDGET_SLACK = 2.0
+
+
+def test_startup_imports_no_heavy_modules():
+    imports = profile()
+    assert all(module in imports for module in STARTUP_MODULES)
+    assert heavy_imports(imports) == []
+
+
+def test_startup_imports_within_budget():
+    best = min(startup_ms(profile()) for _ in range(3))
+    assert best <= BUDGET_MS * BUDGET_SLACK, f"startup imports took {best:.1f}ms, budget {BUDGET_MS}ms"
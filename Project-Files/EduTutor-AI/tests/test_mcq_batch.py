@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+
+from services import mcq_batch
+from services.generation_scheduler import GenerationOverloaded
+from services.quiz_parser import Question, format_quiz_text
+
+QUIZ = format_quiz_text([Question(n, f"Question {n}?", [f"{o} {n}" for o in "wxyz"], "A") for n in (1, 2, 3)])
+
+
+class CountingScheduler:
+    def __init__(self, shed_after=None):
+        self.admits = 0
+        self.active = 0
+        self.shed_after = shed_after
+
+    @contextmanager
+    def admit(self, user, class_id="default", on_wait=None):
+        if self.shed_after is not None and self.admits >= self.shed_after:
+            raise GenerationOverloaded("queue full", 5)
+        self.admits += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+
+def test_every_provider_call_gets_its_own_slot(monkeypatch):
+    scheduler = CountingScheduler()
+    calls = []
+
+    def call(name, result):
+        def provider_call(*args):
+            assert scheduler.active == 1  # inside exactly one admission
+            calls.append(name)
+            return result() if callable(result) else result
+        return provider_call
+
+    short = [Question(1, "Only one?", ["a", "b", "c", "d"], "A")]
+    replies = iter(["Error generating MCQs: timeout", QUIZ, QUIZ])
+    monkeypatch.setattr(mcq_batch, "scheduler", scheduler)
+    monkeypatch.setattr(mcq_batch, "_generate_packed", call("packed", {"alpha": short}))
+    monkeypatch.setattr(mcq_batch, "repair_questions", call("repair", short))
+    monkeypatch.setattr(mcq_batch, "generate_mcqs", call("single", lambda: next(replies)))
+
+    results = {topic: (questions, error) for topic, questions, error
+               in mcq_batch.generate_mcqs_batch(["alpha", "beta"], pack_size=2, max_workers=1)}
+
+    # packed, repair alpha, alpha fails once then succeeds alone, beta alone
+    assert calls == ["packed", "repair", "single", "single", "single"]
+    assert scheduler.admits == len(calls)
+    assert all(error is None and len(questions) == 3 for questions, error in results.values())
+
+
+def test_overload_fails_only_the_topics_still_waiting(monkeypatch):
+    monkeypatch.setattr(mcq_batch, "scheduler", CountingScheduler(shed_after=1))
+    monkeypatch.setattr(mcq_batch, "generate_mcqs", lambda *args: QUIZ)
+
+    results = list(mcq_batch.generate_mcqs_batch(["alpha", "beta"], pack_size=1, max_workers=1))
+
+    errors = {topic: error for topic, questions, error in results}
+    assert errors["alpha"] is None
+    assert errors["beta"] == "queue full (retry in 5s)"
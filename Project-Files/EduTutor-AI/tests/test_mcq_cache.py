@@ -0,0 +1,78 @@
+import time
+
+from services import mcq_cache
+from services.mcq_cache import MCQCache, cached_generate_mcqs, make_cache_key
+from services.quiz_parser import parse_quiz_text
+
+
+def test_key_normalizes_topic_case_whitespace_and_synonyms():
+    assert make_cache_key("  Maths ", "Medium", 3) == make_cache_key("math", "medium", "3")
+    assert make_cache_key("Photo-synthesis", "easy", 3) != make_cache_key("photosynthesis", "easy", 3)
+
+
+def test_lru_evicts_least_recently_used_key():
+    cache = MCQCache(max_entries=2, ttl=60, variants=1)
+    cache.put("a", "quiz a")
+    cache.put("b", "quiz b")
+    assert cache.get("a") == "quiz a"  # "b" is now the least recently used
+    cache.put("c", "quiz c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "quiz a"
+    assert cache.get("c") == "quiz c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache = MCQCache(max_entries=10, ttl=60, variants=1)
+    now = time.time()
+    monkeypatch.setattr(mcq_cache.time, "time", lambda: now)
+    cache.put("a", "quiz a")
+    assert cache.get("a") == "quiz a"
+    monkeypatch.setattr(mcq_cache.time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_key_is_served_from_its_first_variant_then_rotates():
+    cache = MCQCache(max_entries=10, ttl=60, variants=3)
+    assert cache.get("k") is None
+    assert cache.missing_variants("k") == 0  # nothing to fill until the key is cached
+    cache.put("k", "variant 0")
+    assert cache.get("k") == "variant 0"
+    assert cache.missing_variants("k") == 2
+    for n in range(1, 4):
+        cache.put("k", f"variant {n}")  # variant 3 is beyond the variant count; ignored
+    assert cache.missing_variants("k") == 0
+    served = {cache.get("k") for _ in range(200)}
+    assert served == {"variant 0", "variant 1", "variant 2"}
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "mcq_cache.sqlite3")
+    cache = MCQCache(max_entries=10, ttl=60, variants=1, db_path=path)
+    cache.put("k", "quiz text")
+    assert MCQCache(max_entries=10, ttl=60, variants=1, db_path=path).get("k") == "quiz text"
+
+
+def test_cached_generate_mcqs_hits_after_one_generation_and_fills_variants_in_background(monkeypatch):
+    monkeypatch.setattr(mcq_cache, "mcq_cache", MCQCache(max_entries=10, ttl=60, variants=3))
+    calls = []
+    real_generate = mcq_cache.generate_mcqs
+
+    def counting_generate(**kwargs):
+        calls.append(kwargs)
+        return real_generate(**kwargs)
+
+    monkeypatch.setattr(mcq_cache, "generate_mcqs", counting_generate)
+    first = cached_generate_mcqs("Photosynthesis", 3, "medium", user="s0")
+    assert len(calls) == 1
+    # The second request is a hit on the first variant; it does not wait for the others
+    assert cached_generate_mcqs("Photosynthesis", 3, "medium", user="s1") == first
+    mcq_cache._variant_executor.submit(lambda: None).result()  # the fill runs on this single worker
+
+    key = make_cache_key("Photosynthesis", "medium", 3)
+    assert len(calls) == 3
+    assert mcq_cache.mcq_cache.missing_variants(key) == 0
+    texts = [cached_generate_mcqs("Photosynthesis", 3, "medium", user=f"s{n}") for n in range(2, 8)]
+    assert len(calls) == 3
+    assert all(len(parse_quiz_text(text)) == 3 for text in texts)
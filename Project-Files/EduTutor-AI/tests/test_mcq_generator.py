@@ -0,0 +1,22 @@
+from services import mcq_generator2
+from services.mcq_generator2 import REPAIR_TOKEN_SLACK, generation_params, get_repair_stats, repair_questions
+from services.quiz_parser import Question
+
+
+class OneQuestionChain:
+    def invoke(self, inputs):
+        return "Q1. Which gas do plants absorb?\nA) CO2\nB) O2\nC) N2\nD) He\nAnswer: A"
+
+
+def test_repair_saving_is_measured_against_the_full_request_budget(monkeypatch):
+    monkeypatch.setattr(mcq_generator2, "get_mcq_chain", lambda **kwargs: OneQuestionChain())
+    have = [Question(1, "First?", ["a", "b", "c", "d"], "A"), Question(2, "Second?", ["a", "b", "c", "d"], "B")]
+    before = get_repair_stats()
+
+    questions = repair_questions("plants", 3, "easy", have)
+
+    after = get_repair_stats()
+    assert [q["question"] for q in questions] == ["First?", "Second?", "Which gas do plants absorb?"]
+    expected = (generation_params(3)["max_new_tokens"]
+                - generation_params(1, slack=REPAIR_TOKEN_SLACK)["max_new_tokens"])
+    assert after["tokens_saved"] - before["tokens_saved"] == expected
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import migrate_pinecone_to_sqlite, sqlite_store
+from services.record_ids import attempt_id, user_id
+
+EMAIL = "legacy@example.com"
+RECORDS = {
+    user_id(EMAIL): {"type": "user", "email": EMAIL, "password": "x", "role": "student", "name": "Legacy"},
+    f"{EMAIL}_2024-01-01 10:00:00": {"type": "quiz", "email": EMAIL, "topic": "t", "score": 1, "total": 3,
+                                     "time": "2024-01-01 10:00:00"},
+    f"{EMAIL}_2024-01-02 10:00:00": {"type": "quiz", "email": EMAIL, "topic": "t", "score": 2, "total": 3,
+                                     "time": "2024-01-02 10:00:00"},
+    attempt_id(EMAIL, 7): {"type": "quiz", "email": EMAIL, "topic": "t", "score": 3, "total": 3,
+                           "time": "2024-01-03 10:00:00"},
+}
+
+
+class FakeIndex:
+    def list(self):
+        yield list(RECORDS)
+
+    def fetch(self, ids):
+        return SimpleNamespace(vectors={i: SimpleNamespace(metadata=RECORDS[i]) for i in ids})
+
+
+@pytest.fixture(autouse=True)
+def fake_index(monkeypatch):
+    monkeypatch.setattr(migrate_pinecone_to_sqlite, "get_index", lambda: FakeIndex())
+
+
+def test_migration_can_run_again_without_duplicating_legacy_results():
+    migrate_pinecone_to_sqlite.migrate()
+    first = sqlite_store.get_quizzes_by_student(EMAIL)
+    migrate_pinecone_to_sqlite.migrate()
+    second = sqlite_store.get_quizzes_by_student(EMAIL)
+
+    assert len(first) == 3
+    assert sorted(r["id"] for r in second) == sorted(r["id"] for r in first)
+    assert attempt_id(EMAIL, 7) in {r["id"] for r in second}
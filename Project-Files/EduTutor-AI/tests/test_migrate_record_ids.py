@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import migrate_pinecone_to_sqlite, migrate_record_ids, pinecone_service, record_ids
+
+EMAIL = "rekey@example.com"
+
+
+class FakeIndex:
+    def __init__(self, records):
+        self.records = records
+        self.fail_deletes = False
+
+    def list(self, prefix=""):
+        yield sorted(i for i in self.records if i.startswith(prefix))
+
+    def fetch(self, ids):
+        return SimpleNamespace(vectors={i: SimpleNamespace(metadata=self.records[i])
+                                        for i in ids if i in self.records})
+
+    def upsert(self, vectors):
+        self.records.update((v["id"], v["metadata"]) for v in vectors)
+
+    def delete(self, ids):
+        if self.fail_deletes:
+            raise ConnectionError("interrupted")
+        for i in ids:
+            self.records.pop(i, None)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    records = {f"{EMAIL}_2024-01-0{day} 10:00:00": {"type": "quiz", "email": EMAIL, "topic": "t", "score": day,
+                                                   "total": 3, "time": f"2024-01-0{day} 10:00:00"}
+               for day in range(1, 4)}
+    fake = FakeIndex(records)
+    monkeypatch.setattr(pinecone_service, "get_index", lambda: fake)
+    monkeypatch.setattr(migrate_pinecone_to_sqlite, "get_index", lambda: fake)
+    return fake
+
+
+def test_pinecone_rerun_after_an_interrupted_delete_does_not_duplicate(index):
+    index.fail_deletes = True
+    with pytest.raises(ConnectionError):
+        migrate_record_ids.migrate_pinecone()
+    assert len(index.records) == 6  # copies written, old records still there
+
+    index.fail_deletes = False
+    assert migrate_record_ids.migrate_pinecone() == (0, 3)
+    assert len(index.records) == 3
+    assert all(record_ids.attempt_seq(EMAIL, i) for i in index.records)
+    assert sorted(r["score"] for r in index.records.values()) == [1, 2, 3]
+
+    assert migrate_record_ids.migrate_pinecone() == (0, 0)
+    assert len(index.records) == 3
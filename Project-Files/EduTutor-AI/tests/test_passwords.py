@@ -0,0 +1,10 @@
+from services import passwords
+
+
+def test_pool_does_not_fork_and_round_trips(monkeypatch):
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(passwords, "PASSWORD_WORKERS", 1)
+    hashed = passwords.hash_password("s3cret")
+    assert passwords.verify_password("s3cret", hashed) == (True, None)
+    assert passwords.verify_password("wrong", hashed) == (False, None)
+    assert passwords._get_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import pinecone_service
+from services.record_ids import attempt_id, user_id
+
+EMAILS = ["a@example.com", "b@example.com", "c@example.com"]
+
+
+class FakeIndex:
+    def __init__(self, records):
+        self.records = records
+        self.fetched = 0
+
+    def list(self, prefix=""):
+        ids = sorted(i for i in self.records if i.startswith(prefix))
+        for start in range(0, len(ids), 100):
+            yield ids[start:start + 100]
+
+    def fetch(self, ids):
+        self.fetched += len(ids)
+        return SimpleNamespace(vectors={i: SimpleNamespace(metadata=self.records[i])
+                                        for i in ids if i in self.records})
+
+
+@pytest.fixture
+def index(monkeypatch):
+    records = {user_id(email): {"type": "user", "email": email} for email in EMAILS}
+    for n in range(300):
+        email = EMAILS[n % 3]
+        records[attempt_id(email, n + 1)] = {"type": "quiz", "email": email, "topic": f"t{n % 2}",
+                                             "score": 1, "total": 2,
+                                             "time": f"2024-01-{1 + n % 28:02d} 10:{n % 60:02d}:00"}
+    fake = FakeIndex(records)
+    monkeypatch.setattr(pinecone_service, "get_index", lambda: fake)
+    pinecone_service._page_snapshots.clear()
+    return fake
+
+
+def walk_pages(**filters):
+    pages, cursor = [], None
+    while True:
+        page, cursor = pinecone_service.get_quiz_results_page(cursor=cursor, page_size=40, **filters)
+        pages.append(page)
+        if not cursor:
+            return pages
+
+
+def test_pages_are_newest_first_and_later_pages_fetch_only_their_ids(index):
+    pages = walk_pages(topic="T1")
+    rows = [r for page in pages for r in page]
+    expected = sorted((r for r in index.records.values() if r.get("topic") == "t1"),
+                      key=lambda r: r["time"], reverse=True)
+    assert [r["time"] for r in rows] == [r["time"] for r in expected]
+    assert len({r["id"] for r in rows}) == 150
+    # One walk for the snapshot, then each page fetches just its own rows
+    assert index.fetched == 300 + 150
+
+
+def test_iter_quiz_results_is_one_pass(index):
+    chunks = list(pinecone_service.iter_quiz_results(chunk_size=64, email="b@example.com"))
+    assert sum(len(chunk) for chunk in chunks) == 100
+    assert index.fetched == 100
@@ -0,0 +1,48 @@
+import time
+
+from services.question_bank import QuestionBank
+from services.quiz_parser import format_quiz_text
+
+
+def fake_generate(calls):
+    def generate(topic, num_questions, difficulty):
+        calls.append(topic)
+        n = len(calls)
+        return format_quiz_text([{"question": f"{topic} {n}.{i}?", "options": ["a", "b", "c", "d"], "correct": "A"}
+                                 for i in range(num_questions)])
+    return generate
+
+
+def settle(bank):
+    bank._executor.shutdown(wait=True)
+
+
+def test_requests_outside_the_window_do_not_make_a_topic_popular(monkeypatch):
+    calls = []
+    bank = QuestionBank(generate=fake_generate(calls), popular_window=60)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    bank.take("one-off topic", "easy", 3)
+    now[0] += 61
+    bank.take("one-off topic", "easy", 3)
+    settle(bank)
+    assert calls == []
+
+
+def test_repeated_topic_is_refilled():
+    calls = []
+    bank = QuestionBank(generate=fake_generate(calls), popular_window=60)
+    bank.take("fractions", "easy", 3)
+    bank.take("fractions", "easy", 3)
+    settle(bank)
+    assert calls and set(calls) == {"fractions"}
+    assert bank.stats()["pools"]["fractions|easy"] == bank.high_water
+
+
+def test_topic_maps_are_bounded():
+    bank = QuestionBank(generate=fake_generate([]), popular_after=10, max_topics=5)
+    for n in range(50):
+        bank.take(f"topic {n}", "easy", 3)
+        bank.add(f"topic {n}", "easy", [{"question": f"q{n}?", "options": ["a", "b"], "correct": "A"}])
+    assert len(bank._requests) == 5 and len(bank._pools) == 5
+    assert set(bank._pools) == {(f"topic {n}", "easy") for n in range(45, 50)}
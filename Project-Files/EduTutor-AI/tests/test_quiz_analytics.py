@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from services import quiz_analytics
+from services.quiz_analytics import get_student_trend, rebuild_aggregates, update_aggregates
+
+
+def _results(count, seed=0):
+    rng = random.Random(seed)
+    emails = ["alice@x.com", "bob@x.com", "a_b@x.com", "aXb@x.com", "c%d@x.com"]
+    topics = ["Photosynthesis", "photosynthesis ", "Fractions", "World  War II"]
+    results = []
+    for _ in range(count):
+        total = rng.choice((3, 5, 10))
+        results.append({
+            "email": rng.choice(emails),
+            "topic": rng.choice(topics),
+            "score": rng.randint(0, total),
+            "total": total,
+            "time": f"2025-03-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00",
+        })
+    return results
+
+
+def _snapshot():
+    conn = quiz_analytics._connection()
+    aggregates = {
+        (row["scope"], row["key"]): (row["attempts"], row["percent_sum"], row["passes"])
+        for row in conn.execute("SELECT * FROM quiz_aggregates")
+    }
+    histogram = {
+        (row["scope"], row["key"], row["bucket"]): row["count"]
+        for row in conn.execute("SELECT * FROM quiz_score_histogram")
+    }
+    return aggregates, histogram
+
+
+@pytest.fixture(autouse=True)
+def empty_aggregates():
+    rebuild_aggregates([])
+    yield
+    rebuild_aggregates([])
+
+
+def test_incremental_updates_match_full_rebuild():
+    results = _results(500)
+    for result in results:
+        update_aggregates(result["email"], result)
+    incremental, incremental_histogram = _snapshot()
+
+    assert rebuild_aggregates(list(reversed(results))) == len(results)
+    rebuilt, rebuilt_histogram = _snapshot()
+
+    assert incremental_histogram == rebuilt_histogram
+    assert incremental.keys() == rebuilt.keys()
+    for key, (attempts, percent_sum, passes) in rebuilt.items():
+        assert incremental[key][0] == attempts
+        assert incremental[key][1] == pytest.approx(percent_sum)
+        assert incremental[key][2] == passes
+
+
+def test_summaries_match_a_direct_computation():
+    results = _results(300, seed=1)
+    for result in results:
+        update_aggregates(result["email"], result)
+    percents = [100.0 * r["score"] / r["total"] for r in results]
+    overall = quiz_analytics.get_overall_summary()
+    assert overall["attempts"] == len(results)
+    assert overall["mean_percent"] == round(sum(percents) / len(percents), 1)
+    passes = sum(p >= quiz_analytics.PASS_PERCENT for p in percents)
+    assert overall["pass_rate"] == round(100.0 * passes / len(results), 1)
+    topics = {t["topic"]: t["attempts"] for t in quiz_analytics.get_topic_summaries()}
+    assert topics["photosynthesis"] == sum(r["topic"].strip().lower() == "photosynthesis" for r in results)
+
+
+def test_student_trend_matches_the_email_exactly():
+    # Stored emails are normalized to lower case by services.storage
+    for email in ("a_b@x.com", "axb@x.com", "c%d@x.com"):
+        update_aggregates(email, {"topic": "t", "score": 1, "total": 1, "time": "2025-03-01 10:00:00"})
+    update_aggregates("axb@x.com", {"topic": "t", "score": 0, "total": 1, "time": "2025-03-02 10:00:00"})
+
+    assert [day["attempts"] for day in get_student_trend("a_b@x.com")] == [1]
+    assert [day["attempts"] for day in get_student_trend("A_B@x.com")] == [1]
+    assert [day["day"] for day in get_student_trend("aXb@x.com")] == ["2025-03-01", "2025-03-02"]
+    assert [day["attempts"] for day in get_student_trend("c%d@x.com")] == [1]
+    assert get_student_trend("a%") == []
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from services.quiz_parser import (IncrementalQuizParser, format_quiz_text, parse_quiz,
+                                  parse_quiz_text, shuffle_options)
+
+EXPECTED = [
+    {"question": "What gas do plants absorb?", "options": ["Carbon dioxide", "Oxygen", "Nitrogen", "Helium"],
+     "correct": "A"},
+    {"question": "Which organelle makes ATP?", "options": ["Nucleus", "Mitochondrion", "Ribosome", "Vacuole"],
+     "correct": "B"},
+]
+
+# The formats the generators have been seen to produce, one block per question
+VARIANTS = {
+    "canonical": "Q{n}. {q}\nA) {a}\nB) {b}\nC) {c}\nD) {d}\nAnswer: {ans}",
+    "watsonx colon, lowercase options": "Q{n}: {q}\na) {a}\nb) {b}\nc) {c}\nd) {d}\nAnswer: {ans_lower}",
+    "question word": "Question {n}) {q}\n(a) {a}\n(b) {b}\n(c) {c}\n(d) {d}\nCorrect answer: {ans}",
+    "dotted options": "Q{n}. {q}\nA. {a}\nB. {b}\nC. {c}\nD. {d}\nAnswer - {ans}",
+    "answer repeats option": "Q{n}. {q}\nA) {a}\nB) {b}\nC) {c}\nD) {d}\nAnswer: {ans_lower}) {answer_text}",
+    "indented with blank lines": "  Q{n}.  {q}\n\n   A)  {a}\n   B)  {b}\n   C)  {c}\n   D)  {d}\n\n  Answer:  {ans}  ",
+}
+
+
+def render(template, questions, start=1):
+    blocks = []
+    for n, q in enumerate(questions, start=start):
+        a, b, c, d = q["options"]
+        blocks.append(template.format(n=n, q=q["question"], a=a, b=b, c=c, d=d, ans=q["correct"],
+                                      ans_lower=q["correct"].lower(),
+                                      answer_text=q["options"]["ABCD".index(q["correct"])]))
+    return "\n\n".join(blocks)
+
+
+@pytest.mark.parametrize("variant", sorted(VARIANTS))
+def test_format_variants_parse_to_the_same_questions(variant):
+    result = parse_quiz(render(VARIANTS[variant], EXPECTED))
+    assert [q.to_dict() for q in result.questions] == EXPECTED
+    assert result.errors == []
+
+
+def test_wrapped_question_text_and_preamble():
+    text = "Here is your quiz:\n\nQ1. What gas do plants\nabsorb?\nA) Carbon dioxide\nB) Oxygen\nC) Nitrogen\n" \
+           "D) Helium\nAnswer: A\nExplanation: A) is right because of photosynthesis."
+    assert [q.to_dict() for q in parse_quiz_text(text)] == EXPECTED[:1]
+
+
+@pytest.mark.parametrize("block, problem", [
+    ("Q1. Broken?\nA) one\nB) two\nC) three\nAnswer: A", "expected 4 options, got 3"),
+    ("Q1. Broken?\nA) one\nB) one\nC) three\nD) four\nAnswer: A", "duplicate options"),
+    ("Q1. Broken?\nA) one\nB) two\nC) three\nD) four", "missing answer"),
+    ("Q1.\nA) one\nB) two\nC) three\nD) four\nAnswer: A", "missing question text"),
+])
+def test_rejected_questions_are_reported(block, problem):
+    result = parse_quiz(block + "\n\n" + render(VARIANTS["canonical"], EXPECTED, start=2))
+    assert [q.question for q in result.questions] == [q["question"] for q in EXPECTED]
+    assert [e["number"] for e in result.errors] == [1]
+    assert problem in result.errors[0]["problems"]
+
+
+WORDS = "cell energy light water plant atom force wave river number planet acid".split()
+
+
+def random_questions(rng, count):
+    questions = []
+    for _ in range(count):
+        options = rng.sample(WORDS, 4)
+        questions.append({"question": " ".join(rng.choices(WORDS, k=rng.randint(3, 9))).capitalize() + "?",
+                          "options": [o + " " + str(rng.randint(1, 99)) for o in options],
+                          "correct": rng.choice("ABCD")})
+    return questions
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_fuzz_random_quizzes_in_mixed_formats(seed):
+    rng = random.Random(seed)
+    questions = random_questions(rng, rng.randint(1, 30))
+    blocks = [render(rng.choice(list(VARIANTS.values())), [q], start=n)
+              for n, q in enumerate(questions, start=1)]
+    text = ("\n" * rng.randint(1, 3)).join(blocks)
+    assert [q.to_dict() for q in parse_quiz_text(text)] == questions
+
+    # Streaming the same text in random chunks yields the same questions
+    parser, streamed, position = IncrementalQuizParser(), [], 0
+    while position < len(text):
+        step = rng.randint(1, 40)
+        streamed += parser.feed(text[position:position + step])
+        position += step
+    streamed += parser.close()
+    assert [q.to_dict() for q in streamed] == questions
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_fuzz_mutated_text_never_raises_and_only_returns_valid_questions(seed):
+    rng = random.Random(seed)
+    lines = format_quiz_text(random_questions(rng, 10)).splitlines()
+    for _ in range(rng.randint(1, 15)):
+        n = rng.randrange(len(lines))
+        mutation = rng.choice(("drop", "duplicate", "truncate", "swap"))
+        if mutation == "drop":
+            del lines[n]
+        elif mutation == "duplicate":
+            lines.insert(n, lines[n])
+        elif mutation == "truncate":
+            lines[n] = lines[n][:rng.randint(0, len(lines[n]))]
+        else:
+            m = rng.randrange(len(lines))
+            lines[n], lines[m] = lines[m], lines[n]
+        if not lines:
+            break
+    result = parse_quiz("\n".join(lines))
+    for q in result.questions:
+        assert q.problems() == []
+    assert len(result.questions) + len(result.errors) <= 10 + 15
+
+
+def test_format_then_parse_round_trips_shuffled_options():
+    rng = random.Random(0)
+    questions = shuffle_options(random_questions(rng, 20), rng)
+    assert [q.to_dict() for q in parse_quiz_text(format_quiz_text(questions))] == [q.to_dict() for q in questions]
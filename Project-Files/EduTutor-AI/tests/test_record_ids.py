@@ -0,0 +1,31 @@
+from services import record_ids, sqlite_store
+from services.migrate_record_ids import _legacy_attempts
+
+EMAIL = "shared@example.com"
+
+
+def forget_counter():
+    """What a second app instance with its own counter file sees"""
+    conn = sqlite_store.get_connection()
+    with conn:
+        conn.execute("DELETE FROM attempt_sequences WHERE email = ?", (EMAIL,))
+
+
+def test_shared_backend_ids_do_not_collide_across_instances():
+    forget_counter()
+    first = record_ids.new_attempt_id(EMAIL, lambda: 0, shared=True)
+    forget_counter()
+    second = record_ids.new_attempt_id(EMAIL, lambda: 0, shared=True)
+
+    assert first != second
+    assert record_ids.attempt_seq(EMAIL, first) == record_ids.attempt_seq(EMAIL, second) == 1
+    assert record_ids.is_attempt_id(first) and record_ids.is_attempt_id(second)
+    assert _legacy_attempts([(first, EMAIL, "2026-01-01"), (second, EMAIL, "2026-01-01")]) == {}
+
+
+def test_local_ids_stay_plain_sequences():
+    forget_counter()
+    assert record_ids.new_attempt_id(EMAIL, lambda: 41) == record_ids.attempt_id(EMAIL, 42)
+    assert record_ids.attempt_seq(EMAIL, f"{EMAIL}_2026-01-01 10:00:00") is None
+    assert record_ids.attempt_seq("other@example.com", record_ids.attempt_id(EMAIL, 1)) is None
+    assert not record_ids.is_attempt_id(record_ids.user_id(EMAIL))
@@ -0,0 +1,83 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from auth.email_auth import router
+from services import passwords, sessions, storage
+from services.record_ids import user_id
+from services.sessions import SESSION_COOKIE, issue_session_code, issue_tokens, redeem_session_code, verify_refresh_token
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def cookie_value(response):
+    header = response.headers["set-cookie"]
+    assert "HttpOnly" in header and "Secure" in header
+    return header.split(";", 1)[0].split("=", 1)[1].strip('"')
+
+
+def session_code(response):
+    return parse_qs(urlparse(response.headers["location"]).query)["session_code"][0]
+
+
+def test_session_code_works_once_and_expires(monkeypatch):
+    _, refresh = issue_tokens("a@example.com", "student")
+    code = issue_session_code(refresh)
+    assert redeem_session_code(code) == refresh
+    assert redeem_session_code(code) is None
+    monkeypatch.setattr(sessions, "SESSION_CODE_TTL", -1)
+    assert redeem_session_code(issue_session_code(refresh)) is None
+
+
+def test_login_keeps_the_refresh_token_out_of_the_url(monkeypatch, client):
+    monkeypatch.setattr(passwords, "BCRYPT_ROUNDS", 4)
+    email = "cookie@example.com"
+    storage.upsert_user_data(user_id(email), {"email": email, "password": passwords.hash_password("pw"),
+                                              "role": "student", "name": "Cookie"})
+    response = client.post("/auth/email", data={"email": email, "password": "pw"}, follow_redirects=False)
+    refresh = cookie_value(response)
+    assert response.headers["location"].startswith("/dashboard/student?session_code=")
+    assert refresh not in response.headers["location"]
+    assert redeem_session_code(session_code(response)) == refresh
+
+
+def test_session_route_rotates_the_cookie(client):
+    _, old = issue_tokens("rotate@example.com", "educator", "Rotate")
+    response = client.get("/auth/session", params={"next": "/dashboard/educator"},
+                          headers={"cookie": f"{SESSION_COOKIE}={old}"}, follow_redirects=False)
+    new = cookie_value(response)
+    assert new != old
+    assert verify_refresh_token(old) is None
+    assert verify_refresh_token(new)["sub"] == "rotate@example.com"
+    assert redeem_session_code(session_code(response)) == new
+
+    # The old token is revoked, so a copy of it gets nothing
+    response = client.get("/auth/session", headers={"cookie": f"{SESSION_COOKIE}={old}"}, follow_redirects=False)
+    assert response.headers["location"] == "/"
+    assert "Max-Age=0" in response.headers["set-cookie"]
+
+
+def test_session_route_only_redirects_to_local_paths(client):
+    response = client.get("/auth/session", params={"next": "//evil.example"}, follow_redirects=False)
+    assert response.headers["location"] == "/"
+
+
+def test_session_route_url_logs_in_through_the_router(client):
+    # The URL go_to_session_route sends the browser to after a password or Google login
+    _, refresh = issue_tokens("route@example.com", "student", "Route")
+    url = sessions.session_route_url("http://testserver/", "/", issue_session_code(refresh))
+    assert "session_code=" in url
+    response = client.get(url, follow_redirects=False)
+    assert response.status_code == 303
+    new = cookie_value(response)
+    assert verify_refresh_token(new)["sub"] == "route@example.com"
+    assert verify_refresh_token(refresh) is None
+    assert response.headers["location"].startswith("/?session_code=")
+    assert redeem_session_code(session_code(response)) == new
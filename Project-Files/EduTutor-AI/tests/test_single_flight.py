@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import mcq_cache
+from services.mcq_cache import MCQCache, SingleFlight, cached_generate_mcqs
+from services.quiz_parser import parse_quiz_text
+
+FOLLOWERS = 7
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    flight = SingleFlight()
+    monkeypatch.setattr(mcq_cache, "in_flight", flight)
+    monkeypatch.setattr(mcq_cache, "mcq_cache", MCQCache(max_entries=10, ttl=60, variants=1))
+    return flight
+
+
+def blocking_generate(flight, outcome):
+    """A generation that holds until every other request has joined it"""
+    calls = []
+    lock = threading.Lock()
+
+    def generate(**kwargs):
+        with lock:
+            calls.append(kwargs)
+        deadline = time.monotonic() + 5
+        while flight.coalesced < FOLLOWERS and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return outcome()
+
+    return generate, calls
+
+
+def run_concurrently(count):
+    def request(n):
+        try:
+            return cached_generate_mcqs("Photosynthesis", 3, "medium", user=f"s{n}")
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(request, range(count)))
+
+
+def test_concurrent_identical_requests_share_one_generation(monkeypatch, flight):
+    quiz = "\n\n".join(f"Q{n}. Question {n}?\nA) one {n}\nB) two {n}\nC) three {n}\nD) four {n}\nAnswer: B"
+                       for n in range(1, 4))
+    generate, calls = blocking_generate(flight, lambda: quiz)
+    monkeypatch.setattr(mcq_cache, "generate_mcqs", generate)
+
+    results = run_concurrently(FOLLOWERS + 1)
+
+    assert len(calls) == 1
+    assert (flight.leaders, flight.coalesced) == (1, FOLLOWERS)
+    expected = sorted(q["question"] for q in parse_quiz_text(quiz))
+    for text in results:
+        assert sorted(q["question"] for q in parse_quiz_text(text)) == expected
+
+
+def test_leader_exception_reaches_followers(monkeypatch, flight):
+    def fail():
+        raise RuntimeError("provider down")
+
+    generate, calls = blocking_generate(flight, fail)
+    monkeypatch.setattr(mcq_cache, "generate_mcqs", generate)
+
+    results = run_concurrently(FOLLOWERS + 1)
+
+    assert len(calls) == 1
+    assert all(isinstance(e, RuntimeError) and str(e) == "provider down" for e in results)
+
+
+def test_wait_returns_none_when_the_leader_takes_too_long(monkeypatch):
+    monkeypatch.setattr(mcq_cache, "COALESCE_WAIT_SECONDS", 0.01)
+    flight = SingleFlight()
+    flight.begin("k")
+    future, leader = flight.begin("k")
+    assert not leader
+    assert flight.wait(future) is None